@@ -4,77 +4,72 @@ Stock Analysis System
 """
 
 import os
+import sys
+import asyncio
+import argparse
 from dotenv import load_dotenv
-import time
-import random
 import logging
 import traceback
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor
-from typing import Dict, List, Optional, Tuple, Union
-from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
 
 import numpy as np
 import pandas as pd
-import tushare as ts
-from ratelimit import limits, RateLimitException
-from backoff import on_exception, expo
+
+# 以脚本方式运行时，将项目根目录加入路径以便复用 server.services 中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from server.services.bar_store import BarStore
+from server.services.market_snapshot import MarketSnapshotIngestor
+from server.services.tushare_bulk import TushareBulkIngestor
+from server.services.indicator_kernels import BACKENDS, get_kernels
+from server.services.indicator_library import INPUT_COLUMNS, IndicatorLibrary, TechnicalParams
+from server.services.scoring_rules import ScoringRuleSet
+from server.services.scan_pipeline import ScanPipeline
+from server.services.scan_checkpoint import ScanCheckpoint
+from server.services.stock_scorer import StockScorer
+from server.services.stock_universe import MIN_BARS, StockUniverse
+from server.utils.rate_limiter import get_rate_limiter, rate_limited
 
 # Load environment variables from .env file
 load_dotenv()
 
-# --- 可配置的速率限制参数 ---
 # Tushare API 令牌 (强烈建议从环境变量或配置文件加载)
 TUSHARE_TOKEN = os.getenv('TUSHARE_TOKEN', '')
 
-# 每分钟最大调用次数
-CALLS_PER_MINUTE = 50
-# 时间周期（秒）
-PERIOD_SECONDS = 60
+# Tushare 接口的限速端点；配额由 server.utils.rate_limiter 统一管理（默认每分钟50次，
+# 可通过环境变量 RATE_LIMITS 调整），同一台机器上的所有线程和扫描进程共享
+PRO_BAR_ENDPOINT = 'tushare.pro_bar'
 from tqdm import tqdm
 
-# -------------------------------
-# **技术指标配置**
-# -------------------------------
-@dataclass
-class TechnicalParams:
-    """技术指标参数配置"""
-    ma_periods: Dict[str, int]
-    rsi_period: int
-    bollinger_period: int
-    bollinger_std: int
-    volume_ma_period: int
-    atr_period: int
-
-    @classmethod
-    def default(cls) -> 'TechnicalParams':
-        """返回默认的技术指标参数"""
-        return cls(
-            ma_periods={'short': 5, 'medium': 20, 'long': 60},
-            rsi_period=14,
-            bollinger_period=20,
-            bollinger_std=2,
-            volume_ma_period=20,
-            atr_period=14
-        )
-
 # -------------------------------
 # **股票分析引擎**
 # -------------------------------
 class StockAnalyzer:
     """股票分析引擎，计算各类技术指标"""
 
-    def __init__(self, pro_api: ts.pro_api, params: Optional[TechnicalParams] = None):
+    # 分析结果用到的技术指标列，扫描时只计算这些指标与评分规则集用到的指标及其依赖
+    SCORE_INDICATORS = ('MA5', 'MA20', 'RSI', 'MACD', 'Signal', 'Volume_Ratio')
+
+    def __init__(self, pro_api: Optional[Any], params: Optional[TechnicalParams] = None,
+                 bar_store: Optional[BarStore] = None, backend: Optional[str] = None,
+                 rule_set: Optional[ScoringRuleSet] = None):
         """
         初始化股票分析引擎
 
         Args:
-            pro_api: 初始化后的 Tushare Pro API 实例
+            pro_api: 初始化后的 Tushare Pro API 实例，只使用本地K线仓库时可为None
             params: 技术指标配置参数
+            bar_store: 本地K线仓库，提供时从仓库读取日线数据而不请求 Tushare
+            backend: 滚动指标的计算后端，'pandas'、'numpy'、'numba' 或 'auto'，默认读取环境变量 INDICATOR_BACKEND
+            rule_set: 评分规则集，默认为内置的 scanner 规则集
         """
         self._setup_logging()
         self.pro = pro_api
         self.params = params or TechnicalParams.default()
+        self.bar_store = bar_store
+        self.library = IndicatorLibrary(self.params)
+        self.kernels = get_kernels(backend)
+        self.rule_set = rule_set if rule_set is not None else ScoringRuleSet.builtin('scanner')
 
     def _setup_logging(self) -> None:
         """配置日志记录"""
@@ -85,13 +80,19 @@ class StockAnalyzer:
         )
         self.logger = logging.getLogger(__name__)
 
-    @on_exception(expo, RateLimitException, max_tries=5) # 添加指数退避和重试机制
-    @limits(calls=CALLS_PER_MINUTE, period=PERIOD_SECONDS) # 应用速率限制
+    @rate_limited(PRO_BAR_ENDPOINT)
     def get_stock_data(self, stock_code: str,
                        start_date: Optional[str] = None,
                        end_date: Optional[str] = None) -> pd.DataFrame:
+        """获取单只股票历史数据（经共享限速器限速），参数与返回值同 fetch_stock_data"""
+        return self.fetch_stock_data(stock_code, start_date, end_date)
+
+    def fetch_stock_data(self, stock_code: str,
+                         start_date: Optional[str] = None,
+                         end_date: Optional[str] = None) -> pd.DataFrame:
         """
-        获取单只股票历史数据，默认使用前一年的数据。
+        从 Tushare 获取单只股票历史数据，默认使用前一年的数据。
+        本方法不做速率限制，由调用方控制请求频率（如扫描流水线的令牌桶）。
 
         Args:
             stock_code: 股票代码（可以带市场前缀或纯代码）
@@ -170,98 +171,56 @@ class StockAnalyzer:
             self.logger.error(f"获取股票数据失败，股票代码 {stock_code}，错误信息：{str(e)}")
             raise ValueError(f"股票 {stock_code} 数据获取出错: {str(e)}")
 
-    @staticmethod
-    def calculate_ema(series: pd.Series, period: int) -> pd.Series:
-        """计算 EMA"""
-        return series.ewm(span=period, adjust=False).mean()
-
-    @staticmethod
-    def calculate_rsi(series: pd.Series, period: int) -> pd.Series:
+    def get_local_stock_data(self, stock_code: str,
+                             start_date: Optional[str] = None,
+                             end_date: Optional[str] = None) -> pd.DataFrame:
         """
-        计算 RSI（指数加权移动平均法）
+        从本地K线仓库读取单只股票历史数据，默认使用前一年的数据，格式与 get_stock_data 一致
+
+        Args:
+            stock_code: 股票代码（可以带市场后缀或纯代码）
+            start_date: 开始日期(格式YYYYMMDD)
+            end_date: 结束日期(格式YYYYMMDD)
+
+        Returns:
+            包含日期、开盘、收盘、最高、最低、成交量的 DataFrame
         """
-        delta = series.diff()
-        gain = delta.clip(lower=0)
-        loss = -delta.clip(upper=0)
-        avg_gain = gain.ewm(com=period - 1, adjust=False).mean()
-        avg_loss = loss.ewm(com=period - 1, adjust=False).mean()
-        rs = avg_gain / (avg_loss + 1e-10)
-        return 100 - (100 / (1 + rs))
-
-    @staticmethod
-    def calculate_macd(series: pd.Series) -> Tuple[pd.Series, pd.Series, pd.Series]:
-        """计算 MACD、信号线和直方图"""
-        exp1 = series.ewm(span=12, adjust=False).mean()
-        exp2 = series.ewm(span=26, adjust=False).mean()
-        macd = exp1 - exp2
-        signal = macd.ewm(span=9, adjust=False).mean()
-        return macd, signal, macd - signal
-
-    @staticmethod
-    def calculate_bollinger_bands(series: pd.Series, period: int, std_dev: int) -> Tuple[pd.Series, pd.Series, pd.Series]:
-        """计算 Bollinger 通道"""
-        middle = series.rolling(window=period, min_periods=period).mean()
-        std = series.rolling(window=period, min_periods=period).std()
-        upper = middle + std * std_dev
-        lower = middle - std * std_dev
-        return upper, middle, lower
-
-    def calculate_atr(self, df: pd.DataFrame, period: int) -> pd.Series:
-        """计算 ATR"""
-        high = df['high']
-        low = df['low']
-        prev_close = df['close'].shift(1)
-        tr = pd.concat([
-            high - low,
-            (high - prev_close).abs(),
-            (low - prev_close).abs()
-        ], axis=1).max(axis=1)
-        return tr.rolling(window=period, min_periods=period).mean()
-
-    @staticmethod
-    def calculate_obv(series_close: pd.Series, series_volume: pd.Series) -> pd.Series:
-        """计算 OBV（能量潮指标）"""
-        diff = series_close.diff().fillna(0)
-        obv = np.where(diff > 0, series_volume, np.where(diff < 0, -series_volume, 0))
-        return pd.Series(obv, index=series_close.index).cumsum()
-
-    @staticmethod
-    def calculate_stochastic(series_close: pd.Series, window: int = 14) -> Tuple[pd.Series, pd.Series]:
+        if not start_date:
+            start_date = (datetime.now() - timedelta(days=365)).strftime('%Y%m%d')
+        pure_code = stock_code.split('.')[0]
+        df = self.bar_store.read('A', pure_code, start_date, end_date)
+        if df is None or df.empty:
+            raise ValueError(f"本地K线仓库中没有股票 {stock_code} 的数据")
+
+        df = df.reset_index().rename(columns={
+            'Date': 'date',
+            'Open': 'open',
+            'Close': 'close',
+            'High': 'high',
+            'Low': 'low',
+            'Volume': 'volume'
+        })[['date', 'open', 'close', 'high', 'low', 'volume']]
+        df_cleaned = df.dropna().sort_values('date')
+
+        if len(df_cleaned) < 60:
+            raise ValueError(f"数据不足（仅 {len(df_cleaned)} 行），无法计算至少60日均线")
+        return df_cleaned
+
+    def calculate_indicators(self, df: pd.DataFrame, outputs: Optional[List[str]] = None) -> pd.DataFrame:
         """
-        计算随机指标（Stochastic Oscillator）
-           %K = (close - lowest_low) / (highest_high - lowest_low)*100
-           %D 为 %K 的3日简单移动平均
+        计算技术指标，与Web服务使用同一套指标定义（IndicatorLibrary），
+        默认计算全部核心指标以及 OBV、随机指标和 ROC 扩展指标
+
+        Args:
+            df: 小写列名的日线数据
+            outputs: 需要的指标列，只计算这些指标及其依赖
         """
-        lowest = series_close.rolling(window=window, min_periods=window).min()
-        highest = series_close.rolling(window=window, min_periods=window).max()
-        percentK = (series_close - lowest) / (highest - lowest + 1e-10) * 100
-        percentD = percentK.rolling(window=3, min_periods=3).mean()
-        return percentK, percentD
-
-    def calculate_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
-        """计算所有技术指标，并增加 OBV 和随机指标"""
         try:
-            # 移动均线
-            for key, period in self.params.ma_periods.items():
-                df[f'MA{period}'] = self.calculate_ema(df['close'], period)
-            df['RSI'] = self.calculate_rsi(df['close'], self.params.rsi_period)
-            df['MACD'], df['Signal'], df['MACD_hist'] = self.calculate_macd(df['close'])
-            df['BB_upper'], df['BB_middle'], df['BB_lower'] = self.calculate_bollinger_bands(
-                df['close'], self.params.bollinger_period, self.params.bollinger_std)
-            df['Volume_MA'] = df['volume'].rolling(window=self.params.volume_ma_period,
-                                                   min_periods=self.params.volume_ma_period).mean()
-            df['Volume_Ratio'] = df['volume'] / (df['Volume_MA'] + 1e-10)
-            df['ATR'] = self.calculate_atr(df, self.params.atr_period)
-            df['Volatility'] = df['ATR'] / df['close'] * 100
-            df['ROC'] = df['close'].pct_change(periods=10) * 100
-
-            # 增加 OBV 指标
-            df['OBV'] = self.calculate_obv(df['close'], df['volume'])
-            df['OBV_MA10'] = df['OBV'].rolling(window=10, min_periods=10).mean()
-
-            # 增加随机指标 Stochastic
-            df['%K'], df['%D'] = self.calculate_stochastic(df['close'], window=14)
-
+            if outputs is None:
+                outputs = self.library.output_columns(include_extra=True)
+            values = self.library.evaluate_frame(df, outputs, kernels=self.kernels)
+            for name, array in values.items():
+                df[name] = array
             return df
 
         except Exception as e:
@@ -270,76 +229,46 @@ class StockAnalyzer:
 
     def calculate_score(self, df: pd.DataFrame) -> float:
         """
-        计算股票综合打分（基本打分满分100分），并根据 OBV 与随机指标调整±5分，
-        使量化结果更全面。
-        基本打分逻辑不变：
+        按评分规则集计算股票综合打分。默认的 scanner 规则集：
           趋势（30分）、RSI（20分）、MACD（20分）、成交量（30分）
         附加指标调整：
           OBV：OBV > OBV_MA10，+5分；反之，-5分；
           随机指标：%K < 20为超卖，+5分；%K > 80为超买，-5分。
         """
         try:
-            score = 0
-            latest = df.iloc[-1]
-            # 趋势打分
-            if latest['MA5'] > latest['MA20'] and latest['MA20'] > latest['MA60']:
-                score += 30
-            else:
-                if latest['MA5'] > latest['MA20']:
-                    score += 15
-                if latest['MA20'] > latest['MA60']:
-                    score += 15
-            # RSI 打分
-            if 30 <= latest['RSI'] <= 70:
-                score += 20
-            elif latest['RSI'] < 30:
-                score += 15
-            # MACD 打分
-            if latest['MACD'] > latest['Signal']:
-                score += 20
-            # 成交量打分
-            if latest['Volume_Ratio'] > 1.5:
-                score += 30
-            elif latest['Volume_Ratio'] > 1:
-                score += 15
-
-            # 附加 OBV 调整
-            if latest['OBV'] > latest['OBV_MA10']:
-                score += 5
-            else:
-                score -= 5
-
-            # 附加随机指标调整
-            if latest['%K'] < 20:
-                score += 5
-            elif latest['%K'] > 80:
-                score -= 5
-
-            return score
+            # 扫描数据的价格列为小写，规则集使用与指标库一致的首字母大写列名
+            latest = df.iloc[[-1]].rename(columns={name.lower(): name for name in INPUT_COLUMNS})
+            return int(self.rule_set.score(latest)[0])
 
         except Exception as e:
             self.logger.error(f"计算打分失败：{str(e)}")
             raise
 
-    @staticmethod
-    def get_recommendation(score: float) -> str:
+    def get_recommendation(self, score: float) -> str:
         """根据最终打分给出投资建议"""
-        if score >= 80:
-            return '强烈推荐买入'
-        elif score >= 60:
-            return '建议买入'
-        elif score >= 40:
-            return '建议观望'
-        elif score >= 20:
-            return '建议卖出'
-        else:
-            return '强烈建议卖出'
+        return str(self.rule_set.recommend(score).item())
+
+    def load_stock_data(self, stock_code: str) -> pd.DataFrame:
+        """获取分析所需的日线数据：有本地K线仓库时从仓库读取，否则请求 Tushare（不做速率限制）"""
+        if self.bar_store is not None:
+            return self.get_local_stock_data(stock_code)
+        return self.fetch_stock_data(stock_code)
 
     def analyze_stock(self, stock_code: str) -> Dict:
         """针对单只股票执行完整的技术分析流程"""
-        try:
+        if self.bar_store is not None:
+            df = self.get_local_stock_data(stock_code)
+        else:
             df = self.get_stock_data(stock_code)
-            df = self.calculate_indicators(df)
+        return self.analyze_data(stock_code, df)
+
+    def analyze_data(self, stock_code: str, df: pd.DataFrame) -> Dict:
+        """由已获取的日线数据计算指标与打分"""
+        try:
+            # 只计算打分用到的指标，跳过布林带、ATR、波动率等
+            outputs = [col for col in dict.fromkeys(self.SCORE_INDICATORS + self.rule_set.required_columns)
+                       if col not in INPUT_COLUMNS]
+            df = self.calculate_indicators(df, outputs=outputs)
             score = self.calculate_score(df)
             latest = df.iloc[-1]
             prev = df.iloc[-2]
@@ -366,50 +295,104 @@ class StockAnalyzer:
 class TopStockScanner:
     """全盘筛选高打分股票的扫描器"""
 
-    def __init__(self, max_workers: int = 20, min_score: float = 85):
+    def __init__(self, max_workers: Optional[int] = None, min_score: float = 85, use_bar_store: bool = False,
+                 backend: Optional[str] = None, rule_set: Optional[ScoringRuleSet] = None,
+                 fetch_workers: int = 4, run_id: Optional[str] = None, bulk_daily: bool = False,
+                 top: Optional[int] = None):
         """
         初始化扫描器
 
         Args:
-            max_workers: 并发线程数量（已增至20以加速分析）
+            max_workers: 指标计算与打分的线程数量，默认为CPU核数
             min_score: 高分最低阈值
+            use_bar_store: 是否使用本地K线仓库：先以一次全市场快照请求更新仓库，再从本地读取数据分析
+            backend: 滚动指标的计算后端，见 StockAnalyzer
+            rule_set: 评分规则集，默认为内置的 scanner 规则集
+            fetch_workers: 同时进行的数据请求数量，吞吐量由共享限速器的 Tushare 配额决定
+            run_id: 扫描批次标识，默认为启动时间；以同一 run_id 重新运行时从检查点继续，跳过已完成的股票
+            bulk_daily: 是否按交易日批量获取 Tushare 全市场日线与复权因子更新本地K线仓库（隐含 use_bar_store），
+                        请求次数与交易日数成正比而不是与股票数量成正比
+            top: 只保留评分最高的前 top 支高分股票，默认保留全部
         """
         self.logger = logging.getLogger(__name__)
-        # 初始化 Tushare API
-        if not TUSHARE_TOKEN:
-            self.logger.error("Tushare Token 未配置，请设置 TUSHARE_TOKEN 环境变量或直接在代码中提供。")
-            raise ValueError("Tushare Token not configured.")
-        ts.set_token(TUSHARE_TOKEN)
-        self.pro = ts.pro_api()
-        self.analyzer = StockAnalyzer(pro_api=self.pro) # 传递 pro 实例
+        self.use_bar_store = use_bar_store or bulk_daily
+        self.bulk_daily = bulk_daily
+        self.pro = None
+        if not self.use_bar_store or bulk_daily:
+            # 初始化 Tushare API
+            if not TUSHARE_TOKEN:
+                self.logger.error("Tushare Token 未配置，请设置 TUSHARE_TOKEN 环境变量或直接在代码中提供。")
+                raise ValueError("Tushare Token not configured.")
+            import tushare as ts
+            ts.set_token(TUSHARE_TOKEN)
+            self.pro = ts.pro_api()
+        if self.use_bar_store:
+            self.bar_store = BarStore()
+            self.analyzer = StockAnalyzer(pro_api=None, bar_store=self.bar_store, backend=backend,
+                                          rule_set=rule_set)
+        else:
+            self.analyzer = StockAnalyzer(pro_api=self.pro, backend=backend, rule_set=rule_set) # 传递 pro 实例
+        # 只读取本地K线仓库（快照模式）时没有 Tushare 接口，只使用本地已有的股票池、不刷新
+        self.universe = StockUniverse(pro_api=self.pro)
         self.max_workers = max_workers
+        self.fetch_workers = fetch_workers
         self.min_score = min_score
+        self.top = top
         self.logger = logging.getLogger(__name__)
-        # 创建带时间戳的输出目录
+        # 创建带时间戳的输出目录，继续之前的扫描时沿用原目录
         self.timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        self.output_dir = f'scanner/{self.timestamp}'
+        self.run_id = run_id or self.timestamp
+        self.output_dir = f'scanner/{self.run_id}'
+        self.checkpoint = ScanCheckpoint(self.run_id)
 
-    @on_exception(expo, RateLimitException, max_tries=5) # 添加指数退避和重试机制
-    @limits(calls=CALLS_PER_MINUTE, period=PERIOD_SECONDS) # 应用速率限制
-    def get_all_stocks(self) -> pd.DataFrame:
+    def get_local_stocks(self) -> List[str]:
+        """
+        以一次全市场快照请求更新本地K线仓库，返回仓库中需要分析的A股代码。
+        首次使用时仓库为空，所有股票会被逐只回补，之后每天只需要一次请求。
+        bulk_daily 模式下改为按交易日批量获取 Tushare 日线，首次约每个交易日2次请求，之后每天2次。
+        本地有股票池时只保留股票池中上市满 MIN_BARS 个交易日的股票，与 get_all_stocks 一致，
+        仓库中已退市股票的旧数据不再参与扫描；bulk_daily 模式下先刷新股票池（每天最多一次请求）
+        """
+        if self.bulk_daily:
+            stats = TushareBulkIngestor(pro_api=self.pro, bar_store=self.bar_store).sync()
+            self.logger.info(f"本地K线仓库已更新至 {stats['end_date']}，新获取 {stats['fetched_dates']} 个交易日，"
+                             f"写入 {stats['written']} 支")
+        else:
+            ingestor = MarketSnapshotIngestor(bar_store=self.bar_store)
+            stats = ingestor.run()
+            self.logger.info(f"本地K线仓库已更新至 {stats['trade_date']}，快照追加 {stats['appended']} 支，"
+                             f"回补 {len(stats['needs_backfill'])} 支")
+        all_codes = self.bar_store.list_codes('A')
+
+        if self.pro is not None:
+            try:
+                self.universe.refresh()
+            except Exception as e:
+                self.logger.warning(f"刷新股票池失败，使用本地已有的股票池：{str(e)}")
+        if not self.universe.table.empty:
+            listed = {code.split('.')[0] for code in self.universe.codes(min_bars=MIN_BARS)}
+            stored = len(all_codes)
+            all_codes = [code for code in all_codes if code in listed]
+            self.logger.info(f"本地K线仓库共 {stored} 支股票，在股票池中且上市满 {MIN_BARS} 个交易日的 {len(all_codes)} 支")
+        else:
+            self.logger.warning("本地股票池为空，分析K线仓库中的全部股票")
+
+        print(f"\n开始分析 {len(all_codes)} 支股票...")
+        return all_codes
+
+    def get_all_stocks(self) -> List[str]:
         """
         获取所有上市 A 股股票代码（全盘版）。
-        使用 ak.stock_info_sh_name_code(symbol="主板A股") 与 ak.stock_info_sz_name_code(symbol="A股列表")，
-        候选字段列表为：['A股代码', '证券代码', '股票代码', 'code'] 。
+        股票列表来自本地股票池，每天最多向 Tushare stock_basic 请求一次，并记录新上市和退市的股票；
+        上市不足60个交易日、无法计算60日均线的新股直接排除，不再为它们消耗限速配额。
         """
         try:
+            changes = self.universe.refresh()
+            if changes['listed'] or changes['delisted']:
+                self.logger.info(f"股票池变更：新上市 {changes['listed']}，退市 {changes['delisted']}")
 
-
-            # 获取所有A股列表
-            # fields 可以根据需要选择，这里选择了常用的字段
-            # self.pro.stock_basic() 返回所有股票的基本信息，包括上市和退市的
-            # list_status='L' 表示只获取上市状态的股票
-            all_stocks_df = self.pro.stock_basic(exchange='', list_status='L', fields='ts_code,symbol,name,area,industry,list_date')
-            if all_stocks_df.empty:
-                raise ValueError("未能从 Tushare 获取到股票列表数据")
-            
-            all_codes = sorted(all_stocks_df['ts_code'].tolist())
-            self.logger.info(f"完整股票列表获取到 {len(all_codes)} 支股票信息")
+            all_codes = sorted(self.universe.codes(min_bars=MIN_BARS))
+            self.logger.info(f"股票池共 {changes['total']} 支股票，上市满 {MIN_BARS} 个交易日的 {len(all_codes)} 支")
             print(f"\n开始分析 {len(all_codes)} 支股票...")
             return all_codes
 
@@ -417,43 +400,59 @@ class TopStockScanner:
             self.logger.error(f"获取股票列表失败：{str(e)}")
             raise
 
-    def analyze_stock_safe(self, stock_code: str, max_retries: int = 3) -> Optional[Dict]:
+    def scan(self, stock_codes: List[str]) -> List[Dict]:
         """
-        安全分析单只股票（加入重试机制），数据异常则跳过。
+        以流水线方式分析全部股票：数据获取按共享限速器的令牌桶匀速进行，计算与获取同时运行，
+        吞吐量等于 Tushare 配额；读取本地K线仓库时不限速。
+        每只股票的结果追加写入检查点，检查点中已完成的股票不再重复获取，其结果直接并入返回值
+
+        Args:
+            stock_codes: 股票代码列表
+
+        Returns:
+            分析成功的结果列表
         """
-        for attempt in range(max_retries):
-            try:
-                return self.analyzer.analyze_stock(stock_code)
-            except ValueError as e:
-                self.logger.warning(f"跳过股票 {stock_code}: {str(e)}")
-                return None
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    self.logger.error(f"股票 {stock_code} 分析尝试 {max_retries} 次后失败：{str(e)}")
-                    return None
-                self.logger.warning(f"股票 {stock_code} 第 {attempt+1} 次分析失败：{str(e)}")
-                time.sleep(random.uniform(2, 5))
-
-    def process_batch(self, stock_codes: List[str]) -> List[Dict]:
-        """利用多线程并行处理一批股票的分析任务"""
-        results = []
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = {executor.submit(self.analyze_stock_safe, code): code for code in stock_codes}
-            for future in tqdm(futures, desc="分析进度", ncols=80):
-                try:
-                    result = future.result()
-                    if result is not None:
-                        results.append(result)
-                except Exception as e:
-                    stock = futures[future]
-                    self.logger.error(f"处理股票 {stock} 时出错：{str(e)}")
+        results: List[Dict] = self.checkpoint.results(stock_codes)
+        pending = self.checkpoint.pending(stock_codes)
+        if len(pending) < len(stock_codes):
+            print(f"\n从检查点 {self.checkpoint.path} 继续：已完成 {len(stock_codes) - len(pending)} 支，"
+                  f"剩余 {len(pending)} 支")
+        progress = tqdm(total=len(pending), desc="分析进度", ncols=80)
+
+        def sink(outcome: Dict) -> None:
+            self.checkpoint.append(outcome)
+            progress.update(1)
+            if outcome['status'] != 'ok':
+                if outcome['error']:
+                    self.logger.warning(f"跳过股票 {outcome['stock_code']}: {outcome['error']}")
+                return
+            results.append(outcome['result'])
+            if len(results) % 100 == 0:
+                self.save_intermediate_results(results)
+
+        limiter = None if self.use_bar_store else get_rate_limiter().endpoint(PRO_BAR_ENDPOINT)
+        pipeline = ScanPipeline(
+            fetch=self.analyzer.load_stock_data,
+            compute=self.analyzer.analyze_data,
+            sink=sink,
+            limiter=limiter,
+            fetch_workers=self.fetch_workers,
+            compute_workers=self.max_workers,
+        )
+        try:
+            asyncio.run(pipeline.run(pending))
+        finally:
+            progress.close()
+            self.checkpoint.close()
+        if results:
+            self.save_intermediate_results(results)
         return results
 
     def save_intermediate_results(self, results: List[Dict]) -> None:
         """周期性保存中间结果，便于后续查看进度"""
         try:
             df = pd.DataFrame(results)
-            high_score_stocks = df[df['score'] >= self.min_score].sort_values('score', ascending=False)
+            high_score_stocks = self.rank_high_scores(df)
             output_lines = [
                 "=" * 80,
                 f"股票扫描中间结果 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
@@ -474,30 +473,23 @@ class TopStockScanner:
         except Exception as e:
             self.logger.error(f"保存中间结果失败：{str(e)}")
 
-    def get_high_score_stocks(self, batch_size: int = 20) -> List[Dict]:
+    def rank_high_scores(self, df: pd.DataFrame) -> pd.DataFrame:
+        """筛选得分不低于 min_score 的股票并按评分降序排列，指定 top 时只对前 top 支排序"""
+        high_score_stocks = df[df['score'] >= self.min_score]
+        scores = high_score_stocks['score'].to_numpy(dtype=float)
+        return high_score_stocks.iloc[StockScorer.top_k(scores, len(scores) if self.top is None else self.top)]
+
+    def get_high_score_stocks(self) -> List[Dict]:
         """扫描全盘股票，返回高打分结果列表"""
         try:
-            all_stocks = self.get_all_stocks()
-            total_stocks = len(all_stocks)
-            print(f"\n开始扫描 {total_stocks} 支股票……")
-            results = []
-            total_batches = (total_stocks + batch_size - 1) // batch_size
-
-            for i in range(0, total_stocks, batch_size):
-                batch_number = i // batch_size + 1
-                print(f"\r当前进度: 批次 {batch_number}/{total_batches}", end="")
-                batch = all_stocks[i:i + batch_size]
-                batch_results = self.process_batch(batch)
-                results.extend(batch_results)
-                if i + batch_size < total_stocks:
-                    time.sleep(random.uniform(3, 5))
-                if results and ((len(results) % 100 == 0) or (i + batch_size >= total_stocks)):
-                    self.save_intermediate_results(results)
+            all_stocks = self.get_local_stocks() if self.use_bar_store else self.get_all_stocks()
+            print(f"\n开始扫描 {len(all_stocks)} 支股票……")
+            results = self.scan(all_stocks)
             print("\n扫描结束！")
 
             if results:
                 df_results = pd.DataFrame(results)
-                high_score_stocks = df_results[df_results['score'] >= self.min_score].sort_values('score', ascending=False)
+                high_score_stocks = self.rank_high_scores(df_results)
                 formatted_results = []
                 for _, row in high_score_stocks.iterrows():
                     formatted_results.append({
@@ -613,10 +605,29 @@ def main():
     print("Market-Wide High-Score Stock Scanner".center(76))
     print("=" * 80)
 
-    scanner = TopStockScanner(max_workers=20)  # 已提升至20线程
+    parser = argparse.ArgumentParser(description="全盘筛选高打分股票")
+    parser.add_argument('--local-bars', action='store_true',
+                        help="先以一次全市场快照请求更新本地K线仓库，再从本地读取数据分析")
+    parser.add_argument('--tushare-bulk', action='store_true',
+                        help="按交易日批量获取 Tushare 全市场日线与复权因子更新本地K线仓库，再从本地读取数据分析")
+    parser.add_argument('--backend', choices=BACKENDS, default=None,
+                        help="滚动指标的计算后端，默认读取环境变量 INDICATOR_BACKEND")
+    parser.add_argument('--rules', default=None,
+                        help="评分规则集：内置规则集名称（web/scanner）或JSON规则文件路径，默认为 scanner")
+    parser.add_argument('--run-id', default=None,
+                        help="扫描批次标识，默认为启动时间；传入中断扫描的批次标识可从检查点继续")
+    parser.add_argument('--top', type=int, default=None,
+                        help="只保留评分最高的前 N 支高分股票，默认保留全部")
+    args = parser.parse_args()
+
+    rule_set = None
+    if args.rules:
+        rule_set = ScoringRuleSet.load(args.rules) if os.path.exists(args.rules) else ScoringRuleSet.builtin(args.rules)
+    scanner = TopStockScanner(use_bar_store=args.local_bars, backend=args.backend, rule_set=rule_set,
+                              run_id=args.run_id, bulk_daily=args.tushare_bulk, top=args.top)
     try:
-        print("\n开始全盘扫描股票……")
-        high_score_stocks = scanner.get_high_score_stocks(batch_size=20)
+        print(f"\n开始全盘扫描股票（批次 {scanner.run_id}，中断后可用 --run-id {scanner.run_id} 继续）……")
+        high_score_stocks = scanner.get_high_score_stocks()
         if not high_score_stocks:
             print("\n未找到得分大于等于85分的股票。")
             return
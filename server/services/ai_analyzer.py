@@ -14,6 +14,9 @@ import asyncio
 # 获取日志器
 logger = get_logger()
 
+# 提示词中附带的最近交易日数据条数
+RECENT_DATA_DAYS = 14
+
 class AIAnalyzer:
     """
     异步AI分析服务
@@ -41,7 +44,7 @@ class AIAnalyzer:
         
         logger.debug(f"初始化AIAnalyzer: API_URL={self.API_URL}, API_MODEL={self.API_MODEL}, API_KEY={'已提供' if self.API_KEY else '未提供'}, API_TIMEOUT={self.API_TIMEOUT}")
     
-    async def get_ai_analysis(self, df: pd.DataFrame, stock_code: str, market_type: str = 'A', stream: bool = False, stock_name: str = None, sector: str = None) -> AsyncGenerator[str, None]:
+    async def get_ai_analysis(self, df: pd.DataFrame, stock_code: str, market_type: str = 'A', stream: bool = False, stock_name: str = None, sector: str = None, concepts: list = None) -> AsyncGenerator[str, None]:
         """
         对股票数据进行AI分析 (使用手动迭代处理流)
         Args:
@@ -51,6 +54,7 @@ class AIAnalyzer:
             stream: Whether to stream the response.
             stock_name: Optional stock name.
             sector: Optional sector information.
+            concepts: Optional concept board names.
         """
         try:
             current_frame = inspect.currentframe()
@@ -82,7 +86,7 @@ class AIAnalyzer:
             macd_signal_type = 'BUY' if macd > macd_signal else 'SELL'
             volume_ratio = latest_data.get('Volume_Ratio', 1)
             volume_status = 'HIGH' if volume_ratio > 1.5 else ('LOW' if volume_ratio < 0.5 else 'NORMAL')
-            recent_data = df.tail(14).to_dict('records')
+            recent_data = df.tail(RECENT_DATA_DAYS).to_dict('records')
 
             # --- Safely create technical_summary ---
             technical_summary = {
@@ -130,8 +134,8 @@ class AIAnalyzer:
             else: # A股
                 # 获取概念板块信息
                 concept_info = ""
-                if hasattr(df, 'concepts') and df.concepts is not None and len(df.concepts) > 0:
-                    concept_info = f"\n股票题材和概念板块: {', '.join(df.concepts)}"
+                if concepts is not None and len(concepts) > 0:
+                    concept_info = f"\n股票题材和概念板块: {', '.join(concepts)}"
                     logger.debug(f"添加题材概念信息到提示中: {concept_info}")
                 
                 prompt = f"分析{prompt_intro_base}...{concept_info}\n技术指标概要: {technical_summary}\n近14日交易数据: {recent_data}\n请提供: 1.趋势分析(支撑压力位) 2.成交量分析 3.风险评估(波动率) 4.短期中期目标价 5.关键技术位 6.交易建议(止损) 7.相关题材概念分析"
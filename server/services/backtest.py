@@ -0,0 +1,274 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from server.utils.logger import get_logger
+from server.services.bar_store import BarStore
+from server.services.score_history import ScoreHistory
+from server.services.scoring_rules import ScoringRuleSet
+
+# 获取日志器
+logger = get_logger()
+
+# 年化使用的交易日数
+TRADING_DAYS = 252
+
+
+def ffill(values: np.ndarray) -> np.ndarray:
+    """按列向前填充NaN，每列开头的NaN保持不变"""
+    valid = ~np.isnan(values)
+    index = np.where(valid, np.arange(values.shape[0])[:, None], 0)
+    np.maximum.accumulate(index, axis=0, out=index)
+    return np.take_along_axis(values, index, axis=0)
+
+
+def load_close_matrix(bar_store: BarStore, market_type: str = 'A', codes: Optional[Iterable[str]] = None,
+                      start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
+    """
+    从本地K线仓库读取收盘价矩阵
+
+    Args:
+        bar_store: 本地K线仓库
+        market_type: 市场类型
+        codes: 股票代码，默认为仓库中的全部代码
+        start_date: 开始日期，格式YYYYMMDD
+        end_date: 结束日期，格式YYYYMMDD
+
+    Returns:
+        (日期 x 代码) 的收盘价矩阵，未上市或停牌的位置为NaN
+    """
+    codes = list(codes) if codes is not None else bar_store.list_codes(market_type)
+    closes: Dict[str, pd.Series] = {}
+    for code in codes:
+        df = bar_store.read(market_type, code, start_date, end_date)
+        if df is not None and not df.empty and 'Close' in df.columns:
+            closes[code] = df['Close']
+    if not closes:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name='Date'), dtype=float)
+    return pd.DataFrame(closes).sort_index().rename_axis('Date')
+
+
+@dataclass
+class BacktestResult:
+    """
+    回测结果
+
+    returns、equity、drawdown、turnover、positions 均以日期为索引；
+    第 t 天的收益来自第 t-1 天收盘时按评分确定的持仓
+    """
+    buy_threshold: float
+    sell_threshold: float
+    returns: pd.Series
+    equity: pd.Series
+    drawdown: pd.Series
+    turnover: pd.Series
+    positions: pd.Series
+    trades: int
+
+    @classmethod
+    def from_arrays(cls, buy_threshold: float, sell_threshold: float,
+                    result: Dict[str, Any], dates: pd.DatetimeIndex) -> 'BacktestResult':
+        """由 ScoreBacktest.run_arrays 的结果构建"""
+        returns = pd.Series(result['returns'], index=dates)
+        equity = (1 + returns).cumprod()
+        return cls(
+            buy_threshold=buy_threshold,
+            sell_threshold=sell_threshold,
+            returns=returns,
+            equity=equity,
+            drawdown=equity / equity.cummax() - 1,
+            turnover=pd.Series(result['turnover'], index=dates),
+            positions=pd.Series(result['positions'], index=dates),
+            trades=result['trades'],
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        """汇总指标：总收益、年化收益与波动、夏普比率、最大回撤、日均换手率、平均持仓数、开仓次数"""
+        days = len(self.returns)
+        total_return = float(self.equity.iloc[-1] - 1) if days else 0.0
+        annual_return = float((1 + total_return) ** (TRADING_DAYS / days) - 1) if days and total_return > -1 else -1.0
+        volatility = float(self.returns.std() * np.sqrt(TRADING_DAYS)) if days > 1 else 0.0
+        sharpe = float(self.returns.mean() / self.returns.std() * np.sqrt(TRADING_DAYS)) \
+            if days > 1 and self.returns.std() > 0 else 0.0
+        return {
+            'buy_threshold': self.buy_threshold,
+            'sell_threshold': self.sell_threshold,
+            'total_return': total_return,
+            'annual_return': annual_return,
+            'annual_volatility': volatility,
+            'sharpe': sharpe,
+            'max_drawdown': float(self.drawdown.min()) if days else 0.0,
+            'avg_turnover': float(self.turnover.mean()) if days else 0.0,
+            'avg_positions': float(self.positions.mean()) if days else 0.0,
+            'trades': self.trades,
+        }
+
+
+class ScoreBacktest:
+    """
+    评分策略回测
+    评分不低于买入阈值时买入、不高于卖出阈值时卖出，介于两者之间保持原状态；
+    停牌日不能买卖，最后一个有效收盘价（退市）当天强制卖出；
+    所有持仓等权，收盘价成交，全部股票的持仓与收益在 (日期 x 股票) 数组上一次计算
+    """
+
+    def __init__(self, buy_threshold: float = 80, sell_threshold: float = 40, cost: float = 0.0):
+        """
+        初始化回测
+
+        Args:
+            buy_threshold: 买入阈值，默认80分（web 规则集的“强烈推荐”）
+            sell_threshold: 卖出阈值，默认40分（低于“观望”）
+            cost: 单边交易成本（按换手金额的比例），如 0.0015
+        """
+        if sell_threshold > buy_threshold:
+            raise ValueError(f"卖出阈值 {sell_threshold} 不能高于买入阈值 {buy_threshold}")
+        self.buy_threshold = buy_threshold
+        self.sell_threshold = sell_threshold
+        self.cost = cost
+
+    def holdings(self, scores: np.ndarray, tradable: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        由评分计算每个交易日收盘后的持有状态
+
+        Args:
+            scores: (日期 x 股票) 评分数组，NaN（停牌或预热期）视为维持原状态
+            tradable: 同形状的布尔数组，为False的交易日（停牌、未上市）不能买卖，维持原状态
+
+        Returns:
+            同形状的布尔数组
+        """
+        with np.errstate(invalid='ignore'):
+            signal = np.where(scores >= self.buy_threshold, 1.0,
+                              np.where(scores <= self.sell_threshold, 0.0, np.nan))
+        if tradable is not None:
+            signal[~tradable] = np.nan
+        # 介于两个阈值之间沿用上一个信号，实现买卖阈值之间的滞回
+        return np.nan_to_num(ffill(signal)) > 0
+
+    def run_arrays(self, scores: np.ndarray, close: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        在对齐的数组上回测
+
+        Args:
+            scores: (日期 x 股票) 评分数组
+            close: 同形状的收盘价数组，NaN为停牌或未上市
+
+        Returns:
+            returns、turnover、positions 三个按日期的一维数组，以及开仓次数 trades
+        """
+        # 只在有收盘价的交易日买卖，停牌期间维持原持仓
+        valid = ~np.isnan(close)
+        held = self.holdings(scores, valid)
+        # 最后一个有效收盘价之后不再有价格（退市或停牌至区间结束），在该日收盘强制卖出
+        days = close.shape[0]
+        last = days - 1 - np.argmax(valid[::-1], axis=0)
+        ended = valid.any(axis=0) & (last < days - 1)
+        held &= ~(ended & (np.arange(days)[:, None] >= last))
+
+        # 停牌期间价格不变，复牌当天一次性计入停牌期间的涨跌
+        prices = ffill(close)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            asset_returns = np.zeros(prices.shape)
+            asset_returns[1:] = prices[1:] / prices[:-1] - 1
+        asset_returns = np.nan_to_num(asset_returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+        count = held.sum(axis=1)
+        weights = np.divide(held, count[:, None], out=np.zeros(held.shape), where=count[:, None] > 0)
+        # 第 t 天的收益由第 t-1 天收盘后的持仓获得
+        prev_weights = np.zeros(weights.shape)
+        prev_weights[1:] = weights[:-1]
+        gross = (prev_weights * asset_returns).sum(axis=1)
+
+        # 换手率按调仓前后的目标权重之差计算（不考虑持仓期间的价格漂移）
+        turnover = np.abs(weights - prev_weights).sum(axis=1)
+        returns = gross - self.cost * turnover
+
+        entries = held.copy()
+        entries[1:] &= ~held[:-1]
+        return {
+            'returns': returns,
+            'turnover': turnover,
+            'positions': count.astype(float),
+            'trades': int(entries.sum()),
+        }
+
+    def run(self, scores: pd.DataFrame, close: pd.DataFrame) -> BacktestResult:
+        """
+        回测评分矩阵
+
+        Args:
+            scores: (日期 x 代码) 评分矩阵，如 ScoreHistory.load() 的结果
+            close: (日期 x 代码) 收盘价矩阵，如 load_close_matrix() 的结果
+
+        Returns:
+            BacktestResult实例
+        """
+        dates = scores.index.intersection(close.index).sort_values()
+        codes = scores.columns.intersection(close.columns)
+        if len(dates) == 0 or len(codes) == 0:
+            raise ValueError("评分矩阵与收盘价矩阵没有重叠的日期或股票")
+        score_values = scores.loc[dates, codes].to_numpy(dtype=float)
+        close_values = close.loc[dates, codes].to_numpy(dtype=float)
+
+        result = self.run_arrays(score_values, close_values)
+        return BacktestResult.from_arrays(self.buy_threshold, self.sell_threshold, result, dates)
+
+
+def sweep_thresholds(scores: pd.DataFrame, close: pd.DataFrame, buy_thresholds: Sequence[float],
+                     sell_thresholds: Sequence[float], cost: float = 0.0,
+                     sort_by: str = 'sharpe') -> pd.DataFrame:
+    """
+    在同一评分矩阵上比较多组买卖阈值
+
+    Args:
+        scores: (日期 x 代码) 评分矩阵
+        close: (日期 x 代码) 收盘价矩阵
+        buy_thresholds: 买入阈值列表
+        sell_thresholds: 卖出阈值列表，高于买入阈值的组合被跳过
+        cost: 单边交易成本
+        sort_by: 排序所用的汇总指标，降序
+
+    Returns:
+        每组阈值的汇总指标表
+    """
+    rows: List[Dict[str, Any]] = []
+    for buy in buy_thresholds:
+        for sell in sell_thresholds:
+            if sell > buy:
+                continue
+            rows.append(ScoreBacktest(buy, sell, cost).run(scores, close).summary())
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+    return table.sort_values(sort_by, ascending=False, kind='stable').reset_index(drop=True)
+
+
+def main():
+    """命令行入口：读取本地历史评分矩阵与收盘价，回测评分阈值策略"""
+    parser = argparse.ArgumentParser(description="评分阈值策略回测")
+    parser.add_argument('--market', default='A', help="市场类型")
+    parser.add_argument('--rules', default='web', help="评分规则集：内置规则集名称或JSON规则文件路径")
+    parser.add_argument('--buy', type=float, nargs='+', default=[80], help="买入阈值，可传多个")
+    parser.add_argument('--sell', type=float, nargs='+', default=[40], help="卖出阈值，可传多个")
+    parser.add_argument('--cost', type=float, default=0.0, help="单边交易成本")
+    parser.add_argument('--start', default=None, help="开始日期 YYYYMMDD")
+    parser.add_argument('--end', default=None, help="结束日期 YYYYMMDD")
+    args = parser.parse_args()
+
+    rule_set = ScoringRuleSet.load(args.rules) if os.path.exists(args.rules) else ScoringRuleSet.builtin(args.rules)
+    score_history = ScoreHistory(rule_set=rule_set)
+    scores = score_history.load(args.market)
+    if scores is None:
+        print(f"没有历史评分矩阵，请先运行 score_history 生成: {args.market}/{rule_set.name}")
+        return
+    close = load_close_matrix(score_history.bar_store, args.market, scores.columns, args.start, args.end)
+    table = sweep_thresholds(scores, close, args.buy, args.sell, args.cost)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(table.to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+import os
+import json
+import threading
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Any
+from server.utils.logger import get_logger
+from server.services.shared_panel import SharedPanel
+
+# 获取日志器
+logger = get_logger()
+
+# 项目根目录（bar_store.py 位于 server/services/ 下）
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# 支持本地缓存的市场类型
+SUPPORTED_MARKETS = ('A', 'HK', 'US', 'ETF', 'LOF')
+
+# 各市场日线收盘的本地（北京）时间：(相对交易日的天数, 时:分)；美股收盘为北京时间次日凌晨，按冬令时取较晚的05:00
+MARKET_CLOSE_TIMES = {
+    'A': (0, '15:00'),
+    'ETF': (0, '15:00'),
+    'LOF': (0, '15:00'),
+    'HK': (0, '16:10'),
+    'US': (1, '05:00'),
+}
+
+
+class BarStore:
+    """
+    本地日线K线数据仓库
+    按 市场/代码 分区，以Parquet列式格式存储标准化后的OHLCV数据，
+    每个分区附带一个JSON元数据文件，记录已覆盖的日期范围和更新时间
+    """
+
+    def __init__(self, base_dir: Optional[str] = None, intraday_ttl: Optional[int] = None):
+        """
+        初始化K线数据仓库
+
+        Args:
+            base_dir: 数据根目录，默认读取环境变量 BAR_STORE_DIR，否则为 <项目根目录>/data/bars
+            intraday_ttl: 覆盖到今天的缓存的有效期（秒），盘中数据会变化，默认读取 BAR_STORE_TTL，否则为600秒
+        """
+        self.base_dir = base_dir or os.getenv('BAR_STORE_DIR', os.path.join(BASE_DIR, 'data', 'bars'))
+        self.intraday_ttl = intraday_ttl if intraday_ttl is not None else int(os.getenv('BAR_STORE_TTL', 600))
+        self._lock = threading.Lock()
+        logger.debug(f"初始化BarStore，数据目录: {self.base_dir}, 当日缓存有效期: {self.intraday_ttl}秒")
+
+    @staticmethod
+    def normalize_date(date_str: Optional[str]) -> Optional[str]:
+        """将日期统一为YYYYMMDD格式"""
+        if date_str is None:
+            return None
+        return str(date_str).replace('-', '')[:8]
+
+    def _partition_dir(self, market_type: str) -> str:
+        """获取市场分区目录"""
+        if market_type not in SUPPORTED_MARKETS:
+            raise ValueError(f"不支持的市场类型: {market_type}")
+        return os.path.join(self.base_dir, market_type)
+
+    def _data_path(self, market_type: str, stock_code: str) -> str:
+        """获取K线数据文件路径"""
+        return os.path.join(self._partition_dir(market_type), f"{stock_code}.parquet")
+
+    def _meta_path(self, market_type: str, stock_code: str) -> str:
+        """获取元数据文件路径"""
+        return os.path.join(self._partition_dir(market_type), f"{stock_code}.json")
+
+    def exists(self, market_type: str, stock_code: str) -> bool:
+        """判断本地是否存在该代码的K线数据"""
+        return os.path.exists(self._data_path(market_type, stock_code))
+
+    def list_codes(self, market_type: str) -> List[str]:
+        """列出本地已存储K线数据的全部代码"""
+        partition_dir = self._partition_dir(market_type)
+        if not os.path.isdir(partition_dir):
+            return []
+        return sorted(name[:-len('.parquet')] for name in os.listdir(partition_dir) if name.endswith('.parquet'))
+
+    def read_meta(self, market_type: str, stock_code: str) -> Optional[Dict[str, Any]]:
+        """
+        读取元数据
+
+        Returns:
+            包含 start、end（YYYYMMDD）和 updated_at（ISO时间）的字典，不存在时返回None
+        """
+        meta_path = self._meta_path(market_type, stock_code)
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"读取K线元数据失败 {market_type}/{stock_code}: {str(e)}")
+            return None
+
+    @staticmethod
+    def close_time(market_type: str, trade_date: str) -> datetime:
+        """交易日收盘的本地时间，此后写入的该日K线不会再变化"""
+        days, close = MARKET_CLOSE_TIMES[market_type]
+        return datetime.strptime(f"{trade_date} {close}", '%Y%m%d %H:%M') + timedelta(days=days)
+
+    def is_fresh(self, market_type: str, stock_code: str,
+                 start_date: str, end_date: str) -> bool:
+        """
+        判断本地缓存是否完整覆盖请求的日期范围且未过期
+
+        Args:
+            market_type: 市场类型
+            stock_code: 股票代码
+            start_date: 开始日期，格式YYYYMMDD
+            end_date: 结束日期，格式YYYYMMDD
+
+        Returns:
+            缓存可直接使用时返回True
+        """
+        meta = self.read_meta(market_type, stock_code)
+        if not meta or not self.exists(market_type, stock_code):
+            return False
+
+        start_date = self.normalize_date(start_date)
+        end_date = self.normalize_date(end_date)
+        if meta.get('start', '99999999') > start_date or meta.get('end', '00000000') < end_date:
+            return False
+
+        # 在请求的结束日收盘后写入的数据不会再变化；盘中写入的数据可能包含未完成的K线，
+        # 即使结束日已经过去也要在有效期后重新获取
+        updated_at = datetime.fromisoformat(meta['updated_at'])
+        if updated_at >= self.close_time(market_type, end_date):
+            return True
+        return (datetime.now() - updated_at).total_seconds() < self.intraday_ttl
+
+    def read(self, market_type: str, stock_code: str,
+             start_date: Optional[str] = None,
+             end_date: Optional[str] = None) -> Optional[pd.DataFrame]:
+        """
+        读取本地K线数据
+
+        Args:
+            market_type: 市场类型
+            stock_code: 股票代码
+            start_date: 开始日期，格式YYYYMMDD，为空时不限制
+            end_date: 结束日期，格式YYYYMMDD，为空时不限制
+
+        Returns:
+            以日期为索引、按日期升序排列的DataFrame，不存在时返回None
+        """
+        data_path = self._data_path(market_type, stock_code)
+        if not os.path.exists(data_path):
+            return None
+        try:
+            df = pd.read_parquet(data_path)
+        except Exception as e:
+            logger.warning(f"读取本地K线数据失败 {market_type}/{stock_code}: {str(e)}")
+            return None
+
+        if start_date:
+            df = df[df.index >= pd.to_datetime(self.normalize_date(start_date), format='%Y%m%d')]
+        if end_date:
+            df = df[df.index <= pd.to_datetime(self.normalize_date(end_date), format='%Y%m%d')]
+        return df
+
+    def write(self, market_type: str, stock_code: str, df: pd.DataFrame,
+              start_date: str, end_date: str) -> None:
+        """
+        写入K线数据（整体替换）并更新元数据
+
+        Args:
+            market_type: 市场类型
+            stock_code: 股票代码
+            df: 以日期为索引的标准化K线数据
+            start_date: 本次数据覆盖的开始日期，格式YYYYMMDD
+            end_date: 本次数据覆盖的结束日期，格式YYYYMMDD
+        """
+        with self._lock:
+            self._write_unlocked(market_type, stock_code, df, start_date, end_date)
+
+    def _write_unlocked(self, market_type: str, stock_code: str, df: pd.DataFrame,
+                        start_date: str, end_date: str) -> None:
+        """写入K线数据和元数据，调用方需持有 self._lock"""
+        partition_dir = self._partition_dir(market_type)
+        data_path = self._data_path(market_type, stock_code)
+        meta = {
+            'start': self.normalize_date(start_date),
+            'end': self.normalize_date(end_date),
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+            'rows': len(df)
+        }
+
+        df = df.sort_index().rename_axis('Date')
+
+        os.makedirs(partition_dir, exist_ok=True)
+        # 先写临时文件再替换，避免并发读取到写了一半的文件
+        tmp_data_path = f"{data_path}.{os.getpid()}.tmp"
+        df.to_parquet(tmp_data_path)
+        os.replace(tmp_data_path, data_path)
+
+        meta_path = self._meta_path(market_type, stock_code)
+        tmp_meta_path = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp_meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_meta_path, meta_path)
+
+        logger.debug(f"已写入本地K线数据 {market_type}/{stock_code}, 数据点数: {len(df)}, 覆盖范围: {meta['start']}-{meta['end']}")
+
+    def append(self, market_type: str, stock_code: str, df: pd.DataFrame, end_date: str) -> None:
+        """
+        将新的K线追加到已有数据之后，同一日期以新数据为准；
+        读取、合并和写入在同一把锁内完成，同时追加同一代码的线程不会互相覆盖
+
+        Args:
+            market_type: 市场类型
+            stock_code: 股票代码
+            df: 以日期为索引的标准化K线数据
+            end_date: 追加后数据覆盖的结束日期，格式YYYYMMDD
+        """
+        with self._lock:
+            meta = self.read_meta(market_type, stock_code)
+            cached = self.read(market_type, stock_code)
+            if meta is None or cached is None:
+                raise ValueError(f"本地不存在K线数据，无法追加: {market_type}/{stock_code}")
+
+            combined = pd.concat([cached[~cached.index.isin(df.index)], df])
+            end_date = max(meta['end'], self.normalize_date(end_date))
+            self._write_unlocked(market_type, stock_code, combined, meta['start'], end_date)
+
+    def read_frames(self, market_type: str, fields: Sequence[str] = SharedPanel.FIELDS,
+                    codes: Optional[Iterable[str]] = None, start_date: Optional[str] = None,
+                    end_date: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+        """
+        读取多只股票的K线，按字段组织为 (日期 x 代码) 矩阵
+
+        Args:
+            market_type: 市场类型
+            fields: 需要的字段，缺少任一字段的股票被跳过
+            codes: 股票代码，默认为本地的全部代码
+            start_date: 开始日期，格式YYYYMMDD
+            end_date: 结束日期，格式YYYYMMDD
+
+        Returns:
+            字段名 -> DataFrame，未上市或停牌的位置为NaN
+        """
+        codes = list(codes) if codes is not None else self.list_codes(market_type)
+        columns: Dict[str, Dict[str, pd.Series]] = {name: {} for name in fields}
+        for code in codes:
+            df = self.read(market_type, code, start_date, end_date)
+            if df is None or df.empty or any(name not in df.columns for name in fields):
+                continue
+            for name in fields:
+                columns[name][code] = df[name]
+        return {name: pd.DataFrame(series, dtype=float).sort_index().rename_axis('Date')
+                for name, series in columns.items()}
+
+    def _panel_dir(self, market_type: str) -> str:
+        """获取内存映射价格面板目录"""
+        if market_type not in SUPPORTED_MARKETS:
+            raise ValueError(f"不支持的市场类型: {market_type}")
+        return os.path.join(self.base_dir, '_panels', market_type)
+
+    def materialize_panel(self, market_type: str, codes: Optional[Iterable[str]] = None,
+                          start_date: Optional[str] = None, end_date: Optional[str] = None,
+                          memmap: bool = False) -> SharedPanel:
+        """
+        把全市场K线物化为按交易日对齐的价格面板，供多进程零拷贝附加
+
+        Args:
+            market_type: 市场类型
+            codes: 股票代码，默认为本地的全部代码
+            start_date: 开始日期，格式YYYYMMDD
+            end_date: 结束日期，格式YYYYMMDD
+            memmap: 为True时写入 <数据根目录>/_panels/<市场>/ 下的内存映射 .npy 文件（可被其他进程
+                    用 open_panel 直接打开），否则放入共享内存（调用方负责 close）
+
+        Returns:
+            SharedPanel实例
+        """
+        frames = self.read_frames(market_type, SharedPanel.FIELDS, codes, start_date, end_date)
+        directory = self._panel_dir(market_type) if memmap else None
+        with self._lock:
+            return SharedPanel.from_frames(frames, directory)
+
+    def open_panel(self, market_type: str) -> Optional[SharedPanel]:
+        """打开已物化的内存映射价格面板，不存在时返回None"""
+        return SharedPanel.open(self._panel_dir(market_type))
+
+    def delete(self, market_type: str, stock_code: str) -> None:
+        """删除本地K线数据及元数据"""
+        for path in (self._data_path(market_type, stock_code), self._meta_path(market_type, stock_code)):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,206 @@
+import os
+import time
+import random
+import argparse
+import threading
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+from server.utils.logger import get_logger
+from server.utils.rate_limiter import LimitedModule
+
+# 获取日志器
+logger = get_logger()
+
+# 项目根目录（concept_crawler.py 位于 server/services/ 下）
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# 概念板块接口所在主机
+EASTMONEY_HOST = 'push2.eastmoney.com'
+
+# 成份股表的列
+MEMBERSHIP_COLUMNS = ['board_code', 'board_name', 'stock_code']
+
+
+class HostRateLimiter:
+    """
+    按主机限速
+    保证同一主机的相邻两次请求间隔不小于 1/每秒请求数，可在多线程中共享
+    """
+
+    def __init__(self, requests_per_second: float):
+        """
+        初始化限速器
+
+        Args:
+            requests_per_second: 每个主机每秒最多请求次数
+        """
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host: str) -> None:
+        """阻塞直到可以向该主机发起下一次请求"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+
+
+class ConceptBoardCrawler:
+    """
+    概念板块成份股爬虫
+    使用有界线程池并发抓取所有概念板块的成份股，带按主机限速和指数退避重试，
+    最终合并为一张 (board_code, board_name, stock_code) 成份股表
+    """
+
+    def __init__(self, max_workers: Optional[int] = None,
+                 requests_per_second: Optional[float] = None,
+                 max_retries: int = 3,
+                 backoff_base: float = 1.0,
+                 output_path: Optional[str] = None,
+                 max_failed_ratio: Optional[float] = None):
+        """
+        初始化爬虫
+
+        Args:
+            max_workers: 并发线程数，默认读取环境变量 CONCEPT_CRAWLER_WORKERS，否则为8
+            requests_per_second: 每秒最多请求次数，默认读取 CONCEPT_CRAWLER_RPS，否则为5
+            max_retries: 单个板块的最大尝试次数
+            backoff_base: 指数退避的基础等待秒数
+            output_path: 成份股表输出路径，默认为 <项目根目录>/data/concepts/membership.parquet
+            max_failed_ratio: 允许失败的板块比例，超过时不替换已有的成份股表，
+                默认读取 CONCEPT_CRAWLER_MAX_FAILED_RATIO，否则为0.5
+        """
+        self.max_workers = max_workers or int(os.getenv('CONCEPT_CRAWLER_WORKERS', 8))
+        if requests_per_second is None:
+            requests_per_second = float(os.getenv('CONCEPT_CRAWLER_RPS', 5))
+        self.limiter = HostRateLimiter(requests_per_second)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.output_path = output_path or os.path.join(BASE_DIR, 'data', 'concepts', 'membership.parquet')
+        if max_failed_ratio is None:
+            max_failed_ratio = float(os.getenv('CONCEPT_CRAWLER_MAX_FAILED_RATIO', 0.5))
+        self.max_failed_ratio = max_failed_ratio
+        self.last_stats: Dict[str, Any] = {}
+
+        logger.debug(f"初始化ConceptBoardCrawler，并发数: {self.max_workers}, 每秒请求数: {requests_per_second}")
+
+    def _call_with_retry(self, func: Callable[..., pd.DataFrame], description: str, **kwargs) -> pd.DataFrame:
+        """
+        限速并带指数退避重试地调用数据接口
+
+        Args:
+            func: akshare 接口函数
+            description: 用于日志的调用描述
+            **kwargs: 接口参数
+
+        Returns:
+            接口返回的DataFrame
+        """
+        for attempt in range(1, self.max_retries + 1):
+            self.limiter.acquire(EASTMONEY_HOST)
+            try:
+                return func(**kwargs)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                wait = self.backoff_base * (2 ** (attempt - 1)) * random.uniform(1.0, 1.5)
+                logger.warning(f"{description} 第 {attempt} 次请求失败: {str(e)}，{wait:.1f}秒后重试")
+                time.sleep(wait)
+
+    def _fetch_board(self, board_code: str, board_name: str) -> pd.DataFrame:
+        """抓取单个概念板块的成份股"""
+        import akshare as ak
+        ak = LimitedModule(ak, 'akshare')
+
+        cons_df = self._call_with_retry(ak.stock_board_concept_cons_em, f"概念板块 {board_name}", symbol=board_code)
+        return pd.DataFrame({
+            'board_code': board_code,
+            'board_name': board_name,
+            'stock_code': cons_df['代码'].astype(str).to_numpy()
+        }, columns=MEMBERSHIP_COLUMNS)
+
+    def crawl(self) -> pd.DataFrame:
+        """
+        并发抓取所有概念板块的成份股并写入合并后的成份股表
+
+        抓取结果为空或失败板块比例超过 max_failed_ratio 时（通常是数据源限流或不可用），
+        不替换已有的成份股表
+
+        Returns:
+            包含 board_code、board_name、stock_code 列的成份股表
+
+        Raises:
+            ValueError: 抓取结果为空或失败板块过多
+        """
+        import akshare as ak
+        ak = LimitedModule(ak, 'akshare')
+
+        start_time = time.monotonic()
+        boards_df = self._call_with_retry(ak.stock_board_concept_name_em, "概念板块列表")
+        boards = list(zip(boards_df['代码'].astype(str), boards_df['板块名称'].astype(str)))
+        total = len(boards)
+        logger.info(f"开始抓取 {total} 个概念板块的成份股，并发数: {self.max_workers}")
+
+        frames: List[pd.DataFrame] = []
+        failed: List[str] = []
+        progress_step = max(1, total // 10)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="concept-crawler") as executor:
+            futures = {executor.submit(self._fetch_board, code, name): name for code, name in boards}
+            for done, future in enumerate(as_completed(futures), 1):
+                board_name = futures[future]
+                try:
+                    frames.append(future.result())
+                except Exception as e:
+                    failed.append(board_name)
+                    logger.warning(f"获取概念板块 {board_name} 成份股失败: {str(e)}")
+                if done % progress_step == 0 or done == total:
+                    logger.info(f"概念板块抓取进度: {done}/{total}，已耗时 {time.monotonic() - start_time:.1f}秒")
+
+        membership = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=MEMBERSHIP_COLUMNS)
+        elapsed = time.monotonic() - start_time
+        self.last_stats = {
+            'boards': total,
+            'failed_boards': failed,
+            'rows': len(membership),
+            'elapsed_seconds': round(elapsed, 2)
+        }
+        if membership.empty or len(failed) > total * self.max_failed_ratio:
+            raise ValueError(f"概念板块抓取失败过多（{len(failed)}/{total} 个板块失败，成份记录数: {len(membership)}），"
+                             f"保留现有成份股表")
+        self._write(membership)
+
+        logger.info(f"概念板块抓取完成，板块数: {total}, 失败: {len(failed)}, 成份记录数: {len(membership)}, 总耗时: {elapsed:.1f}秒")
+        return membership
+
+    def _write(self, membership: pd.DataFrame) -> None:
+        """写入成份股表，先写临时文件再替换"""
+        os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
+        tmp_path = f"{self.output_path}.{os.getpid()}.tmp"
+        membership.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self.output_path)
+
+
+def main():
+    """命令行入口：重建概念板块索引，便于在收盘后定时执行"""
+    from server.services.concept_index import get_concept_index
+
+    parser = argparse.ArgumentParser(description="并发抓取概念板块成份股并重建概念板块索引")
+    parser.add_argument('--workers', type=int, default=None, help="并发线程数")
+    parser.add_argument('--rps', type=float, default=None, help="每秒最多请求次数")
+    args = parser.parse_args()
+
+    crawler = ConceptBoardCrawler(max_workers=args.workers, requests_per_second=args.rps)
+    index = get_concept_index()
+    index.crawler = crawler
+    index.rebuild()
+    print(crawler.last_stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import os
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from server.utils.logger import get_logger
+from server.services.concept_crawler import ConceptBoardCrawler
+
+# 获取日志器
+logger = get_logger()
+
+# 项目根目录（concept_index.py 位于 server/services/ 下）
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+class ConceptIndex:
+    """
+    概念板块倒排索引
+    维护 股票代码 -> 所属概念板块列表 的映射，持久化到本地JSON文件，
+    过期后在后台线程中重建，查询时只做一次字典读取；
+    重建失败后按指数退避等待一段时间再重试，避免数据源不可用时每次查询都重新抓取
+    """
+
+    def __init__(self, path: Optional[str] = None, max_age_hours: Optional[float] = None,
+                 crawler: Optional[ConceptBoardCrawler] = None, retry_minutes: Optional[float] = None):
+        """
+        初始化概念板块索引
+
+        Args:
+            path: 索引文件路径，默认读取环境变量 CONCEPT_INDEX_PATH，否则为 <项目根目录>/data/concepts/concept_index.json
+            max_age_hours: 索引有效期（小时），默认读取 CONCEPT_INDEX_MAX_AGE_HOURS，否则为24小时
+            crawler: 成份股爬虫，默认使用环境变量配置的并发爬虫
+            retry_minutes: 重建失败后首次重试的等待时间（分钟），连续失败时逐次翻倍、最长为索引有效期，
+                默认读取 CONCEPT_INDEX_RETRY_MINUTES，否则为30分钟
+        """
+        self.path = path or os.getenv('CONCEPT_INDEX_PATH', os.path.join(BASE_DIR, 'data', 'concepts', 'concept_index.json'))
+        if max_age_hours is None:
+            max_age_hours = float(os.getenv('CONCEPT_INDEX_MAX_AGE_HOURS', 24))
+        self.max_age = timedelta(hours=max_age_hours)
+        self.crawler = crawler or ConceptBoardCrawler()
+        if retry_minutes is None:
+            retry_minutes = float(os.getenv('CONCEPT_INDEX_RETRY_MINUTES', 30))
+        self.retry_delay = timedelta(minutes=retry_minutes)
+
+        self._index: Dict[str, List[str]] = {}
+        self._updated_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        # 最近一次重建失败的时间和连续失败次数，用于退避
+        self._failed_at: Optional[datetime] = None
+        self._failures = 0
+
+        self._load()
+        logger.debug(f"初始化ConceptIndex，索引文件: {self.path}, 股票数: {len(self._index)}")
+
+    @property
+    def updated_at(self) -> Optional[datetime]:
+        """索引最近一次构建的时间"""
+        return self._updated_at
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, stock_code: str) -> List[str]:
+        """
+        查询股票所属的概念板块
+
+        Args:
+            stock_code: 纯数字股票代码，例如 000001
+
+        Returns:
+            概念板块名称列表，索引中不存在时返回空列表
+        """
+        return list(self._index.get(stock_code, []))
+
+    def is_stale(self) -> bool:
+        """判断索引是否不存在或已过期"""
+        if self._updated_at is None:
+            return True
+        return datetime.now() - self._updated_at > self.max_age
+
+    def in_backoff(self) -> bool:
+        """判断是否处于重建失败后的退避期内"""
+        if self._failed_at is None:
+            return False
+        return datetime.now() - self._failed_at < self._backoff()
+
+    def _backoff(self) -> timedelta:
+        """当前连续失败次数对应的退避时长"""
+        return min(self.retry_delay * (2 ** (self._failures - 1)), self.max_age)
+
+    def is_refreshing(self) -> bool:
+        """判断后台重建是否正在进行"""
+        return self._refresh_thread is not None and self._refresh_thread.is_alive()
+
+    def ensure_fresh(self) -> bool:
+        """
+        索引过期时在后台线程中重建，不阻塞调用方；上次重建失败后的退避期内不重建
+
+        Returns:
+            本次调用是否启动了新的后台重建
+        """
+        if not self.is_stale() or self.in_backoff():
+            return False
+        with self._lock:
+            if self.is_refreshing():
+                return False
+            self._refresh_thread = threading.Thread(target=self._refresh_safe, name="concept-index-refresh", daemon=True)
+            self._refresh_thread.start()
+        logger.info("概念板块索引不存在或已过期，已启动后台重建")
+        return True
+
+    def _refresh_safe(self) -> None:
+        """后台线程入口，捕获所有异常避免线程静默退出，未能更新索引时记录失败时间以便退避"""
+        updated_at = self._updated_at
+        try:
+            self.rebuild()
+        except Exception as e:
+            logger.error(f"后台重建概念板块索引失败: {str(e)}")
+            logger.exception(e)
+        if self._updated_at != updated_at:
+            self._failed_at = None
+            self._failures = 0
+            return
+        self._failed_at = datetime.now()
+        self._failures += 1
+        logger.warning(f"概念板块索引连续 {self._failures} 次重建失败，"
+                       f"{self._backoff().total_seconds() / 60:.0f}分钟内不再重试")
+
+    def rebuild(self) -> None:
+        """同步重建索引并持久化"""
+        start_time = datetime.now()
+        memberships = self._crawl_memberships()
+        if not memberships:
+            logger.warning("未抓取到任何概念板块成份股，保留现有索引")
+            return
+        self.replace(memberships)
+        elapsed = (datetime.now() - start_time).total_seconds()
+        logger.info(f"概念板块索引重建完成，股票数: {len(self._index)}, 成份记录数: {len(memberships)}, 耗时: {elapsed:.1f}秒")
+
+    def replace(self, memberships: List[Tuple[str, str]]) -> None:
+        """
+        用新的成份股记录替换索引并持久化
+
+        Args:
+            memberships: (股票代码, 概念板块名称) 记录列表
+        """
+        index: Dict[str, List[str]] = {}
+        for stock_code, concept_name in memberships:
+            concepts = index.setdefault(stock_code, [])
+            if concept_name not in concepts:
+                concepts.append(concept_name)
+
+        updated_at = datetime.now()
+        self._save(index, updated_at)
+        # 整体替换引用，读取方无需加锁
+        self._index = index
+        self._updated_at = updated_at
+
+    def _crawl_memberships(self) -> List[Tuple[str, str]]:
+        """
+        并发抓取所有概念板块的成份股
+
+        Returns:
+            (股票代码, 概念板块名称) 记录列表
+        """
+        membership = self.crawler.crawl()
+        return list(zip(membership['stock_code'], membership['board_name']))
+
+    def _load(self) -> None:
+        """从本地文件加载索引"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._index = data.get('index', {})
+            self._updated_at = datetime.fromisoformat(data['updated_at'])
+        except Exception as e:
+            logger.warning(f"加载概念板块索引失败，将重新构建: {str(e)}")
+            self._index = {}
+            self._updated_at = None
+
+    def _save(self, index: Dict[str, List[str]], updated_at: datetime) -> None:
+        """持久化索引，先写临时文件再替换"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'updated_at': updated_at.isoformat(timespec='seconds'), 'index': index}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+_default_index: Optional[ConceptIndex] = None
+_default_index_lock = threading.Lock()
+
+
+def get_concept_index() -> ConceptIndex:
+    """获取进程内共享的概念板块索引，避免每个请求重复加载和重复重建"""
+    global _default_index
+    if _default_index is None:
+        with _default_index_lock:
+            if _default_index is None:
+                _default_index = ConceptIndex()
+    return _default_index
@@ -2,6 +2,7 @@ import asyncio
 import pandas as pd
 from typing import List, Dict, Any
 from server.utils.logger import get_logger
+from server.utils.rate_limiter import LimitedModule
 from datetime import datetime, timedelta
 
 # 获取日志器
@@ -121,6 +122,7 @@ class FundServiceAsync:
             包含ETF数据的DataFrame
         """
         import akshare as ak
+        ak = LimitedModule(ak, 'akshare')
         
         try:
             # 获取ETF基金数据
@@ -154,6 +156,7 @@ class FundServiceAsync:
             包含LOF数据的DataFrame
         """
         import akshare as ak
+        ak = LimitedModule(ak, 'akshare')
         
         try:
             # 获取LOF基金数据
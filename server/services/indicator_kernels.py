@@ -0,0 +1,289 @@
+import os
+import numpy as np
+import pandas as pd
+from typing import Callable, Optional, Tuple
+from server.utils.logger import get_logger
+
+# 获取日志器
+logger = get_logger()
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    numba = None
+    NUMBA_AVAILABLE = False
+
+# 支持的指标计算后端：pandas 为 Series 滚动计算，numpy 为向量化数组计算，
+# numba 为编译后的单遍循环，auto 在安装了 numba 时使用 numba，否则使用 numpy
+BACKENDS = ('pandas', 'numpy', 'numba', 'auto')
+# 默认后端，可通过环境变量 INDICATOR_BACKEND 配置
+DEFAULT_BACKEND = os.getenv('INDICATOR_BACKEND', 'pandas')
+
+
+# -------------------------------
+# NumPy 向量化实现
+# -------------------------------
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    按列计算滚动均值，窗口内存在缺失值时结果为NaN（与 pandas rolling(window).mean() 一致）
+
+    Args:
+        values: 一维数组，或 (日期 x 股票) 二维数组
+        window: 窗口长度
+
+    Returns:
+        与输入同形状的数组
+    """
+    out = np.full(values.shape, np.nan)
+    if window > values.shape[0]:
+        return out
+    valid = ~np.isnan(values)
+    csum = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    ccount = np.cumsum(valid, axis=0)
+
+    sums = csum[window - 1:].copy()
+    sums[1:] -= csum[:-window]
+    counts = ccount[window - 1:].copy()
+    counts[1:] -= ccount[:-window]
+    out[window - 1:] = np.where(counts == window, sums / window, np.nan)
+    return out
+
+
+def rolling_std(values: np.ndarray, window: int, ddof: int = 1) -> np.ndarray:
+    """
+    按列计算滚动标准差（样本标准差，与 pandas rolling(window).std() 一致）
+
+    先减去每列第一个有效值再累加，降低平方和相减带来的精度损失
+
+    Args:
+        values: 一维数组，或 (日期 x 股票) 二维数组
+        window: 窗口长度
+        ddof: 自由度修正
+
+    Returns:
+        与输入同形状的数组
+    """
+    out = np.full(values.shape, np.nan)
+    if window > values.shape[0] or window <= ddof:
+        return out
+    valid = ~np.isnan(values)
+    first_valid = np.argmax(valid, axis=0)
+    if values.ndim == 1:
+        offset = np.nan_to_num(values[first_valid])
+    else:
+        offset = np.nan_to_num(values[first_valid, np.arange(values.shape[1])])
+    shifted = np.where(valid, values - offset, 0.0)
+
+    csum = np.cumsum(shifted, axis=0)
+    csq = np.cumsum(shifted * shifted, axis=0)
+    ccount = np.cumsum(valid, axis=0)
+
+    sums = csum[window - 1:].copy()
+    sums[1:] -= csum[:-window]
+    squares = csq[window - 1:].copy()
+    squares[1:] -= csq[:-window]
+    counts = ccount[window - 1:].copy()
+    counts[1:] -= ccount[:-window]
+
+    variance = np.maximum((squares - sums * sums / window) / (window - ddof), 0.0)
+    out[window - 1:] = np.where(counts == window, np.sqrt(variance), np.nan)
+    return out
+
+
+def shift(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    """按列向后平移，前面补NaN"""
+    out = np.full(values.shape, np.nan)
+    if periods < values.shape[0]:
+        out[periods:] = values[:-periods]
+    return out
+
+
+def true_range(high, low, prev_close):
+    """真实波幅，前一日收盘价缺失（第一根K线）时为最高价减最低价；数组与标量均可"""
+    return np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+
+def _numpy_rolling_mean_std(values: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """滚动均值和样本标准差"""
+    return rolling_mean(values, window), rolling_std(values, window)
+
+
+def _numpy_atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> np.ndarray:
+    """真实波幅的滚动均值，第一根K线的真实波幅为最高价减最低价"""
+    return rolling_mean(true_range(high, low, shift(close)), period)
+
+
+# -------------------------------
+# pandas 实现（与原有 Series 计算逐位一致）
+# -------------------------------
+def _pandas_rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """滚动均值"""
+    return pd.Series(values).rolling(window=window).mean().to_numpy()
+
+
+def _pandas_rolling_mean_std(values: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """滚动均值和样本标准差"""
+    rolling = pd.Series(values).rolling(window=window)
+    return rolling.mean().to_numpy(), rolling.std().to_numpy()
+
+
+def _pandas_atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> np.ndarray:
+    """真实波幅的滚动均值"""
+    return _pandas_rolling_mean(true_range(high, low, shift(close)), period)
+
+
+# -------------------------------
+# 单遍循环实现（安装 numba 时编译执行）
+# -------------------------------
+def _rolling_mean_loop(values, window):
+    """单遍滚动均值：维护窗口内有效值之和与缺失值个数"""
+    n = values.shape[0]
+    out = np.full(n, np.nan)
+    total = 0.0
+    missing = 0
+    for i in range(n):
+        x = values[i]
+        if np.isnan(x):
+            missing += 1
+        else:
+            total += x
+        if i >= window:
+            old = values[i - window]
+            if np.isnan(old):
+                missing -= 1
+            else:
+                total -= old
+        if i >= window - 1 and missing == 0:
+            out[i] = total / window
+    return out
+
+
+def _rolling_mean_std_loop(values, window):
+    """单遍滚动均值和样本标准差：累加和与平方和以第一个有效值为偏移，降低精度损失"""
+    n = values.shape[0]
+    mean = np.full(n, np.nan)
+    std = np.full(n, np.nan)
+    offset = 0.0
+    for i in range(n):
+        if not np.isnan(values[i]):
+            offset = values[i]
+            break
+    total = 0.0
+    total_sq = 0.0
+    missing = 0
+    for i in range(n):
+        x = values[i] - offset
+        if np.isnan(x):
+            missing += 1
+        else:
+            total += x
+            total_sq += x * x
+        if i >= window:
+            old = values[i - window] - offset
+            if np.isnan(old):
+                missing -= 1
+            else:
+                total -= old
+                total_sq -= old * old
+        if i >= window - 1 and missing == 0:
+            mean[i] = total / window + offset
+            if window > 1:
+                variance = (total_sq - total * total / window) / (window - 1)
+                std[i] = np.sqrt(variance) if variance > 0.0 else 0.0
+    return mean, std
+
+
+def _atr_loop(high, low, close, period):
+    """单遍ATR：真实波幅按 pandas max(axis=1) 的方式忽略缺失值，同时维护滚动窗口"""
+    n = close.shape[0]
+    true_range = np.empty(n)
+    out = np.full(n, np.nan)
+    total = 0.0
+    missing = 0
+    for i in range(n):
+        tr = high[i] - low[i]
+        if i > 0:
+            prev_close = close[i - 1]
+            up = abs(high[i] - prev_close)
+            down = abs(low[i] - prev_close)
+            if np.isnan(tr) or up > tr:
+                tr = up
+            if np.isnan(tr) or down > tr:
+                tr = down
+        true_range[i] = tr
+        if np.isnan(tr):
+            missing += 1
+        else:
+            total += tr
+        if i >= period:
+            old = true_range[i - period]
+            if np.isnan(old):
+                missing -= 1
+            else:
+                total -= old
+        if i >= period - 1 and missing == 0:
+            out[i] = total / period
+    return out
+
+
+class IndicatorKernels:
+    """
+    一组滚动指标计算函数
+    输入为连续的 float64 一维数组，输出与输入等长，未满窗口的位置为NaN
+    """
+
+    __slots__ = ('name', 'rolling_mean', 'rolling_mean_std', 'atr')
+
+    def __init__(self, name: str, rolling_mean: Callable, rolling_mean_std: Callable, atr: Callable):
+        self.name = name
+        self.rolling_mean = rolling_mean
+        self.rolling_mean_std = rolling_mean_std
+        self.atr = atr
+
+    def __repr__(self) -> str:
+        return f"IndicatorKernels({self.name})"
+
+
+def make_loop_kernels(jit: Callable[[Callable], Callable]) -> IndicatorKernels:
+    """
+    由单遍循环实现构建计算函数组
+
+    Args:
+        jit: 对循环函数的包装，通常为 numba.njit；传入恒等函数时以纯Python执行（仅用于测试）
+    """
+    return IndicatorKernels('numba', jit(_rolling_mean_loop), jit(_rolling_mean_std_loop), jit(_atr_loop))
+
+
+PANDAS_KERNELS = IndicatorKernels('pandas', _pandas_rolling_mean, _pandas_rolling_mean_std, _pandas_atr)
+NUMPY_KERNELS = IndicatorKernels('numpy', rolling_mean, _numpy_rolling_mean_std, _numpy_atr)
+NUMBA_KERNELS = make_loop_kernels(numba.njit(cache=True)) if NUMBA_AVAILABLE else None
+
+
+def get_kernels(backend: Optional[str] = None) -> IndicatorKernels:
+    """
+    按名称获取计算函数组
+
+    Args:
+        backend: 后端名称，见 BACKENDS，默认为 DEFAULT_BACKEND
+
+    Returns:
+        计算函数组
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"不支持的指标计算后端: {backend}，支持: {', '.join(BACKENDS)}")
+    if backend == 'pandas':
+        return PANDAS_KERNELS
+    if backend == 'numpy':
+        return NUMPY_KERNELS
+    if NUMBA_KERNELS is None:
+        if backend == 'numba':
+            logger.warning("未安装numba，指标计算使用NumPy后端")
+        return NUMPY_KERNELS
+    return NUMBA_KERNELS
+
+
+def as_float_array(values) -> np.ndarray:
+    """转换为连续的 float64 数组，已满足条件时不复制"""
+    return np.ascontiguousarray(values, dtype=np.float64)
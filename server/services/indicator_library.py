@@ -0,0 +1,449 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, asdict, fields
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+from server.utils.logger import get_logger
+from server.services.indicator_kernels import IndicatorKernels, PANDAS_KERNELS, as_float_array, shift
+
+# 获取日志器
+logger = get_logger()
+
+# 指标计算的原始输入列
+INPUT_COLUMNS = ('Close', 'High', 'Low', 'Volume')
+
+# 波动率的统计窗口
+VOLATILITY_WINDOW = 20
+
+# 指标的计算方式：map 为逐元素计算，lag 取 window 根之前的值，rolling_* 为长度 window 的滚动统计
+# （rolling_mean_std 一次滚动计算得到 (均值, 标准差) 二元组），
+# atr 为真实波幅的 window 期均值，ema 为跨度 window 的指数移动平均，cumsum 为累加；
+# 向量计算由 IndicatorSpec.func 完成，增量计算（IndicatorState）与尾部计算按计算方式和窗口长度进行
+INDICATOR_KINDS = ('map', 'lag', 'rolling_mean', 'rolling_mean_std', 'rolling_min', 'rolling_max', 'atr', 'ema',
+                   'cumsum')
+
+# 依赖完整历史的递推计算方式，最新值无法只由最近若干根K线得到
+RECURSIVE_KINDS = ('ema', 'cumsum')
+
+
+# -------------------------------
+# **技术指标配置**
+# -------------------------------
+@dataclass
+class TechnicalParams:
+    """技术指标参数配置"""
+    ma_periods: Dict[str, int]
+    rsi_period: int
+    bollinger_period: int
+    bollinger_std: int
+    volume_ma_period: int
+    atr_period: int
+    obv_ma_period: int = 10
+    stochastic_period: int = 14
+    stochastic_smooth: int = 3
+    roc_period: int = 10
+
+    @classmethod
+    def default(cls) -> 'TechnicalParams':
+        """返回默认的技术指标参数"""
+        return cls(
+            ma_periods={'short': 5, 'medium': 20, 'long': 60},
+            rsi_period=14,
+            bollinger_period=20,
+            bollinger_std=2,
+            volume_ma_period=20,
+            atr_period=14
+        )
+
+    @classmethod
+    def from_dict(cls, params: Mapping[str, Any]) -> 'TechnicalParams':
+        """由参数字典构建，缺少的参数使用默认值，未知的键被忽略"""
+        values = asdict(cls.default())
+        names = {f.name for f in fields(cls)}
+        values.update({k: v for k, v in params.items() if k in names})
+        return cls(**values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为 TechnicalIndicator 使用的参数字典"""
+        return asdict(self)
+
+
+# 默认技术指标参数
+DEFAULT_PARAMS: Dict[str, Any] = TechnicalParams.default().to_dict()
+
+
+@dataclass(frozen=True)
+class IndicatorSpec:
+    """
+    单个指标（或中间量）的定义
+
+    Attributes:
+        name: 指标名，对外输出的指标即为结果中的列名
+        inputs: 依赖的原始列或其他指标名
+        func: 计算函数，参数为 (计算函数组, *依赖数组)，返回与输入等长的数组
+        output: 是否为对外输出的指标，中间量为False
+        extra: 是否为扩展指标（OBV、随机指标、ROC），默认输出中不包含
+        kind: 计算方式，见 INDICATOR_KINDS
+        window: 窗口长度、平移期数或EMA跨度，map 为0
+    """
+    name: str
+    inputs: Tuple[str, ...]
+    func: Callable[..., np.ndarray]
+    output: bool = True
+    extra: bool = False
+    kind: str = 'map'
+    window: int = 0
+
+
+def _gain(diff: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """上涨幅度，下跌或第一根K线为0；没有收盘价（停牌、补齐）的位置为NaN，不参与窗口"""
+    return np.where(np.isnan(close), np.nan, np.where(diff > 0, diff, 0.0))
+
+
+def _loss(diff: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """下跌幅度，规则同 _gain"""
+    return np.where(np.isnan(close), np.nan, np.where(diff < 0, -diff, 0.0))
+
+
+def _rolling_extreme(values: np.ndarray, window: int, reducer: Callable) -> np.ndarray:
+    """滚动最小/最大值，窗口内存在缺失值时结果为NaN"""
+    out = np.full(values.shape, np.nan)
+    if window <= values.shape[0]:
+        out[window - 1:] = reducer(sliding_window_view(values, window, axis=0), axis=-1)
+    return out
+
+
+def _ema(values: np.ndarray, span: int) -> np.ndarray:
+    """按列计算指数移动平均，pandas 的 ewm 本身为单遍递推"""
+    return pd.DataFrame(values).ewm(span=span, adjust=False).mean().to_numpy().reshape(values.shape)
+
+
+def _cumsum(values: np.ndarray) -> np.ndarray:
+    """按列累加，缺失值的位置为NaN、其后继续累加"""
+    out = np.nancumsum(values, axis=0)
+    out[np.isnan(values)] = np.nan
+    return out
+
+
+class IndicatorLibrary:
+    """
+    技术指标库
+    以依赖图的形式声明所有指标的输入、参数和输出列，Web服务（TechnicalIndicator）
+    和全盘扫描（a_stock_full_scan.StockAnalyzer）共用同一套定义；
+    求值时按依赖关系排序，收盘价差分、滚动均值等共享的中间量只计算一次
+    """
+
+    def __init__(self, params: Optional[Union[TechnicalParams, Mapping[str, Any]]] = None):
+        """
+        初始化指标库
+
+        Args:
+            params: 技术指标参数，TechnicalParams 或参数字典，默认使用 DEFAULT_PARAMS
+        """
+        if params is None:
+            params = TechnicalParams.default()
+        elif not isinstance(params, TechnicalParams):
+            params = TechnicalParams.from_dict(params)
+        self.params = params
+        self.specs: Dict[str, IndicatorSpec] = {}
+        self._build()
+
+    def register(self, name: str, inputs: Sequence[str], func: Callable[..., np.ndarray],
+                 output: bool = True, extra: bool = False, kind: str = 'map', window: int = 0) -> None:
+        """
+        注册一个指标，同名的中间量只保留第一次注册的定义
+
+        Args:
+            name: 指标名
+            inputs: 依赖的原始列或其他指标名
+            func: 计算函数，参数为 (计算函数组, *依赖数组)
+            output: 是否为对外输出的指标
+            extra: 是否为扩展指标
+            kind: 计算方式，见 INDICATOR_KINDS；map 的计算函数对标量同样适用
+            window: 窗口长度、平移期数或EMA跨度
+        """
+        if kind not in INDICATOR_KINDS:
+            raise ValueError(f"不支持的指标计算方式: {kind}")
+        existing = self.specs.get(name)
+        if existing is not None:
+            if output and not existing.output:
+                self.specs[name] = IndicatorSpec(name, existing.inputs, existing.func, output, extra,
+                                                 existing.kind, existing.window)
+            return
+        self.specs[name] = IndicatorSpec(name, tuple(inputs), func, output, extra, kind, window)
+
+    def _rolling_mean(self, source: str, window: int) -> str:
+        """注册滚动均值中间量，返回其名称"""
+        name = f'{source}_mean_{window}'
+        self.register(name, (source,), lambda k, x: k.rolling_mean(x, window), output=False,
+                      kind='rolling_mean', window=window)
+        return name
+
+    def _rolling_mean_std(self, source: str, window: int) -> Tuple[str, str]:
+        """注册滚动均值和标准差中间量，两者由一次滚动计算得到，返回 (均值, 标准差) 的名称"""
+        fused = f'{source}_mean_std_{window}'
+        self.register(fused, (source,), lambda k, x: k.rolling_mean_std(x, window), output=False,
+                      kind='rolling_mean_std', window=window)
+        mean, std = f'{source}_mean_{window}', f'{source}_std_{window}'
+        self.register(mean, (fused,), lambda k, pair: pair[0], output=False)
+        self.register(std, (fused,), lambda k, pair: pair[1], output=False)
+        return mean, std
+
+    def _lag(self, source: str, periods: int) -> str:
+        """注册平移中间量（periods 根K线之前的值），返回其名称"""
+        name = f'{source}_lag_{periods}'
+        self.register(name, (source,), lambda k, x: shift(x, periods), output=False, kind='lag', window=periods)
+        return name
+
+    @staticmethod
+    def _alias(k: IndicatorKernels, x: np.ndarray) -> np.ndarray:
+        """直接引用依赖的结果"""
+        return x
+
+    def _build(self) -> None:
+        """按参数注册全部指标，注册顺序即默认输出列的顺序"""
+        p = self.params
+
+        # 共享中间量
+        prev_close = self._lag('Close', 1)
+        self.register('close_diff', ('Close', prev_close), lambda k, c, prev: c - prev, output=False)
+        self.register('gain', ('close_diff', 'Close'), lambda k, d, c: _gain(d, c), output=False)
+        self.register('loss', ('close_diff', 'Close'), lambda k, d, c: _loss(d, c), output=False)
+        # 布林带和波动率的均值与标准差一次计算，先于均线注册，同窗口的均线（MA20）直接使用其中的均值
+        bollinger_mean, bollinger_std = self._rolling_mean_std('Close', p.bollinger_period)
+        volatility_mean, volatility_std = self._rolling_mean_std('Close', VOLATILITY_WINDOW)
+
+        # 移动平均线
+        for period in p.ma_periods.values():
+            self.register(f'MA{period}', (self._rolling_mean('Close', period),), self._alias)
+
+        # RSI：序列第一天的涨跌记为0
+        rsi_inputs = (self._rolling_mean('gain', p.rsi_period), self._rolling_mean('loss', p.rsi_period))
+        self.register('RSI', rsi_inputs, lambda k, g, l: 100 - (100 / (1 + g / l)))
+
+        # MACD
+        self.register('EMA12', ('Close',), lambda k, close: _ema(close, 12), output=False, kind='ema', window=12)
+        self.register('EMA26', ('Close',), lambda k, close: _ema(close, 26), output=False, kind='ema', window=26)
+        self.register('MACD', ('EMA12', 'EMA26'), lambda k, fast, slow: fast - slow)
+        self.register('Signal', ('MACD',), lambda k, macd: _ema(macd, 9), kind='ema', window=9)
+        self.register('Histogram', ('MACD', 'Signal'), lambda k, macd, signal: macd - signal)
+
+        # 布林带
+        self.register('BB_Middle', (bollinger_mean,), self._alias)
+        self.register('BB_Upper', (bollinger_mean, bollinger_std), lambda k, m, s: m + p.bollinger_std * s)
+        self.register('BB_Lower', (bollinger_mean, bollinger_std), lambda k, m, s: m - p.bollinger_std * s)
+
+        # 成交量移动平均与量比
+        self.register('Volume_MA', (self._rolling_mean('Volume', p.volume_ma_period),), self._alias)
+        self.register('Volume_Ratio', ('Volume', 'Volume_MA'), lambda k, v, ma: v / ma)
+
+        # ATR：真实波幅与滚动均值由计算函数组一次完成
+        self.register('ATR', ('High', 'Low', 'Close'), lambda k, h, l, c: k.atr(h, l, c, p.atr_period),
+                      kind='atr', window=p.atr_period)
+
+        # 波动率 (过去20天收盘价的标准差/均值)
+        self.register('Volatility', (volatility_std, volatility_mean), lambda k, s, m: s / m * 100)
+
+        # 扩展指标：能量潮，第一根K线记为0，成交量缺失的位置为NaN、其后继续累加
+        self.register('obv_flow', ('close_diff', 'Volume'),
+                      lambda k, d, v: np.where(d > 0, v, np.where(d < 0, -v, 0.0)), output=False)
+        self.register('OBV', ('obv_flow',), lambda k, x: _cumsum(x), extra=True, kind='cumsum')
+        self.register(f'OBV_MA{p.obv_ma_period}', (self._rolling_mean('OBV', p.obv_ma_period),), self._alias, extra=True)
+
+        # 扩展指标：随机指标 %K = (收盘价 - 最低收盘价) / (最高收盘价 - 最低收盘价) * 100，%D 为 %K 的移动平均
+        window = p.stochastic_period
+        self.register('close_min', ('Close',), lambda k, c: _rolling_extreme(c, window, np.min), output=False,
+                      kind='rolling_min', window=window)
+        self.register('close_max', ('Close',), lambda k, c: _rolling_extreme(c, window, np.max), output=False,
+                      kind='rolling_max', window=window)
+        self.register('%K', ('Close', 'close_min', 'close_max'),
+                      lambda k, c, lo, hi: (c - lo) / (hi - lo + 1e-10) * 100, extra=True)
+        self.register('%D', (self._rolling_mean('%K', p.stochastic_smooth),), self._alias, extra=True)
+
+        # 扩展指标：变动率
+        self.register('ROC', ('Close', self._lag('Close', p.roc_period)),
+                      lambda k, c, prev: (c / prev - 1) * 100, extra=True)
+
+    def output_columns(self, include_extra: bool = False) -> List[str]:
+        """
+        获取默认输出的指标列
+
+        Args:
+            include_extra: 是否包含 OBV、随机指标、ROC 等扩展指标
+        """
+        return [s.name for s in self.specs.values() if s.output and (include_extra or not s.extra)]
+
+    def resolve(self, outputs: Sequence[str]) -> List[str]:
+        """
+        获取计算指定指标所需的全部指标（含中间量），按依赖顺序排列
+
+        Args:
+            outputs: 需要的指标名
+
+        Returns:
+            拓扑排序后的指标名列表，不含原始输入列
+        """
+        order: List[str] = []
+        state: Dict[str, int] = {}
+
+        def visit(name: str) -> None:
+            if name in INPUT_COLUMNS or state.get(name) == 2:
+                return
+            if name not in self.specs:
+                raise KeyError(f"未定义的技术指标: {name}")
+            if state.get(name) == 1:
+                raise ValueError(f"技术指标存在循环依赖: {name}")
+            state[name] = 1
+            for dependency in self.specs[name].inputs:
+                visit(dependency)
+            state[name] = 2
+            order.append(name)
+
+        for name in outputs:
+            visit(name)
+        return order
+
+    def lookback(self, name: str) -> Optional[int]:
+        """
+        计算指标最新一个值所需的最近K线数
+
+        Args:
+            name: 指标名或原始列名
+
+        Returns:
+            K线数；依赖完整历史的递推指标（EMA、累加）返回None
+        """
+        if name in INPUT_COLUMNS:
+            return 1
+        spec = self.specs[name]
+        if spec.kind in RECURSIVE_KINDS:
+            return None
+        own = spec.window + 1 if spec.kind in ('lag', 'atr') else max(spec.window, 1)
+        dependencies = [self.lookback(dependency) for dependency in spec.inputs]
+        if any(bars is None for bars in dependencies):
+            return None
+        return own - 1 + max(dependencies, default=1)
+
+    def lazy(self, columns: Mapping[str, Any],
+             kernels: Optional[IndicatorKernels] = None) -> 'LazyIndicators':
+        """
+        创建按需计算的指标视图
+
+        Args:
+            columns: 原始列名 -> 数组，需包含所需的 Close、High、Low、Volume 列
+            kernels: 滚动指标的计算函数组，默认为 pandas 实现
+
+        Returns:
+            LazyIndicators实例，访问某个指标时才计算它及其依赖
+        """
+        return LazyIndicators(self, columns, kernels)
+
+    def evaluate(self, columns: Mapping[str, Any], outputs: Optional[Sequence[str]] = None,
+                 kernels: Optional[IndicatorKernels] = None) -> Dict[str, np.ndarray]:
+        """
+        计算指标，只计算 outputs 及其传递依赖
+
+        Args:
+            columns: 原始列名 -> 数组，需包含所需的 Close、High、Low、Volume 列
+            outputs: 需要的指标名，默认为 output_columns()
+            kernels: 滚动指标的计算函数组，默认为 pandas 实现
+
+        Returns:
+            指标名 -> 数组，按 outputs 的顺序
+        """
+        outputs = list(outputs) if outputs is not None else self.output_columns()
+        view = self.lazy(columns, kernels)
+        return {name: view[name] for name in outputs}
+
+    def evaluate_tail(self, columns: Mapping[str, Any], tail: int = 1, outputs: Optional[Sequence[str]] = None,
+                      kernels: Optional[IndicatorKernels] = None) -> Dict[str, np.ndarray]:
+        """
+        只计算最后 tail 根K线上的指标值，结果与完整计算的最后 tail 个值一致
+
+        窗口类指标只在最后 tail+所需K线数-1 根K线上求值，计算量与历史长度无关；
+        EMA、OBV 等递推指标依赖完整历史，仍在完整序列上求值（只计算这些指标及其依赖）
+
+        Args:
+            columns: 原始列名 -> 等长的一维数组
+            tail: 需要的最新K线数
+            outputs: 需要的指标名，默认为 output_columns()
+            kernels: 滚动指标的计算函数组
+
+        Returns:
+            指标名 -> 长度为 tail 的数组（历史不足 tail 根时为完整长度）
+        """
+        outputs = list(outputs) if outputs is not None else self.output_columns()
+        length = len(columns['Close'])
+        tail = max(1, min(tail, length))
+        lookbacks = {name: self.lookback(name) for name in outputs}
+        windowed = [bars for bars in lookbacks.values() if bars is not None]
+        size = max(windowed, default=0) + tail - 1
+
+        full = self.lazy(columns, kernels)
+        segment = full
+        if windowed and size < length:
+            segment = self.lazy({name: np.asarray(values)[-size:] for name, values in columns.items()
+                                 if name in INPUT_COLUMNS}, kernels)
+        return {name: (full if lookbacks[name] is None else segment)[name][-tail:] for name in outputs}
+
+    def evaluate_frame(self, df: pd.DataFrame, outputs: Optional[Sequence[str]] = None,
+                       kernels: Optional[IndicatorKernels] = None) -> Dict[str, np.ndarray]:
+        """
+        在DataFrame上计算指标，原始列名大小写均可（Close/close）
+
+        Args:
+            df: K线数据
+            outputs: 需要的指标名，默认为 output_columns()
+            kernels: 滚动指标的计算函数组
+
+        Returns:
+            指标名 -> 数组
+        """
+        names = {col.lower(): col for col in df.columns if isinstance(col, str)}
+        columns = {name: df[names[name.lower()]].to_numpy()
+                   for name in INPUT_COLUMNS if name.lower() in names}
+        return self.evaluate(columns, outputs, kernels)
+
+
+class LazyIndicators(Mapping):
+    """
+    按需计算的指标视图
+    访问某个指标时才计算它及其尚未计算的依赖，所有结果（含中间量）缓存在视图中，
+    之后访问共享这些中间量的指标不再重复计算
+    """
+
+    def __init__(self, library: IndicatorLibrary, columns: Mapping[str, Any],
+                 kernels: Optional[IndicatorKernels] = None):
+        self.library = library
+        self.columns = columns
+        self.kernels = kernels if kernels is not None else PANDAS_KERNELS
+        self._values: Dict[str, np.ndarray] = {}
+
+    def _input(self, name: str) -> np.ndarray:
+        """获取原始列或已计算的指标，原始列在第一次使用时转换为连续的 float64 数组"""
+        if name not in self._values:
+            self._values[name] = as_float_array(self.columns[name])
+        return self._values[name]
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name in self._values:
+            return self._values[name]
+        if name in INPUT_COLUMNS:
+            return self._input(name)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for node in self.library.resolve([name]):
+                if node not in self._values:
+                    spec = self.library.specs[node]
+                    self._values[node] = spec.func(self.kernels, *(self._input(dep) for dep in spec.inputs))
+        return self._values[name]
+
+    def __iter__(self):
+        return iter(self.library.output_columns(include_extra=True))
+
+    def __len__(self) -> int:
+        return len(self.library.output_columns(include_extra=True))
+
+    @property
+    def computed(self) -> List[str]:
+        """已计算的指标和中间量（不含原始列）"""
+        return [name for name in self._values if name not in INPUT_COLUMNS]
@@ -0,0 +1,188 @@
+import copy
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional, Sequence
+from server.utils.logger import get_logger
+from server.services.stock_bars import StockBars
+from server.services.technical_indicator import DEFAULT_PARAMS
+from server.services.indicator_kernels import NUMPY_KERNELS
+from server.services.indicator_library import IndicatorLibrary
+
+# 获取日志器
+logger = get_logger()
+
+
+class PricePanel:
+    """
+    多只股票对齐后的价格面板
+    以 (日期 x 股票) 二维数组保存收盘价、最高价、最低价和成交量；
+    由 from_bars 构建时按各自的最近K线右对齐，最后一行即每只股票的最新K线，
+    较短的历史在前部补NaN
+    """
+
+    __slots__ = ('symbols', 'dates', 'close', 'high', 'low', 'volume', 'lengths', 'bars', '_positions')
+
+    def __init__(self, symbols: Sequence[str], dates: np.ndarray,
+                 close: np.ndarray, high: np.ndarray, low: np.ndarray, volume: np.ndarray,
+                 lengths: Optional[np.ndarray] = None, bars: Optional[List[StockBars]] = None):
+        """
+        初始化价格面板
+
+        Args:
+            symbols: 股票代码列表，对应数组的列
+            dates: (日期 x 股票) datetime64 数组，补齐位置为NaT
+            close: 收盘价数组
+            high: 最高价数组
+            low: 最低价数组
+            volume: 成交量数组
+            lengths: 每只股票的有效K线数，默认按收盘价非空计数
+            bars: 构建面板的原始K线，用于还原单只股票的完整DataFrame
+        """
+        self.symbols = list(symbols)
+        self.dates = dates
+        self.close = close
+        self.high = high
+        self.low = low
+        self.volume = volume
+        self.lengths = lengths if lengths is not None else (~np.isnan(close)).sum(axis=0)
+        self.bars = bars
+        self._positions = {symbol: j for j, symbol in enumerate(self.symbols)}
+
+    @classmethod
+    def from_bars(cls, bars: Sequence[StockBars], length: Optional[int] = None) -> 'PricePanel':
+        """
+        由多只股票的K线构建右对齐的价格面板
+
+        Args:
+            bars: StockBars 列表，需包含 Close、High、Low、Volume 列
+            length: 每只股票最多保留的最近K线数，默认保留全部
+
+        Returns:
+            PricePanel实例
+        """
+        bars = list(bars)
+        rows = max((len(b) for b in bars), default=0)
+        if length is not None:
+            rows = min(rows, length)
+        shape = (rows, len(bars))
+
+        date_dtype = bars[0].dates.dtype if bars else np.dtype('datetime64[ns]')
+        dates = np.full(shape, 'NaT', dtype=date_dtype)
+        arrays = {name: np.full(shape, np.nan) for name in ('Close', 'High', 'Low', 'Volume')}
+        lengths = np.zeros(len(bars), dtype=int)
+        for j, item in enumerate(bars):
+            n = min(len(item), rows)
+            lengths[j] = n
+            if n == 0:
+                continue
+            dates[rows - n:, j] = item.dates[-n:]
+            for name, array in arrays.items():
+                array[rows - n:, j] = item[name][-n:]
+
+        return cls([b.stock_code for b in bars], dates, arrays['Close'], arrays['High'],
+                   arrays['Low'], arrays['Volume'], lengths=lengths, bars=bars)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def position(self, symbol: str) -> int:
+        """获取股票所在的列号"""
+        return self._positions[symbol]
+
+
+class PanelIndicators:
+    """
+    价格面板的技术指标计算结果
+    指标名 -> (日期 x 股票) 二维数组，列名与 TechnicalIndicator.calculate_indicators 一致
+    """
+
+    __slots__ = ('panel', 'values')
+
+    def __init__(self, panel: PricePanel, values: Dict[str, np.ndarray]):
+        self.panel = panel
+        self.values = values
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.values[name]
+
+    def latest(self, name: str) -> np.ndarray:
+        """获取所有股票最新一根K线上的指标值"""
+        return self.values[name][-1]
+
+    def frame(self, symbol: str) -> pd.DataFrame:
+        """
+        还原单只股票的K线和指标DataFrame，结果与 TechnicalIndicator.calculate_indicators 的输出一致
+
+        Args:
+            symbol: 股票代码
+
+        Returns:
+            以日期为索引、包含原始列和指标列的DataFrame
+        """
+        j = self.panel.position(symbol)
+        n = int(self.panel.lengths[j])
+        rows = slice(len(self.panel.dates) - n, None)
+
+        if self.panel.bars is not None:
+            source = self.panel.bars[j]
+            columns = {name: array[-n:] if n else array[:0] for name, array in source.columns.items()}
+        else:
+            columns = {name: getattr(self.panel, name.lower())[rows, j]
+                       for name in ('Close', 'High', 'Low', 'Volume')}
+        for name, array in self.values.items():
+            columns[name] = array[rows, j]
+
+        index = pd.DatetimeIndex(self.panel.dates[rows, j], name='Date')
+        return pd.DataFrame(columns, index=index)
+
+
+class PanelIndicatorEngine:
+    """
+    多股票向量化技术指标计算引擎
+    对整个价格面板一次性计算均线、RSI、MACD、布林带、ATR、量比和波动率，
+    代替逐只股票调用 TechnicalIndicator.calculate_indicators
+    """
+
+    def __init__(self, params: Optional[Dict[str, Any]] = None):
+        """
+        初始化指标引擎
+
+        Args:
+            params: 技术指标参数配置，格式与 TechnicalIndicator 相同
+        """
+        self.params = params or copy.deepcopy(DEFAULT_PARAMS)
+        self.library = IndicatorLibrary(self.params)
+        logger.debug(f"初始化PanelIndicatorEngine，参数: {self.params}")
+
+    def calculate(self, panel: PricePanel) -> PanelIndicators:
+        """
+        计算价格面板上的所有技术指标
+
+        Args:
+            panel: 价格面板
+
+        Returns:
+            指标计算结果
+        """
+        values = self.calculate_arrays(panel.close, panel.high, panel.low, panel.volume)
+        return PanelIndicators(panel, values)
+
+    def calculate_arrays(self, close: np.ndarray, high: np.ndarray,
+                         low: np.ndarray, volume: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        在 (日期 x 股票) 数组上计算所有技术指标
+
+        使用指标库的同一套定义，滚动计算按列向量化；
+        收盘价缺失的位置视为该股票没有K线，涉及这些位置的窗口结果为NaN
+
+        Args:
+            close: 收盘价数组
+            high: 最高价数组
+            low: 最低价数组
+            volume: 成交量数组
+
+        Returns:
+            指标名 -> 与输入同形状的数组
+        """
+        columns = {'Close': close, 'High': high, 'Low': low, 'Volume': volume}
+        return self.library.evaluate(columns, kernels=NUMPY_KERNELS)
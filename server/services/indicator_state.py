@@ -0,0 +1,609 @@
+import os
+import copy
+import json
+import math
+import threading
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from server.utils.logger import get_logger
+from server.services.indicator_kernels import PANDAS_KERNELS, true_range
+from server.services.indicator_library import DEFAULT_PARAMS, INPUT_COLUMNS, IndicatorLibrary, IndicatorSpec
+
+# 获取日志器
+logger = get_logger()
+
+# 项目根目录（indicator_state.py 位于 server/services/ 下）
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# 支持的RSI计算方式：sma 与 TechnicalIndicator 一致（简单移动平均），wilder 为威尔德平滑
+RSI_METHODS = ('sma', 'wilder')
+
+
+def _to_json_float(value: float) -> Optional[float]:
+    """NaN不是合法的JSON，序列化为None"""
+    return None if value is None or math.isnan(value) else value
+
+
+def _from_json_float(value: Optional[float]) -> float:
+    """反序列化时将None还原为NaN"""
+    return float('nan') if value is None else float(value)
+
+
+class RollingWindow:
+    """
+    定长滚动窗口
+    使用环形缓冲区保存最近 size 个值，维护有效值的累加和、平方和与缺失值个数，
+    每次更新、求均值和标准差均为O(1)；窗口内有缺失值时统计结果为NaN（与 pandas rolling 一致）；
+    每写满一轮按缓冲区重新求和，避免累计误差；最近一次 push 可以撤销（被覆盖的值与几个标量）
+    """
+
+    __slots__ = ('size', 'values', 'pos', 'count', 'missing', 'total', 'total_sq', '_since_resum', '_undo')
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values: List[float] = [0.0] * size
+        self.pos = 0
+        self.count = 0
+        self.missing = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self._since_resum = 0
+        self._undo: Optional[tuple] = None
+
+    @property
+    def full(self) -> bool:
+        """窗口是否已填满"""
+        return self.count == self.size
+
+    @property
+    def oldest(self) -> float:
+        """窗口中最早的值，未填满时为NaN"""
+        return self.values[self.pos] if self.full else float('nan')
+
+    def push(self, value: float) -> None:
+        """加入一个新值，窗口已满时淘汰最早的值"""
+        self._undo = (self.values[self.pos], self.count, self.missing, self.total, self.total_sq,
+                      self._since_resum)
+        if self.full:
+            old = self.values[self.pos]
+            if math.isnan(old):
+                self.missing -= 1
+            else:
+                self.total -= old
+                self.total_sq -= old * old
+        else:
+            self.count += 1
+        self.values[self.pos] = value
+        if math.isnan(value):
+            self.missing += 1
+        else:
+            self.total += value
+            self.total_sq += value * value
+        self.pos = (self.pos + 1) % self.size
+
+        self._since_resum += 1
+        if self._since_resum >= self.size:
+            self._resum()
+
+    def undo(self) -> None:
+        """撤销最近一次 push，只能撤销一步"""
+        if self._undo is None:
+            raise ValueError("没有可撤销的更新")
+        old, self.count, self.missing, self.total, self.total_sq, self._since_resum = self._undo
+        self.pos = (self.pos - 1) % self.size
+        self.values[self.pos] = old
+        self._undo = None
+
+    def _current(self) -> List[float]:
+        """缓冲区中的有效数据（不含未写入的位置）"""
+        return self.values if self.full else self.values[:self.count]
+
+    def _resum(self) -> None:
+        """按缓冲区中的有效值重新求和"""
+        current = [v for v in self._current() if not math.isnan(v)]
+        self.total = math.fsum(current)
+        self.total_sq = math.fsum(v * v for v in current)
+        self._since_resum = 0
+
+    def mean(self) -> float:
+        """窗口均值，未填满或有缺失值时为NaN"""
+        if not self.full or self.missing:
+            return float('nan')
+        return self.total / self.size
+
+    def std(self, ddof: int = 1) -> float:
+        """窗口样本标准差，未填满或有缺失值时为NaN"""
+        if not self.full or self.missing or self.size <= ddof:
+            return float('nan')
+        variance = (self.total_sq - self.total * self.total / self.size) / (self.size - ddof)
+        return math.sqrt(max(variance, 0.0))
+
+    def mean_std(self) -> Tuple[float, float]:
+        """窗口均值和样本标准差"""
+        return self.mean(), self.std()
+
+    def min(self) -> float:
+        """窗口最小值，未填满或有缺失值时为NaN"""
+        return min(self.values) if self.full and not self.missing else float('nan')
+
+    def max(self) -> float:
+        """窗口最大值，未填满或有缺失值时为NaN"""
+        return max(self.values) if self.full and not self.missing else float('nan')
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为字典"""
+        return {'size': self.size, 'values': [_to_json_float(v) for v in self.values], 'pos': self.pos,
+                'count': self.count, 'missing': self.missing, 'total': self.total, 'total_sq': self.total_sq,
+                'since_resum': self._since_resum,
+                'undo': None if self._undo is None else [_to_json_float(self._undo[0]), *self._undo[1:]]}
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'RollingWindow':
+        """从字典还原"""
+        window = cls(int(data['size']))
+        window.values = [_from_json_float(v) for v in data['values']]
+        window.pos = int(data['pos'])
+        window.count = int(data['count'])
+        window.missing = int(data['missing'])
+        # 保留原累加和，还原后继续更新的结果与不经序列化完全一致
+        window.total = float(data['total'])
+        window.total_sq = float(data['total_sq'])
+        window._since_resum = int(data['since_resum'])
+        undo = data.get('undo')
+        if undo is not None:
+            window._undo = (_from_json_float(undo[0]), int(undo[1]), int(undo[2]), float(undo[3]),
+                            float(undo[4]), int(undo[5]))
+        return window
+
+
+class WindowState:
+    """滚动统计（均值、均值和标准差、最小值、最大值）的增量状态"""
+
+    __slots__ = ('stat', 'window')
+
+    def __init__(self, stat: str, size: int):
+        self.stat = stat
+        self.window = RollingWindow(size)
+
+    def update(self, x: float) -> float:
+        """加入一个新值并返回窗口统计"""
+        self.window.push(x)
+        return getattr(self.window, self.stat)()
+
+    def undo(self) -> None:
+        """撤销最近一次更新"""
+        self.window.undo()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为字典"""
+        return {'stat': self.stat, 'window': self.window.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'WindowState':
+        """从字典还原"""
+        state = cls(data['stat'], 1)
+        state.window = RollingWindow.from_dict(data['window'])
+        return state
+
+
+class LagState:
+    """平移的增量状态：返回 periods 根K线之前的值"""
+
+    __slots__ = ('window',)
+
+    def __init__(self, periods: int):
+        self.window = RollingWindow(periods)
+
+    def update(self, x: float) -> float:
+        """加入一个新值并返回 periods 根之前的值，不足时为NaN"""
+        lagged = self.window.oldest
+        self.window.push(x)
+        return lagged
+
+    def undo(self) -> None:
+        """撤销最近一次更新"""
+        self.window.undo()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为字典"""
+        return {'window': self.window.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'LagState':
+        """从字典还原"""
+        state = cls(1)
+        state.window = RollingWindow.from_dict(data['window'])
+        return state
+
+
+class EMAState:
+    """
+    指数移动平均递推状态（与 pandas ewm(span=span, adjust=False).mean() 一致）
+    缺失值处沿用上一个EMA，旧值的权重在缺失期间照常衰减，与 pandas 的默认行为（ignore_na=False）相同
+    """
+
+    __slots__ = ('span', 'alpha', 'value', 'weight', '_undo')
+
+    def __init__(self, span: int, value: float = float('nan'), weight: float = 1.0,
+                 undo: Optional[tuple] = None):
+        self.span = span
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = value
+        # 旧值的相对权重：每根K线乘以 (1 - alpha)，遇到有效值合并后重置为1
+        self.weight = weight
+        self._undo = undo
+
+    def update(self, x: float) -> float:
+        """加入一个新值并返回最新EMA"""
+        self._undo = (self.value, self.weight)
+        if math.isnan(self.value):
+            self.value = x
+        else:
+            self.weight *= 1.0 - self.alpha
+            if not math.isnan(x):
+                self.value = (self.weight * self.value + self.alpha * x) / (self.weight + self.alpha)
+                self.weight = 1.0
+        return self.value
+
+    def undo(self) -> None:
+        """撤销最近一次更新"""
+        self.value, self.weight = self._undo
+        self._undo = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为字典"""
+        return {'span': self.span, 'value': _to_json_float(self.value), 'weight': self.weight,
+                'undo': None if self._undo is None else [_to_json_float(self._undo[0]), self._undo[1]]}
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'EMAState':
+        """从字典还原"""
+        undo = data.get('undo')
+        return cls(int(data['span']), _from_json_float(data['value']), float(data.get('weight', 1.0)),
+                   None if undo is None else (_from_json_float(undo[0]), float(undo[1])))
+
+
+class ATRState:
+    """ATR的增量状态：真实波幅需要前一根K线的收盘价，再取滚动均值"""
+
+    __slots__ = ('prev_close', 'window', '_undo')
+
+    def __init__(self, period: int):
+        self.prev_close = float('nan')
+        self.window = WindowState('mean', period)
+        self._undo: Optional[float] = None
+
+    def update(self, high: float, low: float, close: float) -> float:
+        """加入一根K线并返回最新ATR"""
+        value = self.window.update(float(true_range(high, low, self.prev_close)))
+        self._undo = self.prev_close
+        self.prev_close = float(close)
+        return value
+
+    def undo(self) -> None:
+        """撤销最近一次更新"""
+        self.window.undo()
+        self.prev_close = self._undo
+        self._undo = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为字典"""
+        return {'prev_close': _to_json_float(self.prev_close), 'window': self.window.to_dict(),
+                'undo': None if self._undo is None else [_to_json_float(self._undo)]}
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'ATRState':
+        """从字典还原"""
+        state = cls(1)
+        state.prev_close = _from_json_float(data['prev_close'])
+        state.window = WindowState.from_dict(data['window'])
+        undo = data.get('undo')
+        state._undo = None if undo is None else _from_json_float(undo[0])
+        return state
+
+
+class CumsumState:
+    """累加的增量状态，缺失值处为NaN、其后继续累加"""
+
+    __slots__ = ('total', '_undo')
+
+    def __init__(self, total: float = 0.0, undo: Optional[float] = None):
+        self.total = total
+        self._undo = undo
+
+    def update(self, x: float) -> float:
+        """加入一个新值并返回累加和"""
+        self._undo = self.total
+        if math.isnan(x):
+            return float('nan')
+        self.total += x
+        return self.total
+
+    def undo(self) -> None:
+        """撤销最近一次更新"""
+        self.total = self._undo
+        self._undo = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为字典"""
+        return {'total': self.total, 'undo': self._undo}
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'CumsumState':
+        """从字典还原"""
+        undo = data.get('undo')
+        return cls(float(data['total']), None if undo is None else float(undo))
+
+
+class WilderState:
+    """
+    威尔德平滑的增量状态，代替RSI的涨跌幅简单移动平均：
+    前 period 个涨跌幅（不含第一根K线）取简单平均作为初值，之后按 (旧值 x (period-1) + 新值) / period 递推
+    """
+
+    __slots__ = ('period', 'seen', 'window', 'value', '_undo')
+
+    def __init__(self, period: int):
+        self.period = period
+        self.seen = 0
+        self.window = RollingWindow(period)
+        self.value = float('nan')
+        # 撤销记录：(更新前的平滑值, 本次是否写入了初值窗口)
+        self._undo: Optional[tuple] = None
+
+    def update(self, x: float) -> float:
+        """加入一个涨跌幅并返回平滑值"""
+        self.seen += 1
+        self._undo = (self.value, False)
+        if self.seen == 1:
+            return float('nan')
+        if math.isnan(self.value):
+            self.window.push(x)
+            self._undo = (self.value, True)
+            if self.window.full:
+                self.value = self.window.mean()
+        else:
+            self.value = (self.value * (self.period - 1) + x) / self.period
+        return self.value
+
+    def undo(self) -> None:
+        """撤销最近一次更新"""
+        value, pushed = self._undo
+        if pushed:
+            self.window.undo()
+        self.value = value
+        self.seen -= 1
+        self._undo = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为字典"""
+        return {'period': self.period, 'seen': self.seen, 'window': self.window.to_dict(),
+                'value': _to_json_float(self.value),
+                'undo': None if self._undo is None else [_to_json_float(self._undo[0]), self._undo[1]]}
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'WilderState':
+        """从字典还原"""
+        state = cls(int(data['period']))
+        state.seen = int(data['seen'])
+        state.window = RollingWindow.from_dict(data['window'])
+        state.value = _from_json_float(data['value'])
+        undo = data.get('undo')
+        state._undo = None if undo is None else (_from_json_float(undo[0]), bool(undo[1]))
+        return state
+
+
+class IndicatorState:
+    """
+    增量技术指标状态
+    按指标库（IndicatorLibrary）的同一套定义逐根K线更新：滚动窗口、平移、EMA、ATR等计算方式各自维护O(1)的状态，
+    逐元素计算直接调用指标库的计算函数，指标名与 TechnicalIndicator.calculate_indicators 一致；
+    同一时间戳的K线重复到达时（盘中未完成的K线）会替换上一根而不是追加：各状态只记录最近一次更新的
+    撤销信息（被覆盖的窗口值和几个递推标量），替换时逐个撤销再加入新K线，不需要复制整个状态；
+    状态可序列化为JSON，在进程重启后恢复或在Web服务与后台扫描之间共享
+    """
+
+    def __init__(self, params: Optional[Dict[str, Any]] = None, rsi_method: str = 'sma'):
+        """
+        初始化指标状态
+
+        Args:
+            params: 技术指标参数配置，格式与 TechnicalIndicator 相同
+            rsi_method: RSI计算方式，'sma' 与 TechnicalIndicator 一致，'wilder' 为威尔德平滑
+        """
+        if rsi_method not in RSI_METHODS:
+            raise ValueError(f"不支持的RSI计算方式: {rsi_method}，支持: {', '.join(RSI_METHODS)}")
+        self.params = params or copy.deepcopy(DEFAULT_PARAMS)
+        self.rsi_method = rsi_method
+
+        self.library = IndicatorLibrary(self.params)
+        self.outputs = self.library.output_columns()
+        self.nodes = self.library.resolve(self.outputs)
+        wilder = self.library.specs['RSI'].inputs if rsi_method == 'wilder' else ()
+        self.states: Dict[str, Any] = {}
+        for name in self.nodes:
+            spec = self.library.specs[name]
+            if name in wilder:
+                self.states[name] = WilderState(spec.window)
+            elif spec.kind != 'map':
+                self.states[name] = self._make_state(spec)
+
+        self.bars = 0
+        self.last_timestamp: Optional[str] = None
+        self.latest: Dict[str, float] = {}
+        # 最近一次更新可以撤销（同一时间戳的K线替换上一根）
+        self._replaceable = False
+
+    @staticmethod
+    def _make_state(spec: IndicatorSpec) -> Any:
+        """按指标的计算方式创建增量状态"""
+        if spec.kind.startswith('rolling_'):
+            return WindowState(spec.kind[len('rolling_'):], spec.window)
+        if spec.kind == 'lag':
+            return LagState(spec.window)
+        if spec.kind == 'ema':
+            return EMAState(spec.window)
+        if spec.kind == 'atr':
+            return ATRState(spec.window)
+        if spec.kind == 'cumsum':
+            return CumsumState()
+        raise ValueError(f"指标 {spec.name} 的计算方式不支持增量计算: {spec.kind}")
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame, params: Optional[Dict[str, Any]] = None,
+                     rsi_method: str = 'sma') -> 'IndicatorState':
+        """
+        由历史K线初始化状态
+
+        Args:
+            df: 以时间为索引的K线，列名大小写均可（Close/close）
+            params: 技术指标参数配置
+            rsi_method: RSI计算方式
+
+        Returns:
+            IndicatorState实例
+        """
+        state = cls(params, rsi_method)
+        state.update_frame(df)
+        return state
+
+    def update_frame(self, df: pd.DataFrame) -> Dict[str, float]:
+        """
+        依次加入多根K线，时间早于已处理K线的数据会被跳过
+
+        Args:
+            df: 以时间为索引的K线，列名大小写均可
+
+        Returns:
+            最新的指标值
+        """
+        columns = {col.lower(): col for col in df.columns}
+        arrays = {name: df[columns[name]].to_numpy(dtype=float) for name in ('high', 'low', 'close', 'volume')}
+        for i, timestamp in enumerate(df.index):
+            key = str(timestamp)
+            if self.last_timestamp is not None and key < self.last_timestamp:
+                continue
+            self.update({name: values[i] for name, values in arrays.items()}, key)
+        return self.values()
+
+    def update(self, bar: Mapping[str, float], timestamp: Optional[str] = None) -> Dict[str, float]:
+        """
+        加入一根K线
+
+        Args:
+            bar: 包含 high、low、close、volume 的映射，键名大小写均可
+            timestamp: K线时间，与上一根相同时替换上一根（盘中K线更新）
+
+        Returns:
+            最新的指标值
+        """
+        bar = {str(k).lower(): float(v) for k, v in bar.items()}
+        if timestamp is not None and timestamp == self.last_timestamp and self._replaceable:
+            for state in self.states.values():
+                state.undo()
+            self.bars -= 1
+
+        # 以 NumPy 标量求值，除以0得到inf或NaN而不是抛出异常，与向量计算一致
+        values: Dict[str, Any] = {name: np.float64(bar[name.lower()]) for name in INPUT_COLUMNS}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for name in self.nodes:
+                spec = self.library.specs[name]
+                inputs = [values[dependency] for dependency in spec.inputs]
+                if name in self.states:
+                    value = self.states[name].update(*inputs)
+                    values[name] = tuple(map(np.float64, value)) if isinstance(value, tuple) else np.float64(value)
+                else:
+                    values[name] = np.float64(spec.func(PANDAS_KERNELS, *inputs))
+
+        self.bars += 1
+        self._replaceable = True
+        if timestamp is not None:
+            self.last_timestamp = timestamp
+        self.latest = {name: float(values[name]) for name in self.outputs}
+        return dict(self.latest)
+
+    def values(self) -> Dict[str, float]:
+        """获取最新的指标值"""
+        return dict(self.latest)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        序列化为可写入JSON的字典
+
+        Returns:
+            包含参数、各指标增量状态（含最近一次更新的撤销信息）的字典
+        """
+        return {
+            'params': self.params,
+            'rsi_method': self.rsi_method,
+            'states': {name: state.to_dict() for name, state in self.states.items()},
+            'bars': self.bars,
+            'last_timestamp': self.last_timestamp,
+            'latest': {k: _to_json_float(v) for k, v in self.latest.items()},
+            'replaceable': self._replaceable
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'IndicatorState':
+        """
+        从 to_dict 的结果还原状态
+
+        Args:
+            data: 序列化后的字典
+
+        Returns:
+            IndicatorState实例
+        """
+        state = cls(data['params'], data['rsi_method'])
+        if set(data['states']) != set(state.states):
+            raise ValueError("指标状态与当前指标定义不一致")
+        state.states = {name: type(fresh).from_dict(data['states'][name]) for name, fresh in state.states.items()}
+        state.bars = int(data['bars'])
+        state.last_timestamp = data['last_timestamp']
+        state.latest = {k: _from_json_float(v) for k, v in data['latest'].items()}
+        state._replaceable = bool(data.get('replaceable', False))
+        return state
+
+
+class IndicatorStateStore:
+    """
+    指标状态的本地持久化
+    每个 (市场, 代码, 周期) 一个JSON文件，先写临时文件再替换，可在多个进程之间共享
+    """
+
+    def __init__(self, base_dir: Optional[str] = None):
+        """
+        初始化状态存储
+
+        Args:
+            base_dir: 存储目录，默认读取环境变量 INDICATOR_STATE_DIR，否则为 <项目根目录>/data/indicator_state
+        """
+        self.base_dir = base_dir or os.getenv('INDICATOR_STATE_DIR', os.path.join(BASE_DIR, 'data', 'indicator_state'))
+        self._lock = threading.Lock()
+
+    def _path(self, market_type: str, stock_code: str, period: str) -> str:
+        """获取状态文件路径"""
+        return os.path.join(self.base_dir, market_type, f"{stock_code}_{period}.json")
+
+    def load(self, market_type: str, stock_code: str, period: str) -> Optional[IndicatorState]:
+        """读取状态，不存在或损坏时返回None"""
+        path = self._path(market_type, stock_code, period)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return IndicatorState.from_dict(json.load(f))
+        except Exception as e:
+            logger.warning(f"读取指标状态失败 {market_type}/{stock_code}/{period}: {str(e)}")
+            return None
+
+    def save(self, market_type: str, stock_code: str, period: str, state: IndicatorState) -> None:
+        """保存状态"""
+        path = self._path(market_type, stock_code, period)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state.to_dict(), f, ensure_ascii=False)
+            os.replace(tmp_path, path)
@@ -0,0 +1,275 @@
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+from server.utils.logger import get_logger
+from server.utils.rate_limiter import LimitedModule
+from server.services.bar_store import BarStore
+from server.services.concept_crawler import EASTMONEY_HOST, HostRateLimiter
+from server.services.stock_data_provider import StockDataProvider, ADJUST_TOLERANCE
+
+# 获取日志器
+logger = get_logger()
+
+# 全市场实时行情快照列 -> 本地仓库A股K线列
+SNAPSHOT_COLUMNS = {
+    '代码': 'Code',
+    '今开': 'Open',
+    '最新价': 'Close',
+    '最高': 'High',
+    '最低': 'Low',
+    '成交量': 'Volume',
+    '成交额': 'Amount',
+    '振幅': 'Amplitude',
+    '涨跌幅': 'Change_pct',
+    '涨跌额': 'Change',
+    '换手率': 'Turnover'
+}
+
+# 快照价格与已存储收盘价比较时的绝对误差（数据源价格保留两位小数）
+PRICE_ATOL = 0.01
+
+# A股开盘和收盘时间：开盘前的快照仍是上一交易日的数据，盘中的快照是当日未完成的K线，收盘后才是当日完整K线
+MARKET_OPEN_TIME = '09:30'
+MARKET_CLOSE_TIME = '15:00'
+
+
+class MarketSnapshotIngestor:
+    """
+    A股全市场日线快照入库
+    每天只请求一次全市场实时行情快照，把当日K线一次性追加到本地K线仓库，
+    代替逐只股票请求历史数据；本地没有连续历史或发生除权的股票需要先回补
+    """
+
+    def __init__(self, bar_store: Optional[BarStore] = None,
+                 provider: Optional[StockDataProvider] = None):
+        """
+        初始化快照入库器
+
+        Args:
+            bar_store: 本地K线仓库，默认使用环境变量配置的仓库
+            provider: 回补历史数据使用的数据提供者，默认共享同一个K线仓库
+        """
+        self.bar_store = bar_store if bar_store is not None else BarStore()
+        self.provider = provider if provider is not None else StockDataProvider(bar_store=self.bar_store)
+        self.last_stats: Dict[str, Any] = {}
+
+    @staticmethod
+    def fetch_snapshot() -> pd.DataFrame:
+        """获取A股全市场实时行情快照（一次请求）"""
+        import akshare as ak
+        ak = LimitedModule(ak, 'akshare')
+
+        return ak.stock_zh_a_spot_em()
+
+    @staticmethod
+    def fetch_trade_dates() -> List[str]:
+        """获取交易日历，返回升序的YYYYMMDD日期列表"""
+        import akshare as ak
+        ak = LimitedModule(ak, 'akshare')
+
+        calendar_df = ak.tool_trade_date_hist_sina()
+        return sorted(pd.to_datetime(calendar_df['trade_date']).dt.strftime('%Y%m%d').tolist())
+
+    @staticmethod
+    def resolve_trade_dates(trade_dates: List[str], now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        确定最近一个已收盘的交易日及其上一交易日
+
+        交易日当天收盘（15:00）之前，最近的完整K线属于上一交易日；
+        开盘后、收盘前的快照是当日未完成的K线，用 intraday 标记，不能作为任何一天的日线入库
+
+        Args:
+            trade_dates: 升序的交易日列表，格式YYYYMMDD
+            now: 当前时间，默认为系统时间
+
+        Returns:
+            包含 trade_date、prev_trade_date 和 intraday（当前是否处于交易时段）的字典
+        """
+        now = now or datetime.now()
+        today = now.strftime('%Y%m%d')
+        current_time = now.strftime('%H:%M')
+        candidates = [d for d in trade_dates if d <= today]
+        intraday = False
+        if candidates and candidates[-1] == today and current_time < MARKET_CLOSE_TIME:
+            candidates = candidates[:-1]
+            intraday = current_time >= MARKET_OPEN_TIME
+        if len(candidates) < 2:
+            raise ValueError(f"交易日历中找不到 {today} 之前的交易日")
+        return {'trade_date': candidates[-1], 'prev_trade_date': candidates[-2], 'intraday': intraday}
+
+    @staticmethod
+    def snapshot_to_bars(snapshot: pd.DataFrame, trade_date: str) -> pd.DataFrame:
+        """
+        将全市场快照转换为以股票代码为索引的当日K线
+
+        停牌（无成交或无最新价）的股票不生成K线
+
+        Args:
+            snapshot: 全市场实时行情快照
+            trade_date: 快照对应的交易日，格式YYYYMMDD
+
+        Returns:
+            以股票代码为索引的DataFrame，包含本地仓库的标准K线列以及 Prev_close 列
+        """
+        bars = snapshot[list(SNAPSHOT_COLUMNS) + ['昨收']].rename(columns=SNAPSHOT_COLUMNS)
+        bars = bars.rename(columns={'昨收': 'Prev_close'})
+        bars['Code'] = bars['Code'].astype(str)
+        numeric_columns = [col for col in bars.columns if col != 'Code']
+        bars[numeric_columns] = bars[numeric_columns].apply(pd.to_numeric, errors='coerce')
+        bars = bars.dropna(subset=['Open', 'Close', 'High', 'Low'])
+        bars = bars[bars['Volume'] > 0]
+        bars['Date'] = pd.to_datetime(trade_date, format='%Y%m%d')
+        return bars.set_index('Code', drop=False)
+
+    def ingest(self, snapshot: Optional[pd.DataFrame] = None,
+               trade_date: Optional[str] = None,
+               prev_trade_date: Optional[str] = None) -> Dict[str, Any]:
+        """
+        把全市场快照作为当日K线追加到本地仓库
+
+        只有本地数据连续覆盖到上一交易日、且上一交易日收盘价与快照昨收一致（未发生除权）的股票
+        才会追加，其余股票列入 needs_backfill，由 backfill 逐只重新获取；
+        未指定交易日且当前处于交易时段时，快照是未完成的K线，不入库
+
+        Args:
+            snapshot: 全市场快照，默认请求数据源
+            trade_date: 快照对应的交易日，格式YYYYMMDD，默认按交易日历推断
+            prev_trade_date: 上一交易日，格式YYYYMMDD，默认按交易日历推断
+
+        Returns:
+            入库统计，包含 trade_date、appended 数量和 needs_backfill 代码列表；盘中跳过时 skipped 为True
+        """
+        start_time = time.monotonic()
+        if trade_date is None or prev_trade_date is None:
+            dates = self.resolve_trade_dates(self.fetch_trade_dates())
+            if dates['intraday'] and trade_date is None:
+                logger.warning(f"当前处于交易时段，快照是未完成的K线，跳过入库；本地仓库保持到 {dates['trade_date']}，"
+                               f"请在 {MARKET_CLOSE_TIME} 收盘后再执行")
+                self.last_stats = {'trade_date': dates['trade_date'], 'snapshot_rows': 0, 'appended': 0,
+                                   'needs_backfill': [], 'skipped': True, 'elapsed_seconds': 0.0}
+                return self.last_stats
+            trade_date = trade_date or dates['trade_date']
+            prev_trade_date = prev_trade_date or dates['prev_trade_date']
+        if snapshot is None:
+            snapshot = self.fetch_snapshot()
+
+        bars = self.snapshot_to_bars(snapshot, trade_date)
+        logger.info(f"全市场快照入库开始，交易日: {trade_date}, 有效K线数: {len(bars)}")
+
+        appended = 0
+        needs_backfill: List[str] = []
+        prev_dt = pd.to_datetime(prev_trade_date, format='%Y%m%d')
+        for code, bar in zip(bars.index, bars.itertuples(index=False)):
+            try:
+                meta = self.bar_store.read_meta('A', code)
+                if not meta or meta['end'] < prev_trade_date:
+                    needs_backfill.append(code)
+                    continue
+
+                cached = self.bar_store.read('A', code)
+                if cached is None or prev_dt not in cached.index or not np.isclose(
+                        float(cached.at[prev_dt, 'Close']), bar.Prev_close, rtol=ADJUST_TOLERANCE, atol=PRICE_ATOL):
+                    # 缺少上一交易日数据，或昨收与已存储收盘价不一致（发生除权，前复权历史需要整体重算）
+                    needs_backfill.append(code)
+                    continue
+
+                row = pd.DataFrame([bar._asdict()]).drop(columns=['Prev_close']).set_index('Date')
+                self.bar_store.append('A', code, row, trade_date)
+                appended += 1
+            except Exception as e:
+                logger.warning(f"快照追加K线失败 A/{code}: {str(e)}")
+                needs_backfill.append(code)
+
+        elapsed = time.monotonic() - start_time
+        self.last_stats = {
+            'trade_date': trade_date,
+            'snapshot_rows': len(bars),
+            'appended': appended,
+            'needs_backfill': needs_backfill,
+            'elapsed_seconds': round(elapsed, 2)
+        }
+        logger.info(f"全市场快照入库完成，交易日: {trade_date}, 追加: {appended}, 待回补: {len(needs_backfill)}, 耗时: {elapsed:.1f}秒")
+        return self.last_stats
+
+    def backfill(self, stock_codes: List[str], start_date: Optional[str] = None,
+                 end_date: Optional[str] = None, max_workers: int = 4,
+                 requests_per_second: float = 2) -> Dict[str, Any]:
+        """
+        逐只获取历史日线写入本地仓库，用于首次建库或修复缺口、除权
+
+        Args:
+            stock_codes: 股票代码列表
+            start_date: 开始日期，格式YYYYMMDD，默认为一年前
+            end_date: 结束日期，格式YYYYMMDD，默认为今天
+            max_workers: 并发线程数
+            requests_per_second: 每秒最多请求次数
+
+        Returns:
+            回补统计，包含成功数量和失败代码列表
+        """
+        start_date = start_date or (datetime.now() - timedelta(days=365)).strftime('%Y%m%d')
+        end_date = end_date or datetime.now().strftime('%Y%m%d')
+        limiter = HostRateLimiter(requests_per_second)
+        start_time = time.monotonic()
+        total = len(stock_codes)
+        progress_step = max(1, total // 10)
+        failed: List[str] = []
+
+        def load(code: str) -> None:
+            limiter.acquire(EASTMONEY_HOST)
+            self.provider._load_bars_sync(code, 'A', start_date, end_date)
+
+        logger.info(f"开始回补 {total} 只股票的历史日线: {start_date} - {end_date}")
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bar-backfill") as executor:
+            futures = {executor.submit(load, code): code for code in stock_codes}
+            for done, future in enumerate(as_completed(futures), 1):
+                code = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    failed.append(code)
+                    logger.warning(f"回补历史日线失败 A/{code}: {str(e)}")
+                if done % progress_step == 0 or done == total:
+                    logger.info(f"历史日线回补进度: {done}/{total}，已耗时 {time.monotonic() - start_time:.1f}秒")
+
+        return {'backfilled': total - len(failed), 'failed': failed}
+
+    def run(self, backfill: bool = True, **backfill_kwargs) -> Dict[str, Any]:
+        """
+        执行一次每日入库：快照追加，然后回补无法追加的股票
+
+        Args:
+            backfill: 是否回补无法直接追加的股票
+            **backfill_kwargs: 传递给 backfill 的参数
+
+        Returns:
+            入库统计
+        """
+        stats = self.ingest()
+        if backfill and stats['needs_backfill']:
+            stats['backfill'] = self.backfill(stats['needs_backfill'], end_date=stats['trade_date'], **backfill_kwargs)
+        return stats
+
+
+def main():
+    """命令行入口：每日收盘后执行一次全市场快照入库"""
+    parser = argparse.ArgumentParser(description="请求一次A股全市场快照，把当日K线追加到本地K线仓库")
+    parser.add_argument('--no-backfill', action='store_true', help="只追加快照，不回补缺失历史的股票")
+    parser.add_argument('--start-date', default=None, help="回补的开始日期，格式YYYYMMDD")
+    parser.add_argument('--workers', type=int, default=4, help="回补并发线程数")
+    parser.add_argument('--rps', type=float, default=2, help="回补时每秒最多请求次数")
+    args = parser.parse_args()
+
+    ingestor = MarketSnapshotIngestor()
+    stats = ingestor.run(backfill=not args.no_backfill, start_date=args.start_date,
+                         max_workers=args.workers, requests_per_second=args.rps)
+    stats['needs_backfill'] = len(stats['needs_backfill'])
+    print(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import os
+import json
+import atexit
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from server.utils.logger import get_logger
+
+# 获取日志器
+logger = get_logger()
+
+# 项目根目录（metadata_cache.py 位于 server/services/ 下）
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+class MetadataCache:
+    """
+    股票元数据缓存
+    缓存股票名称、行业等几乎不变的信息，键为 (市场类型, 代码)；
+    内存中按LRU淘汰，条目超过TTL（按天计）后失效，可选持久化到本地JSON文件
+    """
+
+    def __init__(self, max_entries: int = 8192, ttl_days: Optional[float] = None,
+                 path: Optional[str] = None, persist: bool = True, flush_every: int = 50):
+        """
+        初始化元数据缓存
+
+        Args:
+            max_entries: 内存中最多保留的条目数
+            ttl_days: 条目有效期（天），默认读取环境变量 METADATA_CACHE_TTL_DAYS，否则为7天
+            path: 持久化文件路径，默认为 <项目根目录>/data/metadata/metadata_cache.json
+            persist: 是否持久化到本地文件
+            flush_every: 累计多少次写入后落盘一次
+        """
+        if ttl_days is None:
+            ttl_days = float(os.getenv('METADATA_CACHE_TTL_DAYS', 7))
+        self.ttl = timedelta(days=ttl_days)
+        self.max_entries = max_entries
+        self.path = path or os.path.join(BASE_DIR, 'data', 'metadata', 'metadata_cache.json')
+        self.persist = persist
+        self.flush_every = flush_every
+
+        self._entries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._pending_writes = 0
+        self._lock = threading.RLock()
+
+        if self.persist:
+            self._load()
+            atexit.register(self.flush)
+        logger.debug(f"初始化MetadataCache，有效期: {ttl_days}天, 已缓存条目: {len(self._entries)}")
+
+    @staticmethod
+    def _key(market_type: str, stock_code: str) -> str:
+        """生成缓存键"""
+        return f"{market_type}:{stock_code}"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, market_type: str, stock_code: str) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存的元数据
+
+        Args:
+            market_type: 市场类型
+            stock_code: 股票代码
+
+        Returns:
+            元数据字典，不存在或已过期时返回None
+        """
+        key = self._key(market_type, stock_code)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if datetime.now() - datetime.fromisoformat(entry['cached_at']) > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return dict(entry['value'])
+
+    def set(self, market_type: str, stock_code: str, value: Dict[str, Any]) -> None:
+        """
+        写入元数据
+
+        Args:
+            market_type: 市场类型
+            stock_code: 股票代码
+            value: 元数据字典，例如 {'stock_name': ..., 'sector': ...}
+        """
+        key = self._key(market_type, stock_code)
+        with self._lock:
+            self._entries[key] = {'value': dict(value), 'cached_at': datetime.now().isoformat(timespec='seconds')}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+            self._pending_writes += 1
+            if self.persist and self._pending_writes >= self.flush_every:
+                self.flush()
+
+    def flush(self) -> None:
+        """将内存中的条目落盘"""
+        if not self.persist:
+            return
+        with self._lock:
+            if self._pending_writes == 0:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._entries, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+                self._pending_writes = 0
+            except Exception as e:
+                logger.warning(f"保存元数据缓存失败: {str(e)}")
+
+    def _load(self) -> None:
+        """从本地文件加载未过期的条目"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            now = datetime.now()
+            for key, entry in entries.items():
+                if now - datetime.fromisoformat(entry['cached_at']) <= self.ttl:
+                    self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        except Exception as e:
+            logger.warning(f"加载元数据缓存失败: {str(e)}")
+            self._entries.clear()
+
+
+_default_cache: Optional[MetadataCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_metadata_cache() -> MetadataCache:
+    """获取进程内共享的元数据缓存"""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = MetadataCache()
+    return _default_cache
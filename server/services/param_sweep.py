@@ -0,0 +1,266 @@
+import os
+import json
+import argparse
+import itertools
+import multiprocessing
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+from server.utils.logger import get_logger
+from server.services.backtest import BacktestResult, ScoreBacktest
+from server.services.bar_store import BarStore
+from server.services.indicator_kernels import IndicatorKernels, get_kernels
+from server.services.indicator_library import IndicatorLibrary, TechnicalParams
+from server.services.scoring_rules import ScoringRuleSet
+from server.services.shared_panel import SharedPanel
+
+# 获取日志器
+logger = get_logger()
+
+# 默认参数网格：键为 TechnicalParams 字段名，嵌套字段用点号连接
+DEFAULT_GRID: Dict[str, List[Any]] = {
+    'ma_periods.short': [5, 10],
+    'ma_periods.medium': [20, 30],
+    'rsi_period': [9, 14, 21],
+}
+
+# 工作进程附加的共享价格面板
+_worker_panel: Optional[SharedPanel] = None
+
+
+def param_grid(grid: Mapping[str, Sequence[Any]], base: Optional[TechnicalParams] = None) -> List[TechnicalParams]:
+    """
+    展开参数网格
+
+    Args:
+        grid: 参数名 -> 候选值列表，嵌套字段用点号连接，如 'ma_periods.short'
+        base: 网格以外的参数取值，默认为 TechnicalParams.default()
+
+    Returns:
+        全部参数组合
+    """
+    base_dict = (base if base is not None else TechnicalParams.default()).to_dict()
+    names = list(grid)
+    combos: List[TechnicalParams] = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        params = json.loads(json.dumps(base_dict))
+        for name, value in zip(names, values):
+            target = params
+            *parents, leaf = name.split('.')
+            for parent in parents:
+                target = target[parent]
+            if leaf not in target:
+                raise KeyError(f"未知的技术指标参数: {name}")
+            target[leaf] = value
+        combos.append(TechnicalParams.from_dict(params))
+    return combos
+
+
+def flatten_params(params: TechnicalParams) -> Dict[str, Any]:
+    """把参数展开为单层字典，嵌套字段用点号连接"""
+    flat: Dict[str, Any] = {}
+    for name, value in params.to_dict().items():
+        if isinstance(value, dict):
+            flat.update({f"{name}.{key}": item for key, item in value.items()})
+        else:
+            flat[name] = value
+    return flat
+
+
+class _AliasView(Mapping):
+    """按默认均线名称读取当前参数下的均线，使规则集中的 MA5/MA20/MA60 对应 短/中/长 期均线"""
+
+    def __init__(self, view: Mapping[str, np.ndarray], aliases: Mapping[str, str]):
+        self.view = view
+        self.aliases = aliases
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.view[self.aliases.get(name, name)]
+
+    def __iter__(self):
+        return iter(self.view)
+
+    def __len__(self) -> int:
+        return len(self.view)
+
+
+def score_panel(panel: SharedPanel, params: TechnicalParams, rule_set: ScoringRuleSet,
+                kernels: Optional[IndicatorKernels] = None) -> np.ndarray:
+    """
+    计算面板中每只股票每个交易日的评分
+
+    每只股票去掉停牌日后计算指标（与 ScoreHistory 逐只读取K线的结果一致），再放回对齐的位置；
+    规则集中按默认周期命名的均线（MA5/MA20/MA60）映射到当前参数的 短/中/长 期均线
+
+    Args:
+        panel: 价格面板
+        params: 技术指标参数
+        rule_set: 评分规则集
+        kernels: 滚动指标的计算函数组
+
+    Returns:
+        (日期 x 股票) 评分数组，预热期、停牌日为NaN
+    """
+    library = IndicatorLibrary(params.to_dict())
+    default_periods = TechnicalParams.default().ma_periods
+    aliases = {f"MA{default_periods[role]}": f"MA{period}"
+               for role, period in params.ma_periods.items() if role in default_periods}
+    warmup = max(params.ma_periods.values())
+    close = panel['Close']
+
+    scores = np.full(close.shape, np.nan)
+    for j, symbol in enumerate(panel.symbols):
+        rows = np.flatnonzero(~np.isnan(close[:, j]))
+        if len(rows) < warmup:
+            continue
+        view = _AliasView(library.lazy(panel.columns(symbol), kernels), aliases)
+        values = rule_set.score(view).astype(float)
+        values[:warmup - 1] = np.nan
+        scores[rows, j] = values
+    return scores
+
+
+def _init_worker(spec: Mapping[str, Any]) -> None:
+    """工作进程初始化：附加共享价格面板"""
+    global _worker_panel
+    _worker_panel = SharedPanel.attach(spec)
+
+
+def evaluate_params(params: Dict[str, Any], rules: Dict[str, Any], buy_threshold: float,
+                    sell_threshold: float, cost: float, backend: Optional[str] = None,
+                    panel: Optional[SharedPanel] = None) -> Dict[str, Any]:
+    """
+    回测一组技术指标参数
+
+    Args:
+        params: TechnicalParams 参数字典
+        rules: ScoringRuleSet 规则字典
+        buy_threshold: 买入阈值
+        sell_threshold: 卖出阈值
+        cost: 单边交易成本
+        backend: 指标计算后端
+        panel: 价格面板，默认为工作进程附加的共享面板
+
+    Returns:
+        参数与回测汇总指标
+    """
+    panel = panel if panel is not None else _worker_panel
+    technical_params = TechnicalParams.from_dict(params)
+    scores = score_panel(panel, technical_params, ScoringRuleSet.from_dict(rules), get_kernels(backend))
+    result = ScoreBacktest(buy_threshold, sell_threshold, cost).run_arrays(scores, panel['Close'])
+
+    summary = BacktestResult.from_arrays(buy_threshold, sell_threshold, result,
+                                         pd.DatetimeIndex(panel.dates)).summary()
+    return {**flatten_params(technical_params), **summary}
+
+
+class ParamSweep:
+    """
+    技术指标参数寻优
+    每组参数在全市场价格面板上计算历史评分并回测，按回测指标排序；
+    参数组分发到进程池并行计算，价格面板放在共享内存中由各工作进程只读附加
+    """
+
+    def __init__(self, rule_set: Optional[ScoringRuleSet] = None, buy_threshold: float = 80,
+                 sell_threshold: float = 40, cost: float = 0.0, backend: Optional[str] = None,
+                 max_workers: Optional[int] = None):
+        """
+        初始化参数寻优
+
+        Args:
+            rule_set: 评分规则集，默认为内置的 web 规则集
+            buy_threshold: 买入阈值
+            sell_threshold: 卖出阈值
+            cost: 单边交易成本
+            backend: 指标计算后端，见 indicator_kernels.BACKENDS
+            max_workers: 工作进程数，默认为CPU核数；为1时在当前进程中依次计算
+        """
+        self.rule_set = rule_set if rule_set is not None else ScoringRuleSet.builtin('web')
+        self.buy_threshold = buy_threshold
+        self.sell_threshold = sell_threshold
+        self.cost = cost
+        self.backend = backend
+        self.max_workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+
+    def run(self, panel: SharedPanel, grid: Sequence[TechnicalParams], sort_by: str = 'sharpe') -> pd.DataFrame:
+        """
+        回测全部参数组合
+
+        Args:
+            panel: 共享价格面板
+            grid: 参数组合，可由 param_grid 生成
+            sort_by: 排序所用的回测指标，降序
+
+        Returns:
+            每组参数及其回测指标，按 sort_by 排序；计算失败的参数组被跳过
+        """
+        args = [(params.to_dict(), self.rule_set.to_dict(), self.buy_threshold,
+                 self.sell_threshold, self.cost, self.backend) for params in grid]
+        results: Dict[int, Dict[str, Any]] = {}
+
+        if self.max_workers <= 1:
+            for i, item in enumerate(args):
+                try:
+                    results[i] = evaluate_params(*item, panel=panel)
+                except Exception as e:
+                    logger.warning(f"参数回测失败 {item[0]}: {str(e)}")
+        else:
+            # 使用 spawn 启动工作进程：不继承父进程的线程与内存，面板只通过共享内存附加
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(args)) or 1,
+                                     mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_worker, initargs=(panel.spec,)) as executor:
+                futures = {executor.submit(evaluate_params, *item): i for i, item in enumerate(args)}
+                for future in as_completed(futures):
+                    i = futures[future]
+                    try:
+                        results[i] = future.result()
+                    except BrokenProcessPool:
+                        # 工作进程无法启动或附加面板时所有参数组都会失败，直接报错而不是返回空结果
+                        raise
+                    except Exception as e:
+                        logger.warning(f"参数回测失败 {args[i][0]}: {str(e)}")
+
+        # 按网格顺序排列，指标相同的参数组保持网格中的先后顺序
+        rows = [results[i] for i in sorted(results)]
+
+        logger.info(f"参数寻优完成: {len(rows)}/{len(args)} 组参数")
+        table = pd.DataFrame(rows)
+        if table.empty:
+            return table
+        return table.sort_values(sort_by, ascending=False, kind='stable').reset_index(drop=True)
+
+
+def main():
+    """命令行入口：在本地K线上回测参数网格并输出排名"""
+    parser = argparse.ArgumentParser(description="技术指标参数寻优")
+    parser.add_argument('--market', default='A', help="市场类型")
+    parser.add_argument('--grid', default=None, help="参数网格JSON文件，格式为 {参数名: [候选值]}，默认使用内置网格")
+    parser.add_argument('--rules', default='web', help="评分规则集：内置规则集名称或JSON规则文件路径")
+    parser.add_argument('--buy', type=float, default=80, help="买入阈值")
+    parser.add_argument('--sell', type=float, default=40, help="卖出阈值")
+    parser.add_argument('--cost', type=float, default=0.0, help="单边交易成本")
+    parser.add_argument('--start', default=None, help="开始日期 YYYYMMDD")
+    parser.add_argument('--end', default=None, help="结束日期 YYYYMMDD")
+    parser.add_argument('--workers', type=int, default=None, help="工作进程数")
+    parser.add_argument('--backend', default=None, help="指标计算后端")
+    parser.add_argument('--sort-by', default='sharpe', help="排序指标")
+    parser.add_argument('--top', type=int, default=20, help="输出前N组参数")
+    args = parser.parse_args()
+
+    grid = DEFAULT_GRID
+    if args.grid:
+        with open(args.grid, 'r', encoding='utf-8') as f:
+            grid = json.load(f)
+    rule_set = ScoringRuleSet.load(args.rules) if os.path.exists(args.rules) else ScoringRuleSet.builtin(args.rules)
+    sweep = ParamSweep(rule_set, args.buy, args.sell, args.cost, args.backend, args.workers)
+
+    with BarStore().materialize_panel(args.market, start_date=args.start, end_date=args.end) as panel:
+        table = sweep.run(panel, param_grid(grid), sort_by=args.sort_by)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(table.head(args.top).to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import os
+import json
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+from server.utils.logger import get_logger
+
+# 获取日志器
+logger = get_logger()
+
+# 项目根目录（scan_checkpoint.py 位于 server/services/ 下）
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# 视为已完成、恢复时不再处理的状态；failed 多为网络等临时错误，恢复时重试
+COMPLETED_STATUSES = ('ok', 'skipped')
+
+
+def _json_default(value: Any) -> Any:
+    """把 numpy 标量等转换为可序列化的值"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class ScanCheckpoint:
+    """
+    全市场扫描的检查点
+    每只股票的处理结果（状态、得分与指标）作为一行JSON追加写入 <目录>/<run_id>.jsonl，
+    以同一 run_id 重新启动时跳过已完成的股票，并恢复已有的分析结果
+    """
+
+    def __init__(self, run_id: str, base_dir: Optional[str] = None):
+        """
+        初始化检查点
+
+        Args:
+            run_id: 扫描批次标识
+            base_dir: 检查点目录，默认读取环境变量 SCAN_CHECKPOINT_DIR，否则为 <项目根目录>/data/scan_checkpoints
+        """
+        self.run_id = run_id
+        self.base_dir = base_dir or os.getenv('SCAN_CHECKPOINT_DIR', os.path.join(BASE_DIR, 'data', 'scan_checkpoints'))
+        self.path = os.path.join(self.base_dir, f"{run_id}.jsonl")
+        self._records: Dict[str, Dict[str, Any]] = self._load()
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """读取已有记录，同一股票以最后一条为准；崩溃时写了一半的行被忽略"""
+        records: Dict[str, Dict[str, Any]] = {}
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                    records[record['stock_code']] = record
+                except (ValueError, KeyError, TypeError):
+                    logger.warning(f"忽略检查点 {self.path} 第 {line_number} 行的不完整记录")
+        if records:
+            logger.info(f"已读取扫描检查点 {self.run_id}: {len(records)} 支股票")
+        return records
+
+    @property
+    def records(self) -> Dict[str, Dict[str, Any]]:
+        """股票代码 -> 最新记录"""
+        return self._records
+
+    def completed(self) -> Set[str]:
+        """已完成（成功或跳过）的股票代码"""
+        return {code for code, record in self._records.items() if record['status'] in COMPLETED_STATUSES}
+
+    def pending(self, stock_codes: Iterable[str]) -> List[str]:
+        """过滤出尚未完成的股票，保持原有顺序"""
+        completed = self.completed()
+        return [code for code in stock_codes if code not in completed]
+
+    def results(self, stock_codes: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """
+        已保存的成功分析结果
+
+        Args:
+            stock_codes: 只返回这些股票的结果，默认返回全部
+        """
+        wanted = set(stock_codes) if stock_codes is not None else None
+        return [record['result'] for code, record in self._records.items()
+                if record['status'] == 'ok' and record.get('result') is not None
+                and (wanted is None or code in wanted)]
+
+    def append(self, outcome: Dict[str, Any]) -> None:
+        """
+        追加一只股票的处理结果，写入并同步到磁盘后返回
+
+        Args:
+            outcome: 包含 stock_code、status、result、error 的字典（ScanPipeline 的结果格式）
+        """
+        record = {
+            'stock_code': outcome['stock_code'],
+            'status': outcome['status'],
+            'result': outcome.get('result'),
+            'error': outcome.get('error'),
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        line = json.dumps(record, ensure_ascii=False, default=_json_default)
+        with self._lock:
+            if self._file is None:
+                self._file = self._open()
+            self._file.write(line + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._records[record['stock_code']] = json.loads(line)
+
+    def _open(self):
+        """以追加方式打开检查点文件；上次崩溃留下不完整的最后一行时先补换行，避免与新记录连在一起"""
+        os.makedirs(self.base_dir, exist_ok=True)
+        f = open(self.path, 'a+b')
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+        f.close()
+        return open(self.path, 'a', encoding='utf-8')
+
+    def close(self) -> None:
+        """关闭检查点文件"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self) -> 'ScanCheckpoint':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
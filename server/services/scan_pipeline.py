@@ -0,0 +1,153 @@
+import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Type
+from server.utils.logger import get_logger
+
+# 获取日志器
+logger = get_logger()
+
+# 阶段结束标记
+_DONE = object()
+
+
+class ScanPipeline:
+    """
+    流水线式的全市场扫描
+    数据获取、指标计算与打分、结果汇总三个阶段同时运行，由有界队列连接：
+      - 获取阶段：若干常驻协程从限速器获取令牌后，在IO线程池中拉取数据，吞吐量由限速器的配额决定；
+      - 计算阶段：若干常驻协程把数据交给计算线程池，计算指标与打分；
+      - 汇总阶段：单个协程依次把结果交给 sink 回调。
+    队列已满时上游阶段等待，内存占用有界；线程池在整个扫描期间复用
+    """
+
+    def __init__(self, fetch: Callable[[str], Any], compute: Callable[[str, Any], Optional[Dict[str, Any]]],
+                 sink: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 limiter: Optional[Any] = None, fetch_workers: int = 4,
+                 compute_workers: Optional[int] = None, queue_size: int = 64, max_retries: int = 3,
+                 skip_exceptions: Tuple[Type[BaseException], ...] = (ValueError,)):
+        """
+        初始化扫描流水线
+
+        Args:
+            fetch: 获取单只股票数据的阻塞函数
+            compute: 由股票代码和数据计算结果的阻塞函数，返回None表示没有结果
+            sink: 接收每只股票处理结果的回调，参数为包含 stock_code、status（ok/skipped/failed）、result、error 的字典
+            limiter: 获取阶段的限速器，需提供 acquire 协程方法，如 RateLimiter.endpoint() 返回的
+                     跨进程限速器；为空时不限速（如读取本地数据）
+            fetch_workers: 获取阶段的并发数
+            compute_workers: 计算阶段的线程数，默认为CPU核数
+            queue_size: 阶段之间队列的容量
+            max_retries: 获取数据的最大尝试次数，重试同样需要获取令牌
+            skip_exceptions: 视为数据异常直接跳过、不重试的异常类型
+        """
+        self.fetch = fetch
+        self.compute = compute
+        self.sink = sink
+        self.limiter = limiter
+        self.fetch_workers = max(1, fetch_workers)
+        self.compute_workers = max(1, compute_workers or os.cpu_count() or 1)
+        self.queue_size = queue_size
+        self.max_retries = max(1, max_retries)
+        self.skip_exceptions = skip_exceptions
+
+    async def run(self, stock_codes: Iterable[str]) -> Dict[str, Any]:
+        """
+        扫描全部股票
+
+        Args:
+            stock_codes: 股票代码
+
+        Returns:
+            统计信息：total、ok、skipped、failed 和 elapsed（秒）
+        """
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        stats = {'total': 0, 'ok': 0, 'skipped': 0, 'failed': 0}
+
+        codes: asyncio.Queue = asyncio.Queue()
+        for code in stock_codes:
+            codes.put_nowait(code)
+        stats['total'] = codes.qsize()
+        fetched: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        outcomes: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+        io_pool = ThreadPoolExecutor(max_workers=self.fetch_workers, thread_name_prefix='scan-fetch')
+        cpu_pool = ThreadPoolExecutor(max_workers=self.compute_workers, thread_name_prefix='scan-compute')
+
+        async def fetch_worker() -> None:
+            while not codes.empty():
+                code = codes.get_nowait()
+                for attempt in range(1, self.max_retries + 1):
+                    if self.limiter is not None:
+                        await self.limiter.acquire()
+                    try:
+                        data = await loop.run_in_executor(io_pool, self.fetch, code)
+                    except self.skip_exceptions as e:
+                        await outcomes.put(_outcome(code, 'skipped', error=str(e)))
+                        break
+                    except Exception as e:
+                        if attempt == self.max_retries:
+                            logger.error(f"股票 {code} 获取数据 {self.max_retries} 次后失败: {str(e)}")
+                            await outcomes.put(_outcome(code, 'failed', error=str(e)))
+                        else:
+                            logger.warning(f"股票 {code} 第 {attempt} 次获取数据失败: {str(e)}")
+                        continue
+                    await fetched.put((code, data))
+                    break
+
+        async def compute_worker() -> None:
+            while True:
+                item = await fetched.get()
+                if item is _DONE:
+                    return
+                code, data = item
+                try:
+                    result = await loop.run_in_executor(cpu_pool, self.compute, code, data)
+                except self.skip_exceptions as e:
+                    await outcomes.put(_outcome(code, 'skipped', error=str(e)))
+                except Exception as e:
+                    logger.error(f"分析股票 {code} 失败: {str(e)}")
+                    await outcomes.put(_outcome(code, 'failed', error=str(e)))
+                else:
+                    status = 'ok' if result is not None else 'skipped'
+                    await outcomes.put(_outcome(code, status, result=result))
+
+        async def sink_worker() -> None:
+            while True:
+                outcome = await outcomes.get()
+                if outcome is _DONE:
+                    return
+                stats[outcome['status']] += 1
+                if self.sink is not None:
+                    try:
+                        self.sink(outcome)
+                    except Exception as e:
+                        logger.error(f"处理股票 {outcome['stock_code']} 的结果失败: {str(e)}")
+
+        sink_task = asyncio.create_task(sink_worker())
+        compute_tasks = [asyncio.create_task(compute_worker()) for _ in range(self.compute_workers)]
+        try:
+            await asyncio.gather(*(fetch_worker() for _ in range(self.fetch_workers)))
+            for _ in compute_tasks:
+                await fetched.put(_DONE)
+            await asyncio.gather(*compute_tasks)
+            await outcomes.put(_DONE)
+            await sink_task
+        finally:
+            for task in compute_tasks + [sink_task]:
+                task.cancel()
+            io_pool.shutdown(wait=False, cancel_futures=True)
+            cpu_pool.shutdown(wait=False, cancel_futures=True)
+
+        stats['elapsed'] = time.monotonic() - started
+        logger.info(f"扫描完成: 共 {stats['total']} 支，成功 {stats['ok']}，跳过 {stats['skipped']}，"
+                    f"失败 {stats['failed']}，耗时 {stats['elapsed']:.1f}秒")
+        return stats
+
+
+def _outcome(stock_code: str, status: str, result: Optional[Dict[str, Any]] = None,
+             error: Optional[str] = None) -> Dict[str, Any]:
+    """单只股票的处理结果"""
+    return {'stock_code': stock_code, 'status': status, 'result': result, 'error': error}
@@ -0,0 +1,198 @@
+import os
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Iterable, List, Optional
+from server.utils.logger import get_logger
+from server.services.bar_store import BarStore
+from server.services.indicator_kernels import IndicatorKernels, get_kernels
+from server.services.indicator_library import IndicatorLibrary
+from server.services.scoring_rules import ScoringRuleSet
+
+# 获取日志器
+logger = get_logger()
+
+# 项目根目录（score_history.py 位于 server/services/ 下）
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+class ScoreHistory:
+    """
+    历史评分矩阵
+    对每只股票的整段日线历史一次性计算指标，并在时间轴上向量化评分，得到每个交易日的评分；
+    全部股票的结果以 (日期 x 代码) 矩阵按 市场/规则集 保存为Parquet文件，
+    评分走势和“今日评分上穿80分”之类的筛选直接查表，不需要逐只重新计算
+    """
+
+    def __init__(self, bar_store: Optional[BarStore] = None, base_dir: Optional[str] = None,
+                 rule_set: Optional[ScoringRuleSet] = None, params: Optional[Dict[str, Any]] = None,
+                 kernels: Optional[IndicatorKernels] = None):
+        """
+        初始化历史评分
+
+        Args:
+            bar_store: 本地K线仓库，默认使用项目data目录下的仓库
+            base_dir: 评分矩阵目录，默认读取环境变量 SCORE_HISTORY_DIR，否则为 <项目根目录>/data/score_history
+            rule_set: 评分规则集，默认为内置的 web 规则集（与 StockScorer 一致）
+            params: 技术指标参数配置，格式与 TechnicalIndicator 相同
+            kernels: 滚动指标的计算函数组，默认按环境变量 INDICATOR_BACKEND 选择
+        """
+        self.bar_store = bar_store if bar_store is not None else BarStore()
+        self.base_dir = base_dir or os.getenv('SCORE_HISTORY_DIR', os.path.join(BASE_DIR, 'data', 'score_history'))
+        self.rule_set = rule_set if rule_set is not None else ScoringRuleSet.builtin('web')
+        self.library = IndicatorLibrary(params)
+        self.kernels = kernels if kernels is not None else get_kernels()
+        # 最长均线窗口之前的评分缺少长期均线，视为预热期不保存
+        self.warmup = max(self.library.params.ma_periods.values())
+        self._lock = threading.Lock()
+
+    def _path(self, market_type: str) -> str:
+        """获取评分矩阵文件路径"""
+        return os.path.join(self.base_dir, market_type, f"{self.rule_set.name}.parquet")
+
+    def score_series(self, df: pd.DataFrame) -> pd.Series:
+        """
+        计算单只股票每个交易日的评分
+
+        只计算规则集用到的指标及其依赖，整段历史一次求值，评分在时间轴上向量化
+
+        Args:
+            df: 以日期为索引的日线数据，列名大小写均可
+
+        Returns:
+            以日期为索引的评分序列，预热期内为NaN
+        """
+        names = {col.lower(): col for col in df.columns if isinstance(col, str)}
+        columns = {name: df[names[name.lower()]].to_numpy() for name in ('Close', 'High', 'Low', 'Volume')
+                   if name.lower() in names}
+        view = self.library.lazy(columns, self.kernels)
+        scores = self.rule_set.score(view).astype(float)
+        scores[:self.warmup - 1] = np.nan
+        return pd.Series(scores, index=df.index)
+
+    def compute(self, market_type: str = 'A', codes: Optional[Iterable[str]] = None,
+                start_date: Optional[str] = None) -> pd.DataFrame:
+        """
+        计算多只股票的历史评分矩阵
+
+        Args:
+            market_type: 市场类型
+            codes: 股票代码，默认为K线仓库中的全部代码
+            start_date: 只保留该日期（YYYYMMDD）及之后的评分，指标仍使用完整历史计算
+
+        Returns:
+            (日期 x 代码) 的评分矩阵，没有K线或处于预热期的位置为NaN
+        """
+        codes = list(codes) if codes is not None else self.bar_store.list_codes(market_type)
+        series: Dict[str, pd.Series] = {}
+        for code in codes:
+            try:
+                df = self.bar_store.read(market_type, code)
+                if df is None or df.empty:
+                    continue
+                series[code] = self.score_series(df)
+            except Exception as e:
+                logger.warning(f"计算历史评分失败 {market_type}/{code}: {str(e)}")
+
+        if not series:
+            return pd.DataFrame(index=pd.DatetimeIndex([], name='Date'), dtype=float)
+        matrix = pd.DataFrame(series).sort_index().rename_axis('Date')
+        if start_date:
+            matrix = matrix[matrix.index >= pd.to_datetime(BarStore.normalize_date(start_date), format='%Y%m%d')]
+        return matrix
+
+    def build(self, market_type: str = 'A', codes: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        计算历史评分并写入本地；只指定部分代码时，替换矩阵中这些代码的列，其他列保持不变
+
+        Args:
+            market_type: 市场类型
+            codes: 股票代码，默认为K线仓库中的全部代码（整体重建）
+
+        Returns:
+            写入后的完整评分矩阵
+        """
+        computed = self.compute(market_type, codes)
+        if codes is not None:
+            existing = self.load(market_type)
+            if existing is not None:
+                existing = existing.drop(columns=[c for c in computed.columns if c in existing.columns])
+                computed = pd.concat([existing, computed], axis=1, sort=True).rename_axis('Date')
+        # 只有部分股票交易的日期上，其余股票为NaN；整行为空的日期无意义
+        computed = computed.dropna(how='all')
+
+        path = self._path(market_type)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先写临时文件再替换，避免并发读取到写了一半的文件
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            computed.to_parquet(tmp_path)
+            os.replace(tmp_path, path)
+        logger.info(f"已保存历史评分 {market_type}/{self.rule_set.name}: "
+                    f"{computed.shape[1]} 只股票, {computed.shape[0]} 个交易日")
+        return computed
+
+    def load(self, market_type: str = 'A') -> Optional[pd.DataFrame]:
+        """读取评分矩阵，不存在时返回None"""
+        path = self._path(market_type)
+        if not os.path.exists(path):
+            return None
+        try:
+            return pd.read_parquet(path)
+        except Exception as e:
+            logger.warning(f"读取历史评分失败 {market_type}/{self.rule_set.name}: {str(e)}")
+            return None
+
+    def history(self, stock_code: str, market_type: str = 'A') -> Optional[pd.Series]:
+        """获取单只股票的评分走势，不存在时返回None"""
+        matrix = self.load(market_type)
+        if matrix is None or stock_code not in matrix.columns:
+            return None
+        return matrix[stock_code].dropna()
+
+    def crossed_above(self, threshold: float = 80, market_type: str = 'A',
+                      date: Optional[str] = None) -> List[str]:
+        """
+        筛选在指定交易日评分上穿阈值的股票：当天评分不低于阈值，且该股票上一个有评分的交易日低于阈值
+
+        Args:
+            threshold: 评分阈值
+            market_type: 市场类型
+            date: 交易日（YYYYMMDD），默认为矩阵中的最后一个交易日
+
+        Returns:
+            股票代码列表，按当天评分降序排列
+        """
+        matrix = self.load(market_type)
+        if matrix is None or matrix.empty:
+            return []
+        if date:
+            matrix = matrix[matrix.index <= pd.to_datetime(BarStore.normalize_date(date), format='%Y%m%d')]
+            if matrix.empty:
+                return []
+        current = matrix.iloc[-1]
+        # 停牌股票当天没有评分，上一个评分取各自最近一个有效值
+        previous = matrix.iloc[:-1].ffill().iloc[-1] if len(matrix) > 1 else pd.Series(np.nan, index=matrix.columns)
+        crossed = current[(current >= threshold) & (previous < threshold)]
+        return crossed.sort_values(ascending=False, kind='stable').index.tolist()
+
+
+def main():
+    """命令行入口：重建历史评分矩阵并输出最后一个交易日评分上穿阈值的股票"""
+    parser = argparse.ArgumentParser(description="计算并保存历史评分矩阵")
+    parser.add_argument('--market', default='A', help="市场类型")
+    parser.add_argument('--rules', default='web', help="评分规则集：内置规则集名称或JSON规则文件路径")
+    parser.add_argument('--codes', nargs='*', default=None, help="只更新这些股票，默认重建全部")
+    parser.add_argument('--threshold', type=float, default=80, help="上穿筛选的评分阈值")
+    args = parser.parse_args()
+
+    rule_set = ScoringRuleSet.load(args.rules) if os.path.exists(args.rules) else ScoringRuleSet.builtin(args.rules)
+    score_history = ScoreHistory(rule_set=rule_set)
+    score_history.build(args.market, args.codes)
+    crossed = score_history.crossed_above(args.threshold, args.market)
+    print(f"评分上穿 {args.threshold:g} 的股票（{len(crossed)} 只）: {', '.join(crossed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+import os
+import json
+import operator
+import argparse
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+from server.utils.logger import get_logger
+
+# 获取日志器
+logger = get_logger()
+
+# 项目根目录（scoring_rules.py 位于 server/services/ 下）
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# 条件中支持的比较运算符
+OPERATORS: Dict[str, Callable[[np.ndarray, Any], np.ndarray]] = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+# Web服务（StockScorer）的评分规则，满分100分
+WEB_RULES: Dict[str, Any] = {
+    'name': 'web',
+    'components': [
+        # 移动平均线评分（25分）
+        {'name': 'trend', 'rules': [
+            {'when': [['MA5', '>', 'MA20'], ['MA20', '>', 'MA60']], 'score': 25},
+            {'when': [['MA5', '>', 'MA20']], 'score': 15},
+            {'when': [['Close', '>', 'MA20']], 'score': 10},
+        ]},
+        # RSI评分（25分）
+        {'name': 'rsi', 'rules': [
+            {'when': [['RSI', '>=', 45], ['RSI', '<=', 55]], 'score': 15},
+            {'when': [['RSI', '>', 55], ['RSI', '<', 70]], 'score': 25},
+            {'when': [['RSI', '>', 30], ['RSI', '<', 45]], 'score': 10},
+            {'when': [['RSI', '>=', 70]], 'score': 5},
+            {'when': [['RSI', '<=', 30]], 'score': 15},
+        ]},
+        # MACD得分（20分）
+        {'name': 'macd', 'rules': [
+            {'when': [['MACD', '>', 'Signal']], 'score': 20},
+        ]},
+        # 成交量得分（30分）
+        {'name': 'volume', 'rules': [
+            {'when': [['Volume_Ratio', '>', 1.5]], 'score': 30},
+            {'when': [['Volume_Ratio', '>', 1]], 'score': 15},
+        ]},
+    ],
+    'recommendations': [[80, '强烈推荐'], [70, '推荐'], [60, '谨慎推荐'], [40, '观望'], [20, '不推荐']],
+    'default_recommendation': '强烈不推荐',
+}
+
+# 全盘扫描（a_stock_full_scan.StockAnalyzer）的评分规则：基本打分满分100分，OBV与随机指标各调整±5分
+SCANNER_RULES: Dict[str, Any] = {
+    'name': 'scanner',
+    'components': [
+        # 趋势打分（30分）
+        {'name': 'trend', 'rules': [
+            {'when': [['MA5', '>', 'MA20'], ['MA20', '>', 'MA60']], 'score': 30},
+            {'when': [['MA5', '>', 'MA20']], 'score': 15},
+            {'when': [['MA20', '>', 'MA60']], 'score': 15},
+        ]},
+        # RSI 打分（20分）
+        {'name': 'rsi', 'rules': [
+            {'when': [['RSI', '>=', 30], ['RSI', '<=', 70]], 'score': 20},
+            {'when': [['RSI', '<', 30]], 'score': 15},
+        ]},
+        # MACD 打分（20分）
+        {'name': 'macd', 'rules': [
+            {'when': [['MACD', '>', 'Signal']], 'score': 20},
+        ]},
+        # 成交量打分（30分）
+        {'name': 'volume', 'rules': [
+            {'when': [['Volume_Ratio', '>', 1.5]], 'score': 30},
+            {'when': [['Volume_Ratio', '>', 1]], 'score': 15},
+        ]},
+        # OBV 调整：OBV > OBV_MA10 加5分，否则减5分
+        {'name': 'obv', 'rules': [
+            {'when': [['OBV', '>', 'OBV_MA10']], 'score': 5},
+        ], 'default': -5},
+        # 随机指标调整：%K < 20 超卖加5分，%K > 80 超买减5分
+        {'name': 'stochastic', 'rules': [
+            {'when': [['%K', '<', 20]], 'score': 5},
+            {'when': [['%K', '>', 80]], 'score': -5},
+        ]},
+    ],
+    'recommendations': [[80, '强烈推荐买入'], [60, '建议买入'], [40, '建议观望'], [20, '建议卖出']],
+    'default_recommendation': '强烈建议卖出',
+}
+
+# 内置规则集
+BUILTIN_RULES: Dict[str, Dict[str, Any]] = {rules['name']: rules for rules in (WEB_RULES, SCANNER_RULES)}
+
+Condition = Tuple[str, str, Union[str, float]]
+
+
+class ScoringRuleSet:
+    """
+    以数据定义的评分规则集
+    规则集由若干评分项组成，每个评分项是一组按顺序匹配的规则（第一条满足的规则生效，都不满足时取默认分），
+    规则的条件为 [列名, 运算符, 列名或数值] 的与组合；总分为各评分项之和。
+    构建时编译为 np.select 形式的向量化计算，可对任意形状的指标数组（单只股票、全市场截面或日期x股票矩阵）评分
+    """
+
+    def __init__(self, name: str, components: Sequence[Mapping[str, Any]],
+                 recommendations: Sequence[Sequence[Any]] = (), default_recommendation: str = ''):
+        """
+        初始化并编译规则集
+
+        Args:
+            name: 规则集名称
+            components: 评分项列表，每项包含 name、rules（when 条件列表与 score）和可选的 default
+            recommendations: [最低分, 建议] 列表，按分数从高到低匹配
+            default_recommendation: 低于所有阈值时的建议
+        """
+        self.name = name
+        self.components: List[Dict[str, Any]] = []
+        columns: List[str] = []
+
+        for component in components:
+            rules = []
+            for rule in component['rules']:
+                conditions = [self._compile_condition(cond) for cond in rule['when']]
+                if not conditions:
+                    raise ValueError(f"规则集 {name} 的评分项 {component['name']} 存在没有条件的规则")
+                rules.append((conditions, float(rule['score'])))
+                for left, _, right in conditions:
+                    columns.extend(col for col in (left, right) if isinstance(col, str))
+            self.components.append({
+                'name': component['name'],
+                'rules': rules,
+                'default': float(component.get('default', 0)),
+            })
+
+        self.recommendations = sorted(((float(t), str(label)) for t, label in recommendations), reverse=True)
+        self.default_recommendation = default_recommendation
+        self.required_columns: Tuple[str, ...] = tuple(dict.fromkeys(columns))
+
+    @staticmethod
+    def _compile_condition(condition: Sequence[Any]) -> Condition:
+        """校验并规范化单个条件"""
+        if len(condition) != 3:
+            raise ValueError(f"条件格式应为 [列名, 运算符, 列名或数值]: {condition}")
+        left, op, right = condition
+        if op not in OPERATORS:
+            raise ValueError(f"不支持的运算符: {op}，支持: {', '.join(OPERATORS)}")
+        if not isinstance(left, str):
+            raise ValueError(f"条件左侧应为列名: {condition}")
+        return left, op, right if isinstance(right, str) else float(right)
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'ScoringRuleSet':
+        """由规则字典（与JSON文件格式相同）构建"""
+        return cls(data['name'], data['components'], data.get('recommendations', ()),
+                   data.get('default_recommendation', ''))
+
+    @classmethod
+    def load(cls, path: str) -> 'ScoringRuleSet':
+        """从JSON文件加载规则集"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    @classmethod
+    def builtin(cls, name: str) -> 'ScoringRuleSet':
+        """获取内置规则集，见 BUILTIN_RULES"""
+        if name not in BUILTIN_RULES:
+            raise KeyError(f"未知的内置评分规则集: {name}，可选: {', '.join(BUILTIN_RULES)}")
+        return cls.from_dict(BUILTIN_RULES[name])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可写入JSON的规则字典"""
+        return {
+            'name': self.name,
+            'components': [{
+                'name': component['name'],
+                'rules': [{'when': [list(cond) for cond in conditions], 'score': score}
+                          for conditions, score in component['rules']],
+                'default': component['default'],
+            } for component in self.components],
+            'recommendations': [[threshold, label] for threshold, label in self.recommendations],
+            'default_recommendation': self.default_recommendation,
+        }
+
+    @property
+    def max_score(self) -> float:
+        """各评分项最高分之和"""
+        return sum(max([score for _, score in c['rules']] + [c['default']]) for c in self.components)
+
+    def score(self, table: Mapping[str, Any],
+              cache: Optional[Dict[Condition, np.ndarray]] = None) -> np.ndarray:
+        """
+        计算评分
+
+        Args:
+            table: 列名 -> 数组，数组形状相同（或可广播）
+            cache: 条件 -> 布尔数组的缓存，多个规则集共享同一个缓存时相同条件只计算一次
+
+        Returns:
+            评分数组，所有评分均为整数时为整数类型
+        """
+        cache = cache if cache is not None else {}
+        arrays: Dict[str, np.ndarray] = {}
+
+        def column(name: str) -> np.ndarray:
+            if name not in arrays:
+                arrays[name] = np.asarray(table[name], dtype=float)
+            return arrays[name]
+
+        def evaluate(condition: Condition) -> np.ndarray:
+            if condition not in cache:
+                left, op, right = condition
+                right_value = column(right) if isinstance(right, str) else right
+                cache[condition] = OPERATORS[op](column(left), right_value)
+            return cache[condition]
+
+        total: Any = 0
+        with np.errstate(invalid='ignore'):
+            for component in self.components:
+                choices = [np.logical_and.reduce([evaluate(c) for c in conditions]) if len(conditions) > 1
+                           else evaluate(conditions[0]) for conditions, _ in component['rules']]
+                total = total + np.select(choices, [score for _, score in component['rules']], component['default'])
+
+        total = np.asarray(total)
+        if all(float(s).is_integer() for c in self.components for s in [c['default']] + [r[1] for r in c['rules']]):
+            return total.astype(int)
+        return total
+
+    def recommend(self, scores: Any) -> np.ndarray:
+        """
+        根据评分获取建议
+
+        Args:
+            scores: 评分或评分数组
+
+        Returns:
+            与评分同形状的建议文本数组
+        """
+        scores = np.asarray(scores)
+        if not self.recommendations:
+            return np.full(scores.shape, self.default_recommendation, dtype=object)
+        return np.select([scores >= t for t, _ in self.recommendations],
+                         [label for _, label in self.recommendations], self.default_recommendation)
+
+
+def load_rule_sets(directory: Optional[str] = None) -> Dict[str, ScoringRuleSet]:
+    """
+    加载内置规则集以及目录中的全部JSON规则集，同名时文件中的定义覆盖内置定义
+
+    Args:
+        directory: 规则文件目录，默认读取环境变量 SCORING_RULES_DIR，否则为 <项目根目录>/data/scoring_rules
+
+    Returns:
+        规则集名称 -> ScoringRuleSet
+    """
+    directory = directory or os.getenv('SCORING_RULES_DIR', os.path.join(BASE_DIR, 'data', 'scoring_rules'))
+    rule_sets = {name: ScoringRuleSet.from_dict(rules) for name, rules in BUILTIN_RULES.items()}
+    if os.path.isdir(directory):
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                rule_set = ScoringRuleSet.load(os.path.join(directory, filename))
+                rule_sets[rule_set.name] = rule_set
+            except Exception as e:
+                logger.warning(f"加载评分规则文件失败 {filename}: {str(e)}")
+    return rule_sets
+
+
+def score_rule_sets(rule_sets: Sequence[ScoringRuleSet], table: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    在同一份指标数据上一次计算多个规则集的评分，各规则集共用的条件只计算一次
+
+    Args:
+        rule_sets: 规则集列表
+        table: 列名 -> 数组
+
+    Returns:
+        规则集名称 -> 评分数组
+    """
+    cache: Dict[Condition, np.ndarray] = {}
+    return {rule_set.name: rule_set.score(table, cache) for rule_set in rule_sets}
+
+
+def main():
+    """命令行入口：用本地K线仓库中股票的最新指标比较多个规则集的评分"""
+    from server.services.bar_store import BarStore
+    from server.services.indicator_library import IndicatorLibrary
+
+    parser = argparse.ArgumentParser(description="用多个评分规则集对本地K线仓库中的股票评分")
+    parser.add_argument('--rules', nargs='*', default=None, help="规则集名称，默认使用全部已加载的规则集")
+    parser.add_argument('--rules-dir', default=None, help="规则文件目录")
+    parser.add_argument('--market', default='A', help="市场类型")
+    parser.add_argument('--top', type=int, default=20, help="每个规则集输出的最高分股票数")
+    args = parser.parse_args()
+
+    available = load_rule_sets(args.rules_dir)
+    names = args.rules or list(available)
+    rule_sets = [available[name] for name in names]
+    columns = list(dict.fromkeys(col for rs in rule_sets for col in rs.required_columns))
+
+    store = BarStore()
+    library = IndicatorLibrary()
+    codes, rows = [], []
+    for code in store.list_codes(args.market):
+        df = store.read(args.market, code)
+        if df is None or df.empty:
+            continue
+        view = library.lazy(df)
+        rows.append([view[col][-1] for col in columns])
+        codes.append(code)
+    table = pd.DataFrame(rows, index=codes, columns=columns)
+
+    for name, scores in score_rule_sets(rule_sets, table).items():
+        top = np.argsort(-scores, kind='stable')[:args.top]
+        print(f"\n规则集 {name}（{len(codes)} 只股票）")
+        for i in top:
+            print(f"  {codes[i]}  {scores[i]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+import os
+import sys
+import glob
+import json
+import threading
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, Mapping, Optional, Sequence
+from server.utils.logger import get_logger
+from server.services.indicator_library import INPUT_COLUMNS
+
+# 获取日志器
+logger = get_logger()
+
+# 内存映射面板的索引文件名
+PANEL_INDEX_FILE = 'index.json'
+
+_attach_lock = threading.Lock()
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    附加到已有的共享内存，且不登记到资源跟踪器，避免附加方退出时释放创建方的共享内存
+
+    Python 3.13 起使用 track=False；更早的版本附加时也会登记，而 spawn 启动的工作进程与创建方共用
+    同一个资源跟踪器，事后 unregister 会连同创建方的登记一起删除（创建方 unlink 时跟踪器报错，
+    创建方异常退出时共享内存泄漏），因此在附加期间跳过登记
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    with _attach_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args, **kwargs: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class SharedPanel:
+    """
+    可跨进程共享的全市场价格面板
+    Close、High、Low、Volume 按实际交易日对齐为 (字段 x 日期 x 股票) 的 float64 数组，
+    停牌或未上市的位置为NaN；数组放在 multiprocessing.shared_memory 或内存映射的 .npy 文件中，
+    工作进程用 spec 描述信息附加到同一份数据，只读访问，不需要序列化整个面板
+    """
+
+    FIELDS = INPUT_COLUMNS
+
+    __slots__ = ('symbols', 'dates', 'values', 'path', '_shm', '_owner', '_positions')
+
+    def __init__(self, symbols: Sequence[str], dates: np.ndarray, values: np.ndarray,
+                 shm: Optional[shared_memory.SharedMemory] = None, owner: bool = False,
+                 path: Optional[str] = None):
+        """
+        初始化价格面板
+
+        Args:
+            symbols: 股票代码列表，对应数组的最后一维
+            dates: datetime64 交易日数组，对应数组的第二维
+            values: (字段 x 日期 x 股票) 数组，字段顺序为 FIELDS
+            shm: 数组所在的共享内存
+            owner: 是否为共享内存的创建方，创建方负责释放共享内存
+            path: 数组所在的 .npy 文件（内存映射）
+        """
+        self.symbols = list(symbols)
+        self.dates = dates
+        self.values = values
+        self.path = path
+        self._shm = shm
+        self._owner = owner
+        self._positions = {symbol: j for j, symbol in enumerate(self.symbols)}
+
+    @classmethod
+    def create(cls, symbols: Sequence[str], dates: np.ndarray, arrays: Mapping[str, np.ndarray],
+               directory: Optional[str] = None) -> 'SharedPanel':
+        """
+        把 (日期 x 股票) 数组复制到新建的共享内存，或写入目录中的内存映射文件
+
+        Args:
+            symbols: 股票代码列表
+            dates: datetime64 交易日数组
+            arrays: 字段名 -> (日期 x 股票) 数组，需包含 FIELDS 中的全部字段
+            directory: 内存映射面板目录；为空时使用共享内存
+
+        Returns:
+            SharedPanel实例
+        """
+        dates = np.asarray(dates, dtype='datetime64[ns]')
+        if directory is not None:
+            cls._write_memmap(directory, symbols, dates, arrays)
+            return cls.open(directory)
+
+        shape = (len(cls.FIELDS), len(dates), len(symbols))
+        nbytes = max(int(np.prod(shape)) * np.dtype(np.float64).itemsize, 1)
+        shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        values = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        for i, name in enumerate(cls.FIELDS):
+            values[i] = arrays[name]
+        logger.debug(f"已创建共享价格面板 {shm.name}: {len(symbols)} 只股票, {len(dates)} 个交易日, "
+                     f"{nbytes / 1024 / 1024:.1f}MB")
+        return cls(symbols, dates, values, shm=shm, owner=True)
+
+    @classmethod
+    def from_frames(cls, frames: Mapping[str, pd.DataFrame], directory: Optional[str] = None) -> 'SharedPanel':
+        """
+        由各字段的 (日期 x 代码) DataFrame 创建，按日期并集与代码并集对齐
+
+        Args:
+            frames: 字段名 -> DataFrame，需包含 FIELDS 中的全部字段
+            directory: 内存映射面板目录；为空时使用共享内存
+
+        Returns:
+            SharedPanel实例
+        """
+        dates = pd.DatetimeIndex([])
+        symbols = pd.Index([])
+        for name in cls.FIELDS:
+            dates = dates.union(frames[name].index)
+            symbols = symbols.union(frames[name].columns, sort=False)
+        arrays = {name: frames[name].reindex(index=dates, columns=symbols).to_numpy(dtype=float)
+                  for name in cls.FIELDS}
+        return cls.create(list(symbols), dates.to_numpy(dtype='datetime64[ns]'), arrays, directory)
+
+    @classmethod
+    def _write_memmap(cls, directory: str, symbols: Sequence[str], dates: np.ndarray,
+                      arrays: Mapping[str, np.ndarray]) -> None:
+        """
+        写入内存映射面板：数组写入带时间戳的 .npy 文件，再原子替换索引文件指向它；
+        已打开旧面板的进程继续使用旧文件，不会读到写了一半的数据。
+        上一版数组文件保留到下一次写入时才删除，刚读到旧索引、尚未打开数组文件的进程仍能打开它
+        """
+        os.makedirs(directory, exist_ok=True)
+        file_name = f"values_{datetime.now().strftime('%Y%m%d%H%M%S%f')}.npy"
+        data_path = os.path.join(directory, file_name)
+        shape = (len(cls.FIELDS), len(dates), len(symbols))
+
+        tmp_data_path = f"{data_path}.{os.getpid()}.tmp"
+        values = np.lib.format.open_memmap(tmp_data_path, mode='w+', dtype=np.float64, shape=shape)
+        for i, name in enumerate(cls.FIELDS):
+            values[i] = arrays[name]
+        values.flush()
+        del values
+        os.replace(tmp_data_path, data_path)
+
+        index = {
+            'file': file_name,
+            'fields': list(cls.FIELDS),
+            'dates': [str(d) for d in dates.astype('datetime64[D]')],
+            # 代码 -> 列号
+            'symbols': {symbol: j for j, symbol in enumerate(symbols)},
+        }
+        index_path = os.path.join(directory, PANEL_INDEX_FILE)
+        keep = {file_name}
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    keep.add(json.load(f)['file'])
+            except Exception as e:
+                logger.warning(f"读取旧的价格面板索引失败 {index_path}: {str(e)}")
+        tmp_index_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(tmp_index_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(tmp_index_path, index_path)
+
+        # 删除上一版之前的数组文件（已打开的内存映射在关闭前仍然有效）
+        for old_path in glob.glob(os.path.join(directory, 'values_*.npy')):
+            if os.path.basename(old_path) not in keep:
+                try:
+                    os.remove(old_path)
+                except OSError as e:
+                    logger.warning(f"删除旧的价格面板文件失败 {old_path}: {str(e)}")
+        logger.info(f"已写入内存映射价格面板 {data_path}: {len(symbols)} 只股票, {len(dates)} 个交易日")
+
+    @classmethod
+    def open(cls, directory: str) -> Optional['SharedPanel']:
+        """
+        以只读内存映射打开目录中的面板
+
+        Args:
+            directory: 内存映射面板目录
+
+        Returns:
+            SharedPanel实例，面板不存在时返回None
+        """
+        index_path = os.path.join(directory, PANEL_INDEX_FILE)
+        if not os.path.exists(index_path):
+            return None
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if tuple(index['fields']) != cls.FIELDS:
+            raise ValueError(f"价格面板字段不匹配: {index['fields']}")
+
+        data_path = os.path.join(directory, index['file'])
+        values = np.load(data_path, mmap_mode='r')
+        symbols = sorted(index['symbols'], key=index['symbols'].get)
+        dates = np.array(index['dates'], dtype='datetime64[ns]')
+        return cls(symbols, dates, values, path=data_path)
+
+    @property
+    def spec(self) -> Dict[str, Any]:
+        """工作进程附加面板所需的描述信息（共享内存名称或文件路径、形状、代码与日期）"""
+        spec = {'shape': self.values.shape, 'symbols': self.symbols, 'dates': self.dates}
+        if self._shm is not None:
+            spec['name'] = self._shm.name
+        elif self.path is not None:
+            spec['path'] = self.path
+        else:
+            raise ValueError("面板不在共享内存或内存映射文件中")
+        return spec
+
+    @classmethod
+    def attach(cls, spec: Mapping[str, Any]) -> 'SharedPanel':
+        """
+        在工作进程中按描述信息附加面板，数组只读且不复制
+
+        Args:
+            spec: 创建方 spec 属性的值
+
+        Returns:
+            SharedPanel实例（附加方）
+        """
+        if 'path' in spec:
+            values = np.load(spec['path'], mmap_mode='r')
+            return cls(spec['symbols'], spec['dates'], values, path=spec['path'])
+
+        shm = _attach_shared_memory(spec['name'])
+        values = np.ndarray(tuple(spec['shape']), dtype=np.float64, buffer=shm.buf)
+        values.flags.writeable = False
+        return cls(spec['symbols'], spec['dates'], values, shm=shm, owner=False)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        """获取某个字段的 (日期 x 股票) 数组"""
+        return self.values[self.FIELDS.index(field)]
+
+    def position(self, symbol: str) -> int:
+        """获取股票所在的列号"""
+        return self._positions[symbol]
+
+    def columns(self, symbol: str, compact: bool = True) -> Dict[str, np.ndarray]:
+        """
+        获取单只股票的各字段数组
+
+        Args:
+            symbol: 股票代码
+            compact: 是否去掉收盘价为NaN的交易日（停牌、未上市），与逐只读取K线得到的序列一致
+
+        Returns:
+            字段名 -> 一维数组
+        """
+        j = self.position(symbol)
+        columns = {name: self.values[i, :, j] for i, name in enumerate(self.FIELDS)}
+        if compact:
+            rows = ~np.isnan(columns['Close'])
+            columns = {name: values[rows] for name, values in columns.items()}
+        return columns
+
+    def close(self) -> None:
+        """断开与面板数据的连接；共享内存的创建方同时释放共享内存"""
+        self.values = None
+        if self._shm is None:
+            return
+        try:
+            self._shm.close()
+        except BufferError:
+            # 外部仍持有数组视图时无法解除映射，映射随视图释放；创建方仍可删除共享内存名称
+            logger.debug(f"共享价格面板 {self._shm.name} 仍有数组视图在使用")
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
+
+    def __enter__(self) -> 'SharedPanel':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
@@ -5,8 +5,9 @@ from typing import List, AsyncGenerator
 from server.utils.logger import get_logger
 from server.services.stock_data_provider import StockDataProvider
 from server.services.technical_indicator import TechnicalIndicator
+from server.services.indicator_panel import PricePanel, PanelIndicatorEngine
 from server.services.stock_scorer import StockScorer
-from server.services.ai_analyzer import AIAnalyzer
+from server.services.ai_analyzer import AIAnalyzer, RECENT_DATA_DAYS
 
 # 获取日志器
 logger = get_logger()
@@ -30,6 +31,7 @@ class StockAnalyzerService:
         # 初始化各个组件
         self.data_provider = StockDataProvider()
         self.indicator = TechnicalIndicator()
+        self.panel_engine = PanelIndicatorEngine(self.indicator.params)
         self.scorer = StockScorer()
         self.ai_analyzer = AIAnalyzer(
             custom_api_url=custom_api_url,
@@ -66,22 +68,31 @@ class StockAnalyzerService:
         """
         stock_name_to_pass = stock_code # Default to code
         sector_to_pass = None # Default to None
+        concepts_to_pass = None
+        metadata_task = None
+        metadata_received = False
 
         try:
             # 港股代码格式化逻辑已移至 web 层，这里不再处理
             logger.info(f"开始分析股票: {stock_code}, 市场: {market_type}")
             
-            # 获取股票数据
-            df = await self.data_provider.get_stock_data(stock_code, market_type)
+            # 名称/行业/概念信息与K线数据并发获取，元数据不阻塞K线和指标计算
+            metadata_task = asyncio.create_task(self.data_provider.get_stock_metadata(stock_code, market_type))
+            bars = await self.data_provider.get_stock_bars(stock_code, market_type)
             
-            # 尝试尽早获取股票名称和行业信息
-            stock_name_to_pass = getattr(df, 'stock_name', stock_code)
-            sector_to_pass = getattr(df, 'sector', None)
+            # 元数据已返回时尽早使用股票名称和行业信息
+            if metadata_task.done():
+                metadata = metadata_task.result()
+                stock_name_to_pass = metadata['stock_name'] or stock_code
+                sector_to_pass = metadata['sector']
+                concepts_to_pass = metadata['concepts']
+                metadata_received = True
             logger.debug(f"Extracted for single analysis: stock_name='{stock_name_to_pass}', sector='{sector_to_pass}' for {stock_code}")
 
             # 检查是否有错误
-            if hasattr(df, 'error'):
-                error_msg = df.error
+            if bars.error is not None:
+                metadata_task.cancel()
+                error_msg = bars.error
                 logger.error(f"获取股票数据时出错: {error_msg}")
                 yield json.dumps({
                     "stock_code": stock_code,
@@ -93,7 +104,8 @@ class StockAnalyzerService:
                 return
             
             # 检查数据是否为空
-            if df.empty:
+            if bars.empty:
+                metadata_task.cancel()
                 error_msg = f"获取到的股票 {stock_code} ({stock_name_to_pass}) 数据为空"
                 logger.error(error_msg)
                 yield json.dumps({
@@ -105,17 +117,10 @@ class StockAnalyzerService:
                 })
                 return
             
-            # 计算技术指标
-            df_with_indicators = self.indicator.calculate_indicators(df)
-            # 确保股票名称和行业信息在指标计算后仍然存在
-            if not hasattr(df_with_indicators, 'stock_name') and stock_name_to_pass != stock_code:
-                df_with_indicators.stock_name = stock_name_to_pass
-            if not hasattr(df_with_indicators, 'sector') and sector_to_pass:
-                df_with_indicators.sector = sector_to_pass
-            
-            # 重新获取，确保使用的是 df_with_indicators 上的属性（如果存在）
-            current_stock_name = getattr(df_with_indicators, 'stock_name', stock_name_to_pass)
-            current_sector = getattr(df_with_indicators, 'sector', sector_to_pass)
+            # 计算技术指标：评分只用最新一根K线，AI分析只用最近若干根，因此只计算尾部
+            df_with_indicators = self.indicator.calculate_indicators(bars, tail=RECENT_DATA_DAYS)
+            current_stock_name = stock_name_to_pass
+            current_sector = sector_to_pass
 
             # 计算评分
             score = self.scorer.calculate_score(df_with_indicators)
@@ -194,6 +199,21 @@ class StockAnalyzerService:
             # 输出基本分析结果
             logger.info(f"基本分析结果 ({stock_code} - {current_stock_name}): {json.dumps(basic_result)}")
             yield json.dumps({**basic_result, "status": "processing_ai"}) # 更新状态
+
+            # 元数据晚于K线返回时，等待后单独推送名称和行业，AI分析需要用到这些信息
+            if not metadata_received:
+                metadata = await metadata_task
+                current_stock_name = metadata['stock_name'] or stock_code
+                current_sector = metadata['sector']
+                concepts_to_pass = metadata['concepts']
+                basic_result["stock_name"] = current_stock_name
+                yield json.dumps({
+                    "stock_code": stock_code,
+                    "stock_name": current_stock_name,
+                    "sector": current_sector,
+                    "market_type": market_type,
+                    "status": "processing_ai"
+                })
             
             # 使用AI进行深入分析
             ai_analysis_full_text = ""
@@ -205,7 +225,8 @@ class StockAnalyzerService:
                     market_type, 
                     stream,
                     stock_name=current_stock_name, # 传递股票名称
-                    sector=current_sector if current_sector is not None else "" # 传递行业信息，如果为None则使用空字符串
+                    sector=current_sector if current_sector is not None else "", # 传递行业信息，如果为None则使用空字符串
+                    concepts=concepts_to_pass # 传递概念板块信息
                 ):
                     try:
                         chunk_data = json.loads(analysis_chunk_str)
@@ -270,6 +291,8 @@ class StockAnalyzerService:
             logger.info(f"完成股票分析: {stock_code} ({current_stock_name})")
             
         except Exception as e:
+            if metadata_task is not None:
+                metadata_task.cancel()
             error_msg = f"分析股票 {stock_code} ({stock_name_to_pass}) 时出错: {str(e)}"
             logger.error(error_msg)
             logger.exception(e) # 记录完整的异常堆栈
@@ -343,12 +366,27 @@ class StockAnalyzerService:
                     await asyncio.sleep(2)
                 continue # Move to the next batch
 
+            # 整个批次的技术指标在价格面板上一次性向量化计算，失败时退回逐只计算
+            panel_indicators = None
+            valid_bars = [bars for bars in batch_stock_data.values() if bars.ok]
+            if valid_bars:
+                try:
+                    panel_indicators = self.panel_engine.calculate(PricePanel.from_bars(valid_bars))
+                except Exception as e:
+                    logger.warning(f"批次 {batch_codes} 面板指标计算失败，改为逐只计算: {str(e)}")
+
+            # 面板上每只股票的最新指标组成列式表格，整个批次一次性评分
+            batch_scores = None
+            if panel_indicators is not None:
+                latest_table = {name: panel_indicators.latest(name) for name in self.scorer.required_indicators}
+                latest_table['Close'] = panel_indicators.panel.close[-1]
+                batch_scores = self.scorer.calculate_scores(latest_table)
+
             for code in batch_codes:
                 try:
                     # Extract stock_name early, use code as fallback. This will be used in all subsequent messages for this stock.
-                    # df is from batch_stock_data.get(code), which should have stock_name if stock_data_provider worked.
-                    # df_with_indicators will be used later for AI, but stock_name should be on df already.
-                    stock_name_early = getattr(batch_stock_data.get(code), 'stock_name', code) # Fallback to code if name not on df
+                    bars = batch_stock_data.get(code)
+                    stock_name_early = (bars.stock_name if bars is not None else None) or code
 
                     yield json.dumps({
                         "stock_code": code,
@@ -357,9 +395,8 @@ class StockAnalyzerService:
                         "status": "processing_data"
                     })
 
-                    df = batch_stock_data.get(code) # df is already retrieved
-                    if df is None or df.empty or hasattr(df, 'error'):
-                        error_msg = f"获取股票 {code} 数据为空或出错: {getattr(df, 'error', '未知错误') if hasattr(df, 'error') else '数据为空'}"
+                    if bars is None or not bars.ok:
+                        error_msg = f"获取股票 {code} 数据为空或出错: {bars.error if bars is not None and bars.error else '数据为空'}"
                         logger.error(error_msg)
                         yield json.dumps({
                             "stock_code": code,
@@ -372,10 +409,10 @@ class StockAnalyzerService:
 
                     # 计算技术指标
                     try:
-                        df_with_indicators = self.indicator.calculate_indicators(df)
-                        # Ensure stock_name is carried over if calculate_indicators creates a new df without attributes
-                        if not hasattr(df_with_indicators, 'stock_name') and hasattr(df, 'stock_name'):
-                            df_with_indicators.stock_name = df.stock_name
+                        if panel_indicators is not None:
+                            df_with_indicators = panel_indicators.frame(code)
+                        else:
+                            df_with_indicators = self.indicator.calculate_indicators(bars, tail=RECENT_DATA_DAYS)
                     except Exception as e:
                         error_msg = f"计算股票 {code} 技术指标时出错: {str(e)}"
                         logger.error(error_msg)
@@ -388,11 +425,13 @@ class StockAnalyzerService:
                         })
                         continue
                     
-                    # Re-fetch stock_name from df_with_indicators, as it's the source for AI. Fallback to stock_name_early.
-                    current_stock_name = getattr(df_with_indicators, 'stock_name', stock_name_early)
+                    current_stock_name = stock_name_early
 
                     # 计算评分
-                    score = self.scorer.calculate_score(df_with_indicators)
+                    if batch_scores is not None:
+                        score = int(batch_scores[panel_indicators.panel.position(code)])
+                    else:
+                        score = self.scorer.calculate_score(df_with_indicators)
                     recommendation = self.scorer.get_recommendation(score)
 
                     # 获取最新数据用于基础分析
@@ -438,7 +477,7 @@ class StockAnalyzerService:
                     ai_analysis_full_text = ""
                     ai_analysis_error = False
                     try:
-                        sector_to_pass = getattr(df_with_indicators, 'sector', None)
+                        sector_to_pass = bars.sector
                         
                         logger.debug(f"Extracted for AI: stock_name='{current_stock_name}', sector='{sector_to_pass}' for {code}")
 
@@ -448,7 +487,8 @@ class StockAnalyzerService:
                             market_type,
                             stream=True, # Explicitly True for batch
                             stock_name=current_stock_name,
-                            sector=sector_to_pass if sector_to_pass is not None else ""
+                            sector=sector_to_pass if sector_to_pass is not None else "",
+                            concepts=bars.concepts
                         ):
                             try:
                                 chunk_data = json.loads(analysis_chunk_str)
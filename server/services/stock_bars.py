@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class StockBars:
+    """
+    股票日线数据及元数据
+    以NumPy数组按列保存K线，名称、行业、概念板块和错误信息作为显式字段，
+    不再以属性形式附加在DataFrame上（DataFrame复制后这些属性会丢失）；
+    使用 __slots__ 保持对象紧凑，便于缓存和跨进程传递
+    """
+
+    __slots__ = ('stock_code', 'market_type', 'dates', 'columns',
+                 'stock_name', 'sector', 'concepts', 'error')
+
+    def __init__(self, stock_code: str, market_type: str,
+                 dates: Optional[np.ndarray] = None,
+                 columns: Optional[Dict[str, np.ndarray]] = None,
+                 stock_name: Optional[str] = None,
+                 sector: Optional[str] = None,
+                 concepts: Optional[List[str]] = None,
+                 error: Optional[str] = None):
+        """
+        初始化K线数据
+
+        Args:
+            stock_code: 股票代码
+            market_type: 市场类型
+            dates: datetime64 日期数组，按升序排列
+            columns: 列名 -> 与 dates 等长的数组
+            stock_name: 股票名称
+            sector: 所属行业
+            concepts: 所属概念板块列表
+            error: 获取失败时的错误信息
+        """
+        self.stock_code = stock_code
+        self.market_type = market_type
+        self.dates = dates if dates is not None else np.empty(0, dtype='datetime64[ns]')
+        self.columns = columns if columns is not None else {}
+        self.stock_name = stock_name
+        self.sector = sector
+        self.concepts = concepts
+        self.error = error
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, stock_code: str, market_type: str, **metadata: Any) -> 'StockBars':
+        """
+        从以日期为索引的DataFrame构建，列数据直接取底层数组
+
+        Args:
+            df: 以日期为索引的标准化K线数据
+            stock_code: 股票代码
+            market_type: 市场类型
+            **metadata: stock_name、sector、concepts 等元数据
+
+        Returns:
+            StockBars实例
+        """
+        dates = pd.DatetimeIndex(df.index).to_numpy()
+        columns = {str(name): df[name].to_numpy() for name in df.columns}
+        return cls(stock_code, market_type, dates, columns, **metadata)
+
+    @classmethod
+    def failed(cls, stock_code: str, market_type: str, error: str) -> 'StockBars':
+        """构建表示获取失败的空结果"""
+        return cls(stock_code, market_type, error=error)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+    def __contains__(self, column: str) -> bool:
+        return column in self.columns
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.columns)
+
+    def __repr__(self) -> str:
+        if self.error:
+            return f"StockBars({self.market_type}/{self.stock_code}, error={self.error!r})"
+        return f"StockBars({self.market_type}/{self.stock_code}, rows={len(self)}, columns={list(self.columns)})"
+
+    @property
+    def empty(self) -> bool:
+        """是否没有任何K线"""
+        return len(self.dates) == 0
+
+    @property
+    def ok(self) -> bool:
+        """数据获取成功且非空"""
+        return self.error is None and not self.empty
+
+    def with_metadata(self, metadata: Dict[str, Any]) -> 'StockBars':
+        """
+        填充名称、行业和概念板块信息
+
+        Args:
+            metadata: 包含 stock_name、sector、concepts 的字典
+
+        Returns:
+            自身，便于链式调用
+        """
+        self.stock_name = metadata.get('stock_name')
+        self.sector = metadata.get('sector')
+        self.concepts = metadata.get('concepts')
+        return self
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        转换为以日期为索引的DataFrame
+
+        列直接引用内部数组而不复制；在返回的DataFrame上新增列不会影响本对象
+
+        Returns:
+            以日期为索引的DataFrame
+        """
+        index = pd.DatetimeIndex(self.dates, name='Date')
+        return pd.DataFrame(self.columns, index=index, copy=False)
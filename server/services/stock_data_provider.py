@@ -1,27 +1,67 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 import asyncio
 from typing import Dict, List, Optional, Tuple, Any
 from server.utils.logger import get_logger
+from server.utils.rate_limiter import LimitedModule, RateLimiter, get_rate_limiter
+from server.services.bar_store import BarStore
+from server.services.concept_index import ConceptIndex, get_concept_index
+from server.services.metadata_cache import MetadataCache, get_metadata_cache
+from server.services.stock_universe import StockUniverse, get_stock_universe
+from server.services.stock_bars import StockBars
+from server.services.indicator_state import IndicatorState, IndicatorStateStore
 
 # 获取日志器
 logger = get_logger()
 
+# 数据源只提供完整历史的市场，整体缓存
+FULL_HISTORY_MARKETS = ('HK', 'US')
+# 完整历史缓存的覆盖起点
+FULL_HISTORY_START = '19700101'
+# 增量刷新时与已有数据重叠的自然日天数，用于校验复权价格
+TAIL_OVERLAP_DAYS = 10
+# 复权价格一致性校验的相对误差
+ADJUST_TOLERANCE = 1e-4
+
 class StockDataProvider:
     """
     异步股票数据提供服务
     负责获取股票、基金等金融产品的历史数据
     """
     
-    def __init__(self):
-        """初始化数据提供者服务"""
+    def __init__(self, bar_store: Optional[BarStore] = None,
+                 concept_index: Optional[ConceptIndex] = None,
+                 metadata_cache: Optional[MetadataCache] = None,
+                 indicator_state_store: Optional[IndicatorStateStore] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 universe: Optional[StockUniverse] = None):
+        """
+        初始化数据提供者服务
+
+        Args:
+            bar_store: 本地K线数据仓库，默认使用项目data目录下的仓库
+            concept_index: 概念板块索引，默认使用进程内共享的索引
+            metadata_cache: 股票名称/行业元数据缓存，默认使用进程内共享的缓存
+            indicator_state_store: 分钟K线增量指标状态存储，默认使用项目data目录下的存储
+            rate_limiter: akshare 接口的限速器，默认使用进程内共享的限速器（配额见 server.utils.rate_limiter）
+            universe: A股股票池，提供名称和行业，默认使用进程内共享的股票池
+        """
+        self.bar_store = bar_store if bar_store is not None else BarStore()
+        self.concept_index = concept_index if concept_index is not None else get_concept_index()
+        self.metadata_cache = metadata_cache if metadata_cache is not None else get_metadata_cache()
+        self.indicator_state_store = (indicator_state_store if indicator_state_store is not None
+                                      else IndicatorStateStore())
+        self.rate_limiter = rate_limiter if rate_limiter is not None else get_rate_limiter()
+        self.universe = universe if universe is not None else get_stock_universe()
         logger.debug("初始化StockDataProvider")
     
     async def get_stock_data(self, stock_code: str, market_type: str = 'A', 
                             start_date: Optional[str] = None, 
-                            end_date: Optional[str] = None) -> pd.DataFrame:
+                            end_date: Optional[str] = None) -> StockBars:
         """
         异步获取股票或基金数据
+        K线数据与名称/行业/概念信息并发获取，元数据填充到返回的StockBars中
         
         Args:
             stock_code: 股票代码
@@ -30,26 +70,60 @@ class StockDataProvider:
             end_date: 结束日期，格式YYYYMMDD，默认为今天
             
         Returns:
-            包含历史数据的DataFrame
+            包含历史数据和元数据的StockBars
+        """
+        bars, metadata = await asyncio.gather(
+            self.get_stock_bars(stock_code, market_type, start_date, end_date),
+            self.get_stock_metadata(stock_code, market_type)
+        )
+        if bars.error is None:
+            bars.with_metadata(metadata)
+        return bars
+
+    async def get_stock_bars(self, stock_code: str, market_type: str = 'A',
+                             start_date: Optional[str] = None,
+                             end_date: Optional[str] = None) -> StockBars:
+        """
+        异步获取日线K线数据（不含名称/行业等元数据）
+        
+        Args:
+            stock_code: 股票代码
+            market_type: 市场类型，默认为'A'股
+            start_date: 开始日期，格式YYYYMMDD，默认为一年前
+            end_date: 结束日期，格式YYYYMMDD，默认为今天
+            
+        Returns:
+            包含历史数据的StockBars，出错时为带error信息的空StockBars
         """
         # 使用线程池执行同步的akshare调用
         return await asyncio.to_thread(
-            self._get_stock_data_sync, 
+            self._get_stock_bars_sync, 
             stock_code, 
             market_type, 
             start_date, 
             end_date
         )
+
+    async def get_stock_metadata(self, stock_code: str, market_type: str = 'A') -> Dict[str, Any]:
+        """
+        异步获取股票名称、行业和概念板块信息
+        
+        Args:
+            stock_code: 股票代码
+            market_type: 市场类型，默认为'A'股
+            
+        Returns:
+            包含 stock_name、sector、concepts 的字典，获取失败的字段为None
+        """
+        return await asyncio.to_thread(self._get_stock_info_sync, stock_code, market_type)
     
-    def _get_stock_data_sync(self, stock_code: str, market_type: str = 'A', 
-                           start_date: Optional[str] = None, 
-                           end_date: Optional[str] = None) -> pd.DataFrame:
+    def _get_stock_bars_sync(self, stock_code: str, market_type: str = 'A', 
+                             start_date: Optional[str] = None, 
+                             end_date: Optional[str] = None) -> StockBars:
         """
-        同步获取股票数据的实现
-        将被异步方法调用
+        同步获取K线数据的实现
+        将被异步方法调用，优先读取本地K线仓库
         """
-        import akshare as ak
-        
         if start_date is None:
             start_date = (datetime.now() - timedelta(days=365)).strftime('%Y%m%d')
         if end_date is None:
@@ -62,264 +136,428 @@ class StockDataProvider:
             end_date = end_date.replace('-', '')
             
         try:
+            df = self._load_bars_sync(stock_code, market_type, start_date, end_date)
+            return StockBars.from_frame(df, stock_code, market_type)
+            
+        except Exception as e:
+            error_msg = f"获取{market_type}数据失败 {stock_code}: {str(e)}"
+            logger.error(error_msg)
+            logger.exception(e)
+            # 返回带错误信息的空结果，而不是抛出异常
+            # 这样上层调用者可以检查是否有错误并适当处理
+            return StockBars.failed(stock_code, market_type, error_msg)
+
+    def _get_stock_info_sync(self, stock_code: str, market_type: str = 'A') -> Dict[str, Any]:
+        """
+        同步获取股票名称、行业和概念板块信息的实现
+        任何失败只记录警告，返回的对应字段为None
+        """
+        stock_name_val = None
+        sector_val = None
+        concepts_val = None
+        try:
+            metadata = self._get_stock_metadata_sync(stock_code, market_type)
+            stock_name_val = metadata.get('stock_name')
+            sector_val = metadata.get('sector')
+
             if market_type == 'A':
-                logger.debug(f"获取A股数据: {stock_code}")
-                
-                df = ak.stock_zh_a_hist(
-                    symbol=stock_code,
-                    start_date=start_date,
-                    end_date=end_date,
-                    adjust="qfq"
-                )
-                
-            elif market_type in ['HK']:
-                logger.debug(f"获取港股数据: {stock_code}")
-                df = ak.stock_hk_daily(
-                    symbol=stock_code,
-                    adjust="qfq"
-                )
-                
-                # 在获取数据后进行日期过滤
-                try:
-                    if not isinstance(df.index, pd.DatetimeIndex):
-                        # 如果存在命名为'date'的列，将其设为索引
-                        if 'date' in df.columns:
-                            df['date'] = pd.to_datetime(df['date'])
-                            df.set_index('date', inplace=True)
-                        else:
-                            # 尝试将第一列转换为日期索引
-                            date_col = df.columns[0]
-                            df[date_col] = pd.to_datetime(df[date_col])
-                            df.set_index(date_col, inplace=True)
-                    
-                    # 转换日期字符串为日期对象
-                    if start_date:
-                        if start_date.isdigit() and len(start_date) == 8:
-                            start_date_dt = pd.to_datetime(start_date, format='%Y%m%d')
-                        else:
-                            start_date_dt = pd.to_datetime(start_date)
-                    else:
-                        start_date_dt = pd.to_datetime((datetime.now() - timedelta(days=365)).strftime('%Y%m%d'))
-                        
-                    if end_date:
-                        if end_date.isdigit() and len(end_date) == 8:
-                            end_date_dt = pd.to_datetime(end_date, format='%Y%m%d')
-                        else:
-                            end_date_dt = pd.to_datetime(end_date)
-                    else:
-                        end_date_dt = pd.to_datetime(datetime.now().strftime('%Y%m%d'))
-                    
-                    # 过滤日期范围
-                    df = df[(df.index >= start_date_dt) & (df.index <= end_date_dt)]
-                    logger.debug(f"港股日期过滤后数据点数: {len(df)}")
-                    
-                except Exception as e:
-                    logger.warning(f"港股日期过滤出错: {str(e)}，使用原始数据")
-                
-            elif market_type in ['US']:
-                logger.debug(f"获取美股数据: {stock_code}")
-                try:
-                    df = ak.stock_us_daily(
-                        symbol=stock_code,
-                        adjust="qfq"
-                    )
-                    logger.debug(f"美股数据原始列: {df.columns.tolist()}")
-                    logger.debug(f"美股数据形状: {df.shape}")
-                    
-                    # 确保索引是日期时间类型
-                    if not isinstance(df.index, pd.DatetimeIndex):
-                        # 如果存在命名为'date'的列，将其设为索引
-                        if 'date' in df.columns:
-                            df['date'] = pd.to_datetime(df['date'])
-                            df.set_index('date', inplace=True)
-                            logger.debug("已将'date'列设置为索引")
-                        else:
-                            # 否则将当前索引转换为日期类型
-                            df.index = pd.to_datetime(df.index)
-                            logger.debug("已将索引转换为DatetimeIndex")
-                    
-                    # 计算美股的成交额（Amount）= 成交量（Volume）× 收盘价（Close）
-                    volume_col = next((col for col in df.columns if col.lower() == 'volume'), None)
-                    close_col = next((col for col in df.columns if col.lower() == 'close'), None)
-                    
-                    if volume_col and close_col:
-                        df['amount'] = df[volume_col] * df[close_col]
-                        logger.debug("已为美股数据计算成交额(amount)字段")
+                # 获取股票的概念板块信息
+                concepts_val = self.get_stock_concept_info(stock_code)
+            
+            if stock_name_val:
+                logger.info(f"成功获取股票名称: {stock_name_val} for {stock_code}")
+            else:
+                logger.warning(f"未能从akshare获取股票名称 for {stock_code}")
+
+            if sector_val:
+                logger.info(f"成功获取行业信息: {sector_val} for {stock_code}")
+            else:
+                logger.warning(f"未能从akshare获取行业信息 for {stock_code}")
+            
+            if concepts_val and len(concepts_val) > 0:
+                logger.info(f"成功获取概念板块信息: {', '.join(concepts_val[:3])}... 共{len(concepts_val)}个 for {stock_code}")
+            else:
+                concepts_val = None
+                logger.warning(f"未能从akshare获取概念板块信息 for {stock_code}")
+
+        except Exception as e_info:
+            logger.warning(f"获取股票名称/行业/概念信息失败 for {stock_code} ({market_type}): {str(e_info)}")
+
+        return {
+            'stock_name': stock_name_val or None,
+            'sector': sector_val or None,
+            'concepts': concepts_val
+        }
+
+    def _get_stock_metadata_sync(self, stock_code: str, market_type: str) -> Dict[str, Any]:
+        """
+        获取股票名称和行业信息，优先读取元数据缓存，A股其次读取本地股票池
+
+        Returns:
+            包含 stock_name 和 sector 的字典
+        """
+        cached = self.metadata_cache.get(market_type, stock_code)
+        if cached is not None:
+            logger.debug(f"从元数据缓存读取 {market_type}/{stock_code}: {cached}")
+            return cached
+
+        if market_type == 'A':
+            listed = self.universe.lookup(stock_code)
+            if listed is not None and listed.get('name'):
+                metadata = {'stock_name': listed['name'], 'sector': listed.get('industry')}
+                self.metadata_cache.set(market_type, stock_code, metadata)
+                return metadata
+
+        metadata = self._fetch_metadata_sync(stock_code, market_type)
+        # 只缓存成功获取到名称的结果，失败时下次重新获取
+        if metadata.get('stock_name'):
+            self.metadata_cache.set(market_type, stock_code, metadata)
+        return metadata
+
+    def _fetch_metadata_sync(self, stock_code: str, market_type: str) -> Dict[str, Any]:
+        """
+        从数据源获取股票名称和行业信息
+
+        Returns:
+            包含 stock_name 和 sector 的字典，基金等无个股信息的品种返回空值
+        """
+        import akshare as ak
+        ak = LimitedModule(ak, 'akshare', self.rate_limiter)
+
+        stock_name_val = None
+        sector_val = None
+        if market_type == 'A':
+            # stock_code for A-shares usually doesn't need prefix for stock_individual_info_em
+            info_df = ak.stock_individual_info_em(symbol=stock_code)
+            stock_name_val = info_df[info_df['item'] == '股票简称']['value'].iloc[0]
+            sector_val = info_df[info_df['item'] == '行业']['value'].iloc[0]
+        elif market_type == 'HK':
+            # hk_stock_individual_info_em expects 5-digit code, e.g., "00700"
+            # Assuming stock_code is already formatted correctly (e.g., "00700")
+            info_df = ak.hk_stock_individual_info_em(symbol=stock_code)
+            stock_name_val = info_df[info_df['item'] == '名称']['value'].iloc[0]
+            sector_val = info_df[info_df['item'] == '行业']['value'].iloc[0] # Check if '行业' or '所属行业'
+        elif market_type == 'US':
+            # stock_us_individual_info_em expects symbol like "AAPL"
+            # Assuming stock_code is the correct symbol like "AAPL"
+            info_df = ak.stock_us_individual_info_em(symbol=stock_code)
+            stock_name_val = info_df[info_df['item'] == 'name']['value'].iloc[0]
+            sector_val = info_df[info_df['item'] == 'industry']['value'].iloc[0]
+        return {'stock_name': stock_name_val, 'sector': sector_val}
+
+    def _load_bars_sync(self, stock_code: str, market_type: str,
+                        start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        读取日线K线数据
+        本地仓库覆盖请求范围且未过期时直接读取；已有缓存时只增量获取尾部数据；
+        否则从数据源获取完整区间并写回仓库
+        """
+        if self.bar_store is None:
+            return self._fetch_bars_sync(stock_code, market_type, start_date, end_date)
+
+        if self.bar_store.is_fresh(market_type, stock_code, start_date, end_date):
+            df = self.bar_store.read(market_type, stock_code, start_date, end_date)
+            if df is not None:
+                logger.info(f"从本地仓库读取{market_type} OHLCV数据 {stock_code}, 数据点数: {len(df)}")
+                return df
+
+        if market_type in FULL_HISTORY_MARKETS:
+            # 港股/美股数据源只能返回完整历史，一次性整体缓存，后续任意起始日期都可直接命中
+            df = self._fetch_bars_sync(stock_code, market_type, FULL_HISTORY_START, end_date)
+            self._write_bars(stock_code, market_type, df, FULL_HISTORY_START, end_date)
+            return self._slice_bars(df, start_date, end_date)
+
+        meta = self.bar_store.read_meta(market_type, stock_code)
+        cached = self.bar_store.read(market_type, stock_code)
+        if meta and cached is not None and not cached.empty and meta['start'] <= start_date:
+            df = self._refresh_tail_sync(stock_code, market_type, cached, meta['start'], max(end_date, meta['end']))
+            return self._slice_bars(df, start_date, end_date)
+
+        # 请求范围早于已有缓存时，合并成一个连续区间重新获取，避免缩小已缓存的范围
+        fetch_start, fetch_end = start_date, end_date
+        if meta and cached is not None:
+            fetch_start, fetch_end = min(start_date, meta['start']), max(end_date, meta['end'])
+        df = self._fetch_bars_sync(stock_code, market_type, fetch_start, fetch_end)
+        self._write_bars(stock_code, market_type, df, fetch_start, fetch_end)
+        return self._slice_bars(df, start_date, end_date)
+
+    def _refresh_tail_sync(self, stock_code: str, market_type: str, cached: pd.DataFrame,
+                           covered_start: str, end_date: str) -> pd.DataFrame:
+        """
+        增量刷新本地K线数据的尾部
+
+        从最后一个已存储交易日往前回溯 TAIL_OVERLAP_DAYS 天开始获取，
+        用重叠区间的收盘价校验前复权价格是否因分红送转被整体调整，
+        若发生调整则重新获取完整区间并重写，否则只追加新数据
+
+        Args:
+            stock_code: 股票代码
+            market_type: 市场类型
+            cached: 本地已存储的完整K线数据
+            covered_start: 本地数据覆盖的开始日期，格式YYYYMMDD
+            end_date: 结束日期，格式YYYYMMDD
+
+        Returns:
+            刷新后的完整K线数据
+        """
+        last_date = cached.index.max()
+        tail_start = (last_date - timedelta(days=TAIL_OVERLAP_DAYS)).strftime('%Y%m%d')
+        logger.debug(f"增量获取{market_type}数据 {stock_code}: {tail_start} - {end_date}")
+        tail = self._fetch_bars_sync(stock_code, market_type, tail_start, end_date)
+
+        if tail.empty:
+            # 区间内没有新的交易日（例如节假日），仅刷新覆盖范围
+            self._write_bars(stock_code, market_type, cached, covered_start, end_date)
+            return cached
+
+        if not self._is_adjustment_consistent(cached, tail):
+            logger.info(f"检测到{market_type} {stock_code} 前复权价格发生调整，重新获取完整历史数据")
+            df = self._fetch_bars_sync(stock_code, market_type, covered_start, end_date)
+            self._write_bars(stock_code, market_type, df, covered_start, end_date)
+            return df
+
+        df = pd.concat([cached[cached.index < tail.index.min()], tail])
+        logger.info(f"增量更新{market_type} OHLCV数据 {stock_code}, 新增数据点数: {len(df) - len(cached)}")
+        # 在仓库的锁内与当前存储的数据合并，不会覆盖同时追加的快照K线
+        try:
+            self.bar_store.append(market_type, stock_code, tail, end_date)
+        except Exception as e:
+            logger.warning(f"追加本地K线数据失败 {market_type}/{stock_code}: {str(e)}")
+        return df
+
+    @staticmethod
+    def _is_adjustment_consistent(cached: pd.DataFrame, tail: pd.DataFrame) -> bool:
+        """
+        校验缓存与新获取数据在重叠交易日上的前复权收盘价是否一致
+
+        缓存的最后一根K线可能是盘中获取的未完成K线，不参与比较；
+        没有可比较的重叠交易日时视为不一致，以保证数据正确
+        """
+        common = cached.index[:-1].intersection(tail.index)
+        if len(common) == 0:
+            return False
+        cached_close = cached.loc[common, 'Close'].to_numpy(dtype=float)
+        tail_close = tail.loc[common, 'Close'].to_numpy(dtype=float)
+        return bool(np.allclose(cached_close, tail_close, rtol=ADJUST_TOLERANCE, equal_nan=True))
+
+    def _write_bars(self, stock_code: str, market_type: str, df: pd.DataFrame,
+                    start_date: str, end_date: str) -> None:
+        """写回本地仓库，失败时仅记录警告"""
+        if df.empty:
+            return
+        try:
+            self.bar_store.write(market_type, stock_code, df, start_date, end_date)
+        except Exception as e:
+            logger.warning(f"写入本地K线数据失败 {market_type}/{stock_code}: {str(e)}")
+
+    @staticmethod
+    def _slice_bars(df: pd.DataFrame, start_date: str, end_date: str) -> pd.DataFrame:
+        """按日期范围截取K线数据"""
+        start_dt = pd.to_datetime(start_date, format='%Y%m%d')
+        end_dt = pd.to_datetime(end_date, format='%Y%m%d')
+        return df[(df.index >= start_dt) & (df.index <= end_dt)]
+
+    def _fetch_bars_sync(self, stock_code: str, market_type: str,
+                         start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        从数据源获取日线K线数据并标准化列名
+        """
+        import akshare as ak
+        ak = LimitedModule(ak, 'akshare', self.rate_limiter)
+
+        if market_type == 'A':
+            logger.debug(f"获取A股数据: {stock_code}")
+            
+            df = ak.stock_zh_a_hist(
+                symbol=stock_code,
+                start_date=start_date,
+                end_date=end_date,
+                adjust="qfq"
+            )
+            
+        elif market_type in ['HK']:
+            logger.debug(f"获取港股数据: {stock_code}")
+            df = ak.stock_hk_daily(
+                symbol=stock_code,
+                adjust="qfq"
+            )
+            
+            # 在获取数据后进行日期过滤
+            try:
+                if not isinstance(df.index, pd.DatetimeIndex):
+                    # 如果存在命名为'date'的列，将其设为索引
+                    if 'date' in df.columns:
+                        df['date'] = pd.to_datetime(df['date'])
+                        df.set_index('date', inplace=True)
                     else:
-                        logger.warning(f"美股数据缺少volume或close列，无法计算amount。当前列: {df.columns.tolist()}")
-                        # 添加空的amount列，避免后续处理错误
-                        df['amount'] = 0.0
-                        
-                    # 将所有列名转为小写以进行统一处理
-                    df.columns = [col.lower() for col in df.columns]
-                    
-                except Exception as e:
-                    logger.error(f"获取美股数据失败 {stock_code}: {str(e)}")
-                    raise ValueError(f"获取美股数据失败 {stock_code}: {str(e)}")
+                        # 尝试将第一列转换为日期索引
+                        date_col = df.columns[0]
+                        df[date_col] = pd.to_datetime(df[date_col])
+                        df.set_index(date_col, inplace=True)
                 
-                # 将字符串日期转换为日期时间对象进行比较
-                try:
-                    # 尝试多种格式解析日期
-                    # 如果日期是数字格式（20220101），使用适当的格式
+                # 转换日期字符串为日期对象
+                if start_date:
                     if start_date.isdigit() and len(start_date) == 8:
                         start_date_dt = pd.to_datetime(start_date, format='%Y%m%d')
                     else:
-                        # 否则让pandas自动推断格式
                         start_date_dt = pd.to_datetime(start_date)
-                        
+                else:
+                    start_date_dt = pd.to_datetime((datetime.now() - timedelta(days=365)).strftime('%Y%m%d'))
+                    
+                if end_date:
                     if end_date.isdigit() and len(end_date) == 8:
                         end_date_dt = pd.to_datetime(end_date, format='%Y%m%d')
                     else:
                         end_date_dt = pd.to_datetime(end_date)
-                except Exception as e:
-                    logger.warning(f"日期转换出错: {str(e)}，使用默认值")
-                    # 如果转换失败，使用合理的默认值
-                    start_date_dt = pd.to_datetime('20000101', format='%Y%m%d')
-                    end_date_dt = pd.to_datetime(datetime.now().strftime('%Y%m%d'), format='%Y%m%d')
+                else:
+                    end_date_dt = pd.to_datetime(datetime.now().strftime('%Y%m%d'))
                 
-                # 过滤日期
-                try:
-                    df = df[(df.index >= start_date_dt) & (df.index <= end_date_dt)]
-                    logger.debug(f"日期过滤后数据点数: {len(df)}")
-                except Exception as e:
-                    logger.warning(f"日期过滤出错: {str(e)}，返回原始数据")
-                    
-            elif market_type in ['ETF']:
-                logger.debug(f"获取{market_type}基金数据: {stock_code}")
-                df = ak.fund_etf_hist_em(
-                    symbol=stock_code,
-                    start_date=start_date.replace('-', ''),
-                    end_date=end_date.replace('-', '')
-                )
-            elif market_type in ['LOF']:
-                logger.debug(f"获取{market_type}基金数据: {stock_code}")
-                df = ak.fund_lof_hist_em(
+                # 过滤日期范围
+                df = df[(df.index >= start_date_dt) & (df.index <= end_date_dt)]
+                logger.debug(f"港股日期过滤后数据点数: {len(df)}")
+                
+            except Exception as e:
+                logger.warning(f"港股日期过滤出错: {str(e)}，使用原始数据")
+            
+        elif market_type in ['US']:
+            logger.debug(f"获取美股数据: {stock_code}")
+            try:
+                df = ak.stock_us_daily(
                     symbol=stock_code,
-                    start_date=start_date.replace('-', ''),
-                    end_date=end_date.replace('-', '')
+                    adjust="qfq"
                 )
+                logger.debug(f"美股数据原始列: {df.columns.tolist()}")
+                logger.debug(f"美股数据形状: {df.shape}")
                 
-            else:
-                error_msg = f"不支持的市场类型: {market_type}"
-                logger.error(f"[市场类型错误] {error_msg}")
-                raise ValueError(error_msg)
-                
-            # 标准化列名
-            if market_type == 'A':
-                # 根据实际数据结构调整列名映射
-                # 实际数据列：['日期', '股票代码', '开盘', '收盘', '最高', '最低', '成交量', '成交额', '振幅', '涨跌幅', '涨跌额', '换手率']
-                df.columns = ['Date', 'Code', 'Open', 'Close', 'High', 'Low', 'Volume', 'Amount', 'Amplitude', 'Change_pct', 'Change', 'Turnover']
-            elif market_type in ['HK', 'US']:
-                # 美股数据列可能不同，需要通过映射处理
-                columns_mapping = {
-                    'open': 'Open',
-                    'high': 'High',
-                    'low': 'Low',
-                    'close': 'Close',
-                    'volume': 'Volume',
-                    'amount': 'Amount'
-                }
-                
-                # 创建新的DataFrame以确保列顺序和存在性
-                new_df = pd.DataFrame(index=df.index)
-                
-                # 遍历映射，填充新DataFrame
-                for orig_col, new_col in columns_mapping.items():
-                    if orig_col in df.columns:
-                        new_df[new_col] = df[orig_col]
+                # 确保索引是日期时间类型
+                if not isinstance(df.index, pd.DatetimeIndex):
+                    # 如果存在命名为'date'的列，将其设为索引
+                    if 'date' in df.columns:
+                        df['date'] = pd.to_datetime(df['date'])
+                        df.set_index('date', inplace=True)
+                        logger.debug("已将'date'列设置为索引")
                     else:
-                        # 如果原始列不存在，创建一个填充0的列
-                        logger.warning(f"数据中缺少{orig_col}列，使用0值填充")
-                        new_df[new_col] = 0.0
-                
-                # 替换原始df
-                df = new_df
+                        # 否则将当前索引转换为日期类型
+                        df.index = pd.to_datetime(df.index)
+                        logger.debug("已将索引转换为DatetimeIndex")
                 
-            elif market_type in ['ETF', 'LOF']:
-                # 基金数据可能有不同的列
-                df.columns = ['Date', 'Open', 'Close', 'High', 'Low', 'Volume', 'Amount', 'Amplitude', 'Change_pct', 'Change', 'Turnover']
+                # 计算美股的成交额（Amount）= 成交量（Volume）× 收盘价（Close）
+                volume_col = next((col for col in df.columns if col.lower() == 'volume'), None)
+                close_col = next((col for col in df.columns if col.lower() == 'close'), None)
                 
-            # 确保日期列是日期类型
-            if 'Date' in df.columns:
-                df['Date'] = pd.to_datetime(df['Date'])
-                df.set_index('Date', inplace=True)
-                
-            # 确保按日期升序排序
-            df.sort_index(inplace=True)
-                
-            logger.info(f"成功获取{market_type} OHLCV数据 {stock_code}, 数据点数: {len(df)}")
-
-            # 获取股票名称和行业信息
-            stock_name_val = None
-            sector_val = None
-            concepts_val = None
-            try:
-                if market_type == 'A':
-                    # stock_code for A-shares usually doesn't need prefix for stock_individual_info_em
-                    info_df = ak.stock_individual_info_em(symbol=stock_code)
-                    stock_name_val = info_df[info_df['item'] == '股票简称']['value'].iloc[0]
-                    sector_val = info_df[info_df['item'] == '行业']['value'].iloc[0]
-                    
-                    # 获取股票的概念板块信息
-                    concepts_val = self.get_stock_concept_info(stock_code)
+                if volume_col and close_col:
+                    df['amount'] = df[volume_col] * df[close_col]
+                    logger.debug("已为美股数据计算成交额(amount)字段")
+                else:
+                    logger.warning(f"美股数据缺少volume或close列，无法计算amount。当前列: {df.columns.tolist()}")
+                    # 添加空的amount列，避免后续处理错误
+                    df['amount'] = 0.0
                     
-                elif market_type == 'HK':
-                    # hk_stock_individual_info_em expects 5-digit code, e.g., "00700"
-                    # Assuming stock_code is already formatted correctly (e.g., "00700")
-                    info_df = ak.hk_stock_individual_info_em(symbol=stock_code)
-                    stock_name_val = info_df[info_df['item'] == '名称']['value'].iloc[0]
-                    sector_val = info_df[info_df['item'] == '行业']['value'].iloc[0] # Check if '行业' or '所属行业'
-                elif market_type == 'US':
-                    # stock_us_individual_info_em expects symbol like "AAPL"
-                    # Assuming stock_code is the correct symbol like "AAPL"
-                    info_df = ak.stock_us_individual_info_em(symbol=stock_code)
-                    stock_name_val = info_df[info_df['item'] == 'name']['value'].iloc[0]
-                    sector_val = info_df[info_df['item'] == 'industry']['value'].iloc[0]
+                # 将所有列名转为小写以进行统一处理
+                df.columns = [col.lower() for col in df.columns]
                 
-                if stock_name_val:
-                    df.stock_name = stock_name_val
-                    logger.info(f"成功获取股票名称: {stock_name_val} for {stock_code}")
+            except Exception as e:
+                logger.error(f"获取美股数据失败 {stock_code}: {str(e)}")
+                raise ValueError(f"获取美股数据失败 {stock_code}: {str(e)}")
+            
+            # 将字符串日期转换为日期时间对象进行比较
+            try:
+                # 尝试多种格式解析日期
+                # 如果日期是数字格式（20220101），使用适当的格式
+                if start_date.isdigit() and len(start_date) == 8:
+                    start_date_dt = pd.to_datetime(start_date, format='%Y%m%d')
                 else:
-                    df.stock_name = None
-                    logger.warning(f"未能从akshare获取股票名称 for {stock_code}")
-
-                if sector_val:
-                    df.sector = sector_val
-                    logger.info(f"成功获取行业信息: {sector_val} for {stock_code}")
+                    # 否则让pandas自动推断格式
+                    start_date_dt = pd.to_datetime(start_date)
+                    
+                if end_date.isdigit() and len(end_date) == 8:
+                    end_date_dt = pd.to_datetime(end_date, format='%Y%m%d')
                 else:
-                    df.sector = None
-                    logger.warning(f"未能从akshare获取行业信息 for {stock_code}")
+                    end_date_dt = pd.to_datetime(end_date)
+            except Exception as e:
+                logger.warning(f"日期转换出错: {str(e)}，使用默认值")
+                # 如果转换失败，使用合理的默认值
+                start_date_dt = pd.to_datetime('20000101', format='%Y%m%d')
+                end_date_dt = pd.to_datetime(datetime.now().strftime('%Y%m%d'), format='%Y%m%d')
+            
+            # 过滤日期
+            try:
+                df = df[(df.index >= start_date_dt) & (df.index <= end_date_dt)]
+                logger.debug(f"日期过滤后数据点数: {len(df)}")
+            except Exception as e:
+                logger.warning(f"日期过滤出错: {str(e)}，返回原始数据")
                 
-                if concepts_val and len(concepts_val) > 0:
-                    df.concepts = concepts_val
-                    logger.info(f"成功获取概念板块信息: {', '.join(concepts_val[:3])}... 共{len(concepts_val)}个 for {stock_code}")
+        elif market_type in ['ETF']:
+            logger.debug(f"获取{market_type}基金数据: {stock_code}")
+            df = ak.fund_etf_hist_em(
+                symbol=stock_code,
+                start_date=start_date.replace('-', ''),
+                end_date=end_date.replace('-', '')
+            )
+        elif market_type in ['LOF']:
+            logger.debug(f"获取{market_type}基金数据: {stock_code}")
+            df = ak.fund_lof_hist_em(
+                symbol=stock_code,
+                start_date=start_date.replace('-', ''),
+                end_date=end_date.replace('-', '')
+            )
+            
+        else:
+            error_msg = f"不支持的市场类型: {market_type}"
+            logger.error(f"[市场类型错误] {error_msg}")
+            raise ValueError(error_msg)
+            
+        # 标准化列名
+        if market_type == 'A':
+            # 根据实际数据结构调整列名映射
+            # 实际数据列：['日期', '股票代码', '开盘', '收盘', '最高', '最低', '成交量', '成交额', '振幅', '涨跌幅', '涨跌额', '换手率']
+            df.columns = ['Date', 'Code', 'Open', 'Close', 'High', 'Low', 'Volume', 'Amount', 'Amplitude', 'Change_pct', 'Change', 'Turnover']
+        elif market_type in ['HK', 'US']:
+            # 美股数据列可能不同，需要通过映射处理
+            columns_mapping = {
+                'open': 'Open',
+                'high': 'High',
+                'low': 'Low',
+                'close': 'Close',
+                'volume': 'Volume',
+                'amount': 'Amount'
+            }
+            
+            # 创建新的DataFrame以确保列顺序和存在性
+            new_df = pd.DataFrame(index=df.index)
+            
+            # 遍历映射，填充新DataFrame
+            for orig_col, new_col in columns_mapping.items():
+                if orig_col in df.columns:
+                    new_df[new_col] = df[orig_col]
                 else:
-                    df.concepts = None
-                    logger.warning(f"未能从akshare获取概念板块信息 for {stock_code}")
-
-            except Exception as e_info:
-                logger.warning(f"获取股票名称/行业/概念信息失败 for {stock_code} ({market_type}): {str(e_info)}")
-                df.stock_name = None
-                df.sector = None
-                df.concepts = None
+                    # 如果原始列不存在，创建一个填充0的列
+                    logger.warning(f"数据中缺少{orig_col}列，使用0值填充")
+                    new_df[new_col] = 0.0
             
-            return df
+            # 替换原始df
+            df = new_df
             
-        except Exception as e:
-            error_msg = f"获取{market_type}数据失败 {stock_code}: {str(e)}"
-            logger.error(error_msg)
-            logger.exception(e)
-            # 使用空的DataFrame并添加错误信息，而不是抛出异常
-            # 这样上层调用者可以检查是否有错误并适当处理
-            df = pd.DataFrame()
-            df.error = error_msg  # 添加错误属性
-            return df
+        elif market_type in ['ETF', 'LOF']:
+            # 基金数据可能有不同的列
+            df.columns = ['Date', 'Open', 'Close', 'High', 'Low', 'Volume', 'Amount', 'Amplitude', 'Change_pct', 'Change', 'Turnover']
+            
+        # 确保日期列是日期类型
+        if 'Date' in df.columns:
+            df['Date'] = pd.to_datetime(df['Date'])
+            df.set_index('Date', inplace=True)
+            
+        # 确保按日期升序排序
+        df.sort_index(inplace=True)
             
+        logger.info(f"成功获取{market_type} OHLCV数据 {stock_code}, 数据点数: {len(df)}")
+        return df
+
     async def get_multiple_stocks_data(self, stock_codes: List[str], 
                                      market_type: str = 'A',
                                      start_date: Optional[str] = None, 
                                      end_date: Optional[str] = None,
-                                     max_concurrency: int = 5) -> Dict[str, pd.DataFrame]:
+                                     max_concurrency: int = 5) -> Dict[str, StockBars]:
         """
         异步批量获取多只股票数据
         
@@ -331,7 +569,7 @@ class StockDataProvider:
             max_concurrency: 最大并发数，默认为5
             
         Returns:
-            字典，键为股票代码，值为对应的DataFrame
+            字典，键为股票代码，值为对应的StockBars
         """
         # 使用信号量控制并发数
         semaphore = asyncio.Semaphore(max_concurrency)
@@ -351,11 +589,12 @@ class StockDataProvider:
         results = await asyncio.gather(*tasks)
         
         # 构建结果字典，过滤掉失败的请求
-        return {code: df for code, df in results if df is not None}
+        return {code: bars for code, bars in results if bars is not None}
 
     def get_stock_concept_info(self, stock_code: str) -> list:
         """
         获取股票的概念板块信息
+        从本地概念板块索引中查询，索引过期时在后台重建
         
         Args:
             stock_code: 股票代码
@@ -363,7 +602,6 @@ class StockDataProvider:
         Returns:
             包含股票概念板块的列表
         """
-        import akshare as ak
         try:
             # 确保股票代码格式正确（去掉可能的市场前缀）
             if '.' in stock_code:
@@ -373,28 +611,10 @@ class StockDataProvider:
                 
             logger.debug(f"获取股票概念板块信息: {pure_code}")
             
-            # 获取所有的概念板块名称
-            concept_names_df = ak.stock_board_concept_name_em()
-            
-            # 存储该股票所属的概念板块
-            stock_concepts = []
-            
-            # 遍历概念板块，查找股票所属的板块
-            for _, concept_row in concept_names_df.iterrows():
-                concept_code = concept_row['代码']
-                concept_name = concept_row['板块名称']
-                
-                try:
-                    # 获取该概念板块的成份股
-                    cons_df = ak.stock_board_concept_cons_em(symbol=concept_code)
-                    
-                    # 检查当前股票是否在这个概念板块中
-                    if pure_code in cons_df['代码'].values:
-                        stock_concepts.append(concept_name)
-                        logger.debug(f"股票 {pure_code} 属于概念板块: {concept_name}")
-                except Exception as e:
-                    logger.warning(f"获取概念板块 {concept_name} 成份股时出错: {str(e)}")
-                    continue
+            self.concept_index.ensure_fresh()
+            stock_concepts = self.concept_index.get(pure_code)
+            if not stock_concepts and self.concept_index.updated_at is None:
+                logger.info(f"概念板块索引尚未构建完成，暂无股票 {pure_code} 的概念板块信息")
             
             logger.info(f"股票 {pure_code} 共属于 {len(stock_concepts)} 个概念板块")
             return stock_concepts
@@ -448,6 +668,7 @@ class StockDataProvider:
         同步获取股票分钟级别K线数据的实现
         """
         import akshare as ak
+        ak = LimitedModule(ak, 'akshare', self.rate_limiter)
         from datetime import datetime, timedelta
         
         if market_type != 'A':
@@ -545,6 +766,47 @@ class StockDataProvider:
             df.error = error_msg
             return df
 
+    async def get_minute_indicators(self, stock_code: str, period: str = '60',
+                                    market_type: str = 'A') -> Dict[str, Any]:
+        """
+        异步获取分钟K线的最新技术指标
+
+        Args:
+            stock_code: 股票代码
+            period: 时间周期，支持 '1', '5', '15', '30', '60', '120', '240'
+            market_type: 市场类型，目前仅支持'A'股
+
+        Returns:
+            包含最新指标值和K线时间的字典，失败时包含 error
+        """
+        return await asyncio.to_thread(self._get_minute_indicators_sync, stock_code, period, market_type)
+
+    def _get_minute_indicators_sync(self, stock_code: str, period: str = '60',
+                                    market_type: str = 'A') -> Dict[str, Any]:
+        """
+        同步获取分钟K线最新技术指标的实现
+
+        读取本地保存的增量指标状态，只把状态之后的新K线（以及可能更新过的最后一根）加入计算；
+        没有状态或新数据与状态之间有缺口时，用本次获取的K线重新初始化
+        """
+        df = self._get_stock_minute_data_sync(stock_code, period, market_type=market_type)
+        error = getattr(df, 'error', None)
+        if error:
+            return {'error': error}
+        if df.empty:
+            return {'error': f"没有{period}分钟K线数据 {stock_code}"}
+
+        state = self.indicator_state_store.load(market_type, stock_code, period)
+        timestamps = set(df.index.astype(str))
+        if state is None or state.last_timestamp not in timestamps:
+            logger.debug(f"初始化{period}分钟指标状态: {stock_code}")
+            state = IndicatorState.from_history(df)
+        else:
+            state.update_frame(df)
+        self.indicator_state_store.save(market_type, stock_code, period, state)
+
+        return {'timestamp': state.last_timestamp, 'indicators': state.values()}
+
     def _resample_to_120min(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         将60分钟K线数据重采样为120分钟K线数据
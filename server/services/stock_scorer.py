@@ -1,6 +1,8 @@
+import numpy as np
 import pandas as pd
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Mapping, Optional, Tuple
 from server.utils.logger import get_logger
+from server.services.scoring_rules import ScoringRuleSet, WEB_RULES
 
 # 获取日志器
 logger = get_logger()
@@ -8,70 +10,40 @@ logger = get_logger()
 class StockScorer:
     """
     股票评分服务
-    负责根据技术指标计算股票的综合评分
+    负责根据技术指标计算股票的综合评分，评分规则由 ScoringRuleSet 定义，默认为内置的 web 规则集
     """
+
+    # 默认规则集用到的技术指标列，只需评分时可传给 TechnicalIndicator.calculate_indicators 的 outputs
+    REQUIRED_INDICATORS = tuple(col for col in ScoringRuleSet.from_dict(WEB_RULES).required_columns if col != 'Close')
     
-    def __init__(self):
-        """初始化股票评分服务"""
-        logger.debug("初始化StockScorer股票评分服务")
+    def __init__(self, rule_set: Optional[ScoringRuleSet] = None):
+        """
+        初始化股票评分服务
+
+        Args:
+            rule_set: 评分规则集，默认为内置的 web 规则集（满分100分）
+        """
+        self.rule_set = rule_set if rule_set is not None else ScoringRuleSet.builtin('web')
+        logger.debug(f"初始化StockScorer股票评分服务，规则集: {self.rule_set.name}")
+
+    @property
+    def required_indicators(self) -> Tuple[str, ...]:
+        """当前规则集用到的技术指标列"""
+        return tuple(col for col in self.rule_set.required_columns if col != 'Close')
     
     def calculate_score(self, df: pd.DataFrame) -> int:
         """
-        计算股票评分（满分100分）
+        计算股票评分（默认规则集满分100分）
         
         Args:
             df: 包含技术指标的DataFrame
             
         Returns:
-            股票评分（0-100的整数）
+            股票评分（整数）
         """
         try:
             # 使用最新的数据点进行评分
-            latest = df.iloc[-1]
-            
-            # 初始得分为0
-            score = 0
-            
-            # 移动平均线评分（25分）
-            if latest['MA5'] > latest['MA20'] > latest['MA60']:
-                # 短期、中期和长期均线呈多头排列
-                score += 25
-            elif latest['MA5'] > latest['MA20']:
-                # 短期均线在中期均线之上
-                score += 15
-            elif latest['Close'] > latest['MA20']:
-                # 股价在中期均线之上
-                score += 10
-                
-            # RSI评分（25分）
-            rsi = latest['RSI']
-            if 45 <= rsi <= 55:
-                # RSI在中间区域，可能即将爆发
-                score += 15
-            elif 55 < rsi < 70:
-                # RSI在强势区域但未超买
-                score += 25
-            elif 30 < rsi < 45:
-                # RSI在弱势区域但未超卖
-                score += 10
-            elif rsi >= 70:
-                # RSI超买
-                score += 5
-            elif rsi <= 30:
-                # RSI超卖
-                score += 15
-                
-            # MACD得分（20分）
-            if latest['MACD'] > latest['Signal']:
-                score += 20
-                
-            # 成交量得分（30分）
-            if latest['Volume_Ratio'] > 1.5:
-                score += 30
-            elif latest['Volume_Ratio'] > 1:
-                score += 15
-                
-            return score
+            return int(self.calculate_scores(df.iloc[[-1]])[0])
             
         except Exception as e:
             logger.error(f"计算评分时出错: {str(e)}")
@@ -83,45 +55,102 @@ class StockScorer:
         根据评分获取投资建议
         
         Args:
-            score: 股票评分（0-100）
+            score: 股票评分
             
         Returns:
             投资建议文本
         """
-        if score >= 80:
-            return "强烈推荐"
-        elif score >= 70:
-            return "推荐"
-        elif score >= 60:
-            return "谨慎推荐"
-        elif score >= 40:
-            return "观望"
-        elif score >= 20:
-            return "不推荐"
-        else:
-            return "强烈不推荐"
+        return str(self.rule_set.recommend(score).item())
             
-    def batch_score_stocks(self, stock_dfs: Dict[str, pd.DataFrame]) -> List[Tuple[str, int, str]]:
+    def calculate_scores(self, table: Mapping[str, Any]) -> np.ndarray:
+        """
+        向量化计算多只股票的评分
+
+        Args:
+            table: 指标列名 -> 数组（如每只股票最新一根K线组成的DataFrame），
+                需包含规则集用到的列；数组可以是任意形状
+
+        Returns:
+            与输入数组同形状的评分
+        """
+        return self.rule_set.score(table)
+
+    def get_recommendations(self, scores: np.ndarray) -> np.ndarray:
+        """
+        向量化获取投资建议
+
+        Args:
+            scores: 评分数组
+
+        Returns:
+            与评分同形状的建议文本数组
+        """
+        return self.rule_set.recommend(scores)
+
+    @staticmethod
+    def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """
+        获取评分最高的 k 只股票的位置，按评分降序排列
+
+        先用 argpartition 在 O(N) 内选出前 k 个，再只对这 k 个排序；同分时位置靠前的优先
+
+        Args:
+            scores: 一维评分数组
+            k: 数量
+
+        Returns:
+            位置数组
+        """
+        scores = np.asarray(scores)
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.empty(0, dtype=int)
+        candidates = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        # 同分时边界上的股票可能被任意选入，补上与第k名同分的全部股票后再截断，保证结果确定
+        threshold = scores[candidates].min()
+        candidates = np.union1d(candidates, np.flatnonzero(scores == threshold))
+        order = np.lexsort((candidates, -scores[candidates]))
+        return candidates[order][:k]
+
+    def latest_table(self, stock_dfs: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """
+        取每只股票最新一根K线组成列式表格，空数据或缺少评分列的股票被跳过
+
+        Args:
+            stock_dfs: 字典，键为股票代码，值为包含技术指标的DataFrame
+
+        Returns:
+            以股票代码为索引的DataFrame
+        """
+        columns = list(self.rule_set.required_columns)
+        codes, rows = [], []
+        for stock_code, df in stock_dfs.items():
+            missing = [col for col in columns if col not in df.columns]
+            if df.empty or missing:
+                logger.error(f"评分股票 {stock_code} 时出错: {'数据为空' if df.empty else f'缺少列 {missing}'}")
+                continue
+            codes.append(stock_code)
+            rows.append(df[columns].to_numpy(dtype=float)[-1])
+        values = np.vstack(rows) if rows else np.empty((0, len(columns)))
+        return pd.DataFrame(values, index=pd.Index(codes, name='stock_code'), columns=columns)
+
+    def batch_score_stocks(self, stock_dfs: Dict[str, pd.DataFrame],
+                           limit: Optional[int] = None) -> List[Tuple[str, int, str]]:
         """
         批量评分多只股票
         
         Args:
             stock_dfs: 字典，键为股票代码，值为DataFrame
+            limit: 只返回评分最高的前 limit 只，默认返回全部
             
         Returns:
-            评分结果列表，每项为(股票代码, 评分, 推荐)的三元组
+            评分结果列表，每项为(股票代码, 评分, 推荐)的三元组，按评分降序排列
         """
-        results = []
-        
-        for stock_code, df in stock_dfs.items():
-            try:
-                score = self.calculate_score(df)
-                recommendation = self.get_recommendation(score)
-                results.append((stock_code, score, recommendation))
-            except Exception as e:
-                logger.error(f"评分股票 {stock_code} 时出错: {str(e)}")
-                
-        # 按评分降序排序
-        results.sort(key=lambda x: x[1], reverse=True)
-        
-        return results 
\ No newline at end of file
+        table = self.latest_table(stock_dfs)
+        scores = self.calculate_scores(table)
+        recommendations = self.get_recommendations(scores)
+
+        # 按评分降序排序，同分保持输入顺序；只取前 limit 只时不对全部股票排序
+        order = self.top_k(scores, len(scores) if limit is None else limit)
+        codes = table.index
+        return [(codes[i], int(scores[i]), str(recommendations[i])) for i in order]
@@ -0,0 +1,253 @@
+import os
+import json
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from server.utils.logger import get_logger
+from server.utils.rate_limiter import LimitedModule, RateLimiter
+
+# 获取日志器
+logger = get_logger()
+
+# 项目根目录（stock_universe.py 位于 server/services/ 下）
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# 股票池字段：Tushare stock_basic 返回的字段，code 为不带交易所后缀的代码
+UNIVERSE_FIELDS = ['ts_code', 'code', 'name', 'area', 'industry', 'list_date', 'market']
+
+# 计算60日均线至少需要的K线数量
+MIN_BARS = 60
+
+
+class StockUniverse:
+    """
+    A股股票池
+    持久化上市股票列表（代码、名称、地区、行业、上市日期、板块），每天最多向 Tushare stock_basic 请求一次，
+    每次刷新与上一版比较，把新上市和退市的股票追加到变更日志；
+    扫描器从这里取股票列表，数据提供者从这里读取名称和行业而不必逐只请求；
+    其他进程（扫描器、命令行）刷新后，查询时按元数据文件的修改时间重新读取
+    """
+
+    def __init__(self, base_dir: Optional[str] = None, pro_api: Optional[Any] = None,
+                 limiter: Optional[RateLimiter] = None):
+        """
+        初始化股票池
+
+        Args:
+            base_dir: 数据目录，默认读取环境变量 STOCK_UNIVERSE_DIR，否则为 <项目根目录>/data/universe
+            pro_api: Tushare pro 接口，刷新时使用，默认用环境变量 TUSHARE_TOKEN 创建
+            limiter: 限速器，默认使用进程内共享的限速器（端点为 tushare.stock_basic，共享 tushare 配额）
+        """
+        self.base_dir = base_dir or os.getenv('STOCK_UNIVERSE_DIR', os.path.join(BASE_DIR, 'data', 'universe'))
+        self.table_path = os.path.join(self.base_dir, 'universe.parquet')
+        self.meta_path = os.path.join(self.base_dir, 'universe.json')
+        self.changes_path = os.path.join(self.base_dir, 'changes.jsonl')
+        self._pro = pro_api
+        self.limiter = limiter
+        self._lock = threading.RLock()
+        self._table: Optional[pd.DataFrame] = None
+        self._by_code: Dict[str, Dict[str, Any]] = {}
+        # 已读取的股票池对应的元数据文件修改时间
+        self._stamp: Optional[int] = None
+        self._load()
+
+    def _meta_stamp(self) -> Optional[int]:
+        """元数据文件的修改时间（纳秒），不存在时为None"""
+        try:
+            return os.stat(self.meta_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _reload_if_changed(self) -> None:
+        """元数据文件在本进程读取之后被其他进程更新时，重新读取股票池"""
+        if self._meta_stamp() == self._stamp:
+            return
+        with self._lock:
+            if self._meta_stamp() != self._stamp:
+                self._load()
+                logger.info(f"股票池已被其他进程刷新，重新读取，共 {len(self._by_code)} 支")
+
+    def _load(self) -> None:
+        """读取本地股票池；刷新时先替换股票池文件再替换元数据，按元数据的修改时间记录读取的版本"""
+        self._stamp = self._meta_stamp()
+        if not os.path.exists(self.table_path):
+            return
+        try:
+            self._set_table(pd.read_parquet(self.table_path))
+        except Exception as e:
+            logger.warning(f"读取股票池失败: {str(e)}")
+
+    def _set_table(self, table: pd.DataFrame) -> None:
+        self._table = table.reset_index(drop=True)
+        self._by_code = {row['code']: row for row in self._table.to_dict('records')}
+
+    @property
+    def table(self) -> pd.DataFrame:
+        """当前股票池，本地没有时为空表"""
+        self._reload_if_changed()
+        return self._table if self._table is not None else pd.DataFrame(columns=UNIVERSE_FIELDS)
+
+    def read_meta(self) -> Optional[Dict[str, Any]]:
+        """读取元数据，包含 updated_at 和 rows，不存在时返回None"""
+        if not os.path.exists(self.meta_path):
+            return None
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"读取股票池元数据失败: {str(e)}")
+            return None
+
+    def fetch(self) -> pd.DataFrame:
+        """从 Tushare 获取全部上市股票（一次请求）"""
+        if self._pro is None:
+            import tushare as ts
+            ts.set_token(os.getenv('TUSHARE_TOKEN', ''))
+            self._pro = ts.pro_api()
+        pro = LimitedModule(self._pro, 'tushare', self.limiter)
+        df = pro.stock_basic(exchange='', list_status='L', fields='ts_code,symbol,name,area,industry,list_date,market')
+        if df is None or df.empty:
+            raise ValueError("未能从 Tushare 获取到股票列表数据")
+        df = df.rename(columns={'symbol': 'code'})
+        df['code'] = df['code'].astype(str)
+        df['list_date'] = df['list_date'].astype(str)
+        return df.reindex(columns=UNIVERSE_FIELDS).sort_values('ts_code').reset_index(drop=True)
+
+    def refresh(self, force: bool = False, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        刷新股票池，当天已刷新过时直接使用本地数据
+
+        Args:
+            force: 为True时忽略当天的刷新记录
+            now: 当前时间，默认为系统时间
+
+        Returns:
+            刷新统计，包含 refreshed、total 以及本次新上市（listed）和退市（delisted）的代码
+        """
+        now = now or datetime.now()
+        with self._lock:
+            # 以其他进程最近一次刷新的结果为基准比较上市/退市变更
+            self._reload_if_changed()
+            meta = self.read_meta()
+            if (not force and meta is not None and self._table is not None
+                    and meta['updated_at'][:10] == now.strftime('%Y-%m-%d')):
+                return {'refreshed': False, 'total': len(self._table), 'listed': [], 'delisted': []}
+
+            table = self.fetch()
+            listed: List[str] = []
+            delisted: List[str] = []
+            if self._table is not None:
+                old_codes = set(self._table['ts_code'])
+                new_codes = set(table['ts_code'])
+                listed = sorted(new_codes - old_codes)
+                delisted = sorted(old_codes - new_codes)
+                self._append_changes(now, table[table['ts_code'].isin(listed)], 'listed')
+                self._append_changes(now, self._table[self._table['ts_code'].isin(delisted)], 'delisted')
+
+            os.makedirs(self.base_dir, exist_ok=True)
+            tmp_path = f"{self.table_path}.{os.getpid()}.tmp"
+            table.to_parquet(tmp_path)
+            os.replace(tmp_path, self.table_path)
+            tmp_meta_path = f"{self.meta_path}.{os.getpid()}.tmp"
+            with open(tmp_meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'updated_at': now.isoformat(timespec='seconds'), 'rows': len(table)}, f)
+            os.replace(tmp_meta_path, self.meta_path)
+            self._set_table(table)
+            self._stamp = self._meta_stamp()
+
+        logger.info(f"股票池已刷新，共 {len(table)} 支，新上市 {len(listed)} 支，退市 {len(delisted)} 支")
+        return {'refreshed': True, 'total': len(table), 'listed': listed, 'delisted': delisted}
+
+    def _append_changes(self, now: datetime, rows: pd.DataFrame, change: str) -> None:
+        """把上市/退市变更追加到变更日志"""
+        if rows.empty:
+            return
+        with open(self.changes_path, 'a', encoding='utf-8') as f:
+            for row in rows.to_dict('records'):
+                record = {'date': now.strftime('%Y-%m-%d'), 'change': change, 'ts_code': row['ts_code'],
+                          'name': row['name'], 'list_date': row['list_date']}
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def changes(self, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        读取上市/退市变更日志
+
+        Args:
+            since: 只返回该日期（YYYY-MM-DD）及之后的变更
+        """
+        if not os.path.exists(self.changes_path):
+            return []
+        with open(self.changes_path, 'r', encoding='utf-8') as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        return [r for r in records if since is None or r['date'] >= since]
+
+    def lookup(self, stock_code: str) -> Optional[Dict[str, Any]]:
+        """
+        按代码查询股票信息，只读本地数据
+
+        Args:
+            stock_code: 股票代码，可以带交易所后缀（如 000001.SZ）
+
+        Returns:
+            股票池中的记录，不存在时返回None
+        """
+        self._reload_if_changed()
+        record = self._by_code.get(stock_code.split('.')[0])
+        return dict(record) if record is not None else None
+
+    def codes(self, min_bars: int = 0, as_of: Optional[datetime] = None) -> List[str]:
+        """
+        股票池中的 Tushare 代码（带交易所后缀）
+
+        Args:
+            min_bars: 上市以来的交易日数少于该值的股票被排除；按工作日估算（不扣除节假日），
+                      只会多保留而不会误排除
+            as_of: 计算上市天数的日期，默认为今天
+        """
+        table = self.table
+        if min_bars > 0 and not table.empty:
+            as_of = (as_of or datetime.now()).strftime('%Y-%m-%d')
+            list_dates = pd.to_datetime(table['list_date'], format='%Y%m%d', errors='coerce')
+            known = list_dates.notna().to_numpy()
+            bars = np.full(len(table), min_bars)
+            bars[known] = np.busday_count(list_dates[known].dt.strftime('%Y-%m-%d').to_numpy().astype('datetime64[D]'),
+                                          np.datetime64(as_of)) + 1
+            table = table[bars >= min_bars]
+        return table['ts_code'].tolist()
+
+
+_default_universe: Optional[StockUniverse] = None
+_default_universe_lock = threading.Lock()
+
+
+def get_stock_universe() -> StockUniverse:
+    """
+    获取进程内共享的股票池（只读取本地数据，不会触发刷新）
+
+    Web服务和数据提供者不会请求 Tushare，股票池的更新依赖扫描器（TopStockScanner.get_all_stocks，
+    或 bulk_daily 模式下的 get_local_stocks）或命令行 python -m server.services.stock_universe；
+    只运行Web服务时需要每天定时执行一次命令行刷新，否则新上市股票查不到名称和行业；
+    其他进程刷新后，共享实例在下一次查询时重新读取，无需重启Web服务
+    """
+    global _default_universe
+    if _default_universe is None:
+        with _default_universe_lock:
+            if _default_universe is None:
+                _default_universe = StockUniverse()
+    return _default_universe
+
+
+def main():
+    """命令行入口：刷新股票池并输出上市/退市变更"""
+    parser = argparse.ArgumentParser(description="刷新A股股票池，记录新上市和退市的股票")
+    parser.add_argument('--force', action='store_true', help="忽略当天已刷新的记录，重新请求")
+    args = parser.parse_args()
+
+    print(StockUniverse().refresh(force=args.force))
+
+
+if __name__ == "__main__":
+    main()
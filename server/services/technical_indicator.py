@@ -1,6 +1,11 @@
+import copy
+import numpy as np
 import pandas as pd
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any, Sequence, Union
 from server.utils.logger import get_logger
+from server.services.stock_bars import StockBars
+from server.services.indicator_kernels import get_kernels
+from server.services.indicator_library import DEFAULT_PARAMS, INPUT_COLUMNS, IndicatorLibrary
 
 # 获取日志器
 logger = get_logger()
@@ -11,176 +16,101 @@ class TechnicalIndicator:
     负责计算常见的股票技术指标
     """
     
-    def __init__(self, params: Optional[Dict[str, Any]] = None):
+    def __init__(self, params: Optional[Dict[str, Any]] = None, backend: Optional[str] = None):
         """
         初始化技术指标计算服务
         
         Args:
             params: 技术指标参数配置
+            backend: 滚动指标的计算后端，'pandas'、'numpy'、'numba' 或 'auto'，
+                默认读取环境变量 INDICATOR_BACKEND，未设置时为 'pandas'
         """
         # 默认参数设置
-        self.params = params or {
-            'ma_periods': {'short': 5, 'medium': 20, 'long': 60},
-            'rsi_period': 14,
-            'bollinger_period': 20,
-            'bollinger_std': 2,
-            'volume_ma_period': 20,
-            'atr_period': 14
-        }
+        self.params = params or copy.deepcopy(DEFAULT_PARAMS)
+        self.library = IndicatorLibrary(self.params)
+        self.kernels = get_kernels(backend)
+        self.backend = self.kernels.name
         
-        logger.debug(f"初始化TechnicalIndicator技术指标计算服务，参数: {self.params}")
+        logger.debug(f"初始化TechnicalIndicator技术指标计算服务，参数: {self.params}，后端: {self.backend}")
     
-    def calculate_ema(self, series: pd.Series, period: int) -> pd.Series:
+    def calculate_indicators(self, df: Union[pd.DataFrame, StockBars],
+                             tail: Optional[int] = None,
+                             outputs: Optional[Sequence[str]] = None) -> pd.DataFrame:
         """
-        计算指数移动平均线
+        计算技术指标
         
         Args:
-            series: 价格序列
-            period: 周期
+            df: 原始价格数据（DataFrame或StockBars），包含Open, High, Low, Close, Volume列
+            tail: 只计算最后 tail 根K线上的指标值，为空时计算完整序列；
+                评分只读取最新一根K线，扫描时使用该模式可避免对整段历史做滚动计算
+            outputs: 需要的指标列，只计算这些指标及其依赖，默认为全部核心指标；
+                例如只需评分时传入 StockScorer.REQUIRED_INDICATORS，可跳过布林带、ATR和波动率
             
         Returns:
-            EMA序列
+            添加了技术指标的DataFrame，tail模式下只包含最后 tail 行
         """
-        return series.ewm(span=period, adjust=False).mean()
-    
-    def calculate_rsi(self, series: pd.Series, period: int) -> pd.Series:
-        """
-        计算相对强弱指标(RSI)
-        
-        Args:
-            series: 价格序列
-            period: 周期
-            
-        Returns:
-            RSI序列
-        """
-        delta = series.diff()
-        gain = delta.where(delta > 0, 0)
-        loss = -delta.where(delta < 0, 0)
-        
-        avg_gain = gain.rolling(window=period).mean()
-        avg_loss = loss.rolling(window=period).mean()
-        
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-        
-        return rsi
-    
-    def calculate_macd(self, series: pd.Series) -> tuple:
-        """
-        计算MACD指标
-        
-        Args:
-            series: 价格序列
-            
-        Returns:
-            (MACD线, 信号线, 柱状图)的元组
-        """
-        ema12 = self.calculate_ema(series, 12)
-        ema26 = self.calculate_ema(series, 26)
-        
-        macd = ema12 - ema26
-        signal = self.calculate_ema(macd, 9)
-        histogram = macd - signal
-        
-        return macd, signal, histogram
-    
-    def calculate_bollinger_bands(self, series: pd.Series, period: int, std_dev: float) -> tuple:
-        """
-        计算布林带
-        
-        Args:
-            series: 价格序列
-            period: 周期
-            std_dev: 标准差倍数
+        if tail is not None:
+            return self.calculate_tail_indicators(df, tail, outputs)
+
+        try:
+            if isinstance(df, StockBars):
+                # 直接引用列数组新建DataFrame，新增指标列不会修改原始数据，无需整体复制
+                result_df = df.to_frame()
+            else:
+                # 复制数据框
+                result_df = df.copy()
+
+            values = self.library.evaluate_frame(result_df, self._indicator_outputs(outputs), kernels=self.kernels)
+            for name, array in values.items():
+                result_df[name] = array
             
-        Returns:
-            (中轨, 上轨, 下轨)的元组
-        """
-        middle = series.rolling(window=period).mean()
-        std = series.rolling(window=period).std()
-        
-        upper = middle + std_dev * std
-        lower = middle - std_dev * std
-        
-        return middle, upper, lower
-    
-    def calculate_atr(self, df: pd.DataFrame, period: int) -> pd.Series:
-        """
-        计算平均真实波幅(ATR)
-        
-        Args:
-            df: 包含High, Low, Close列的DataFrame
-            period: 周期
+            return result_df
             
-        Returns:
-            ATR序列
-        """
-        high = df['High']
-        low = df['Low']
-        close = df['Close']
-        
-        tr1 = high - low
-        tr2 = abs(high - close.shift())
-        tr3 = abs(low - close.shift())
-        
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        atr = tr.rolling(window=period).mean()
-        
-        return atr
-    
-    def calculate_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
+        except Exception as e:
+            logger.error(f"计算技术指标时出错: {str(e)}")
+            logger.exception(e)
+            raise
+
+    def _indicator_outputs(self, outputs: Optional[Sequence[str]]) -> List[str]:
+        """需要计算的指标列，默认为全部核心指标"""
+        return list(outputs) if outputs is not None else self.library.output_columns()
+
+    def calculate_tail_indicators(self, df: Union[pd.DataFrame, StockBars], tail: int = 1,
+                                  outputs: Optional[Sequence[str]] = None) -> pd.DataFrame:
         """
-        计算所有技术指标
-        
+        只计算最后 tail 根K线上的技术指标，结果与完整计算的最后 tail 行一致
+
+        由指标库按各指标所需的K线数只在最后一段数据上求值（均线、RSI、布林带、ATR等窗口类指标），
+        计算量为 O(tail + 窗口)；EMA/MACD 是递推指标，依赖完整历史，在收盘价数组上单次递推
+
         Args:
-            df: 原始价格数据，包含Open, High, Low, Close, Volume列
-            
+            df: 原始价格数据（DataFrame或StockBars），包含High, Low, Close, Volume列
+            tail: 需要的最新K线数
+            outputs: 需要的指标列，默认为全部核心指标；未请求的指标不计算
+
         Returns:
-            添加了技术指标的DataFrame
+            最后 tail 行原始数据加上技术指标列的DataFrame
         """
         try:
-            # 复制数据框
-            result_df = df.copy()
-            
-            # 移动平均线
-            for name, period in self.params['ma_periods'].items():
-                result_df[f'MA{period}'] = result_df['Close'].rolling(window=period).mean()
-            
-            # RSI
-            result_df['RSI'] = self.calculate_rsi(result_df['Close'], self.params['rsi_period'])
-            
-            # MACD
-            macd, signal, histogram = self.calculate_macd(result_df['Close'])
-            result_df['MACD'] = macd
-            result_df['Signal'] = signal
-            result_df['Histogram'] = histogram
-            
-            # 布林带
-            middle, upper, lower = self.calculate_bollinger_bands(
-                result_df['Close'], 
-                self.params['bollinger_period'], 
-                self.params['bollinger_std']
-            )
-            result_df['BB_Middle'] = middle
-            result_df['BB_Upper'] = upper
-            result_df['BB_Lower'] = lower
-            
-            # 成交量移动平均
-            result_df['Volume_MA'] = result_df['Volume'].rolling(window=self.params['volume_ma_period']).mean()
-            
-            # 成交量比率
-            result_df['Volume_Ratio'] = result_df['Volume'] / result_df['Volume_MA']
-            
-            # ATR
-            result_df['ATR'] = self.calculate_atr(result_df, self.params['atr_period'])
-            
-            # 波动率 (过去20天收盘价的标准差/均值)
-            result_df['Volatility'] = result_df['Close'].rolling(window=20).std() / result_df['Close'].rolling(window=20).mean() * 100
-            
-            return result_df
-            
+            wanted = self._indicator_outputs(outputs)
+            if len(df) == 0:
+                return self.calculate_indicators(df, outputs=wanted)
+            if isinstance(df, StockBars):
+                columns = df.columns
+                index = pd.DatetimeIndex(df.dates, name='Date')
+            else:
+                columns = {name: df[name].to_numpy() for name in df.columns}
+                index = df.index
+            names = {name.lower(): name for name in columns if isinstance(name, str)}
+            inputs = {name: columns[names[name.lower()]] for name in INPUT_COLUMNS if name.lower() in names}
+            tail = max(1, min(tail, len(index)))
+
+            values = self.library.evaluate_tail(inputs, tail, wanted, kernels=self.kernels)
+            data = {name: array[-tail:] for name, array in columns.items()}
+            data.update(values)
+            return pd.DataFrame(data, index=index[-tail:])
+
         except Exception as e:
-            logger.error(f"计算技术指标时出错: {str(e)}")
+            logger.error(f"计算最新技术指标时出错: {str(e)}")
             logger.exception(e)
-            raise 
\ No newline at end of file
+            raise
@@ -0,0 +1,281 @@
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from server.utils.logger import get_logger
+from server.utils.rate_limiter import LimitedModule, RateLimiter
+from server.services.bar_store import BarStore
+
+# 获取日志器
+logger = get_logger()
+
+# 原始（未复权）日线与复权因子按交易日缓存在 <K线仓库根目录>/_tushare_daily/<交易日>.parquet
+RAW_DIR_NAME = '_tushare_daily'
+
+# Tushare 日线字段 -> 本地仓库A股K线列（成交量单位均为手）
+DAILY_COLUMNS = {
+    'open': 'Open',
+    'close': 'Close',
+    'high': 'High',
+    'low': 'Low',
+    'vol': 'Volume',
+    'amount': 'Amount',
+    'pct_chg': 'Change_pct',
+}
+
+# 复权后调整的价格列
+PRICE_COLUMNS = ['Open', 'Close', 'High', 'Low', 'Prev_close']
+
+# 前复权K线中随复权基准整体缩放的列（涨跌幅、振幅为比例，不受影响）
+ADJUSTED_COLUMNS = ['Open', 'Close', 'High', 'Low', 'Change']
+
+
+class TushareBulkIngestor:
+    """
+    按交易日批量获取 Tushare 全市场日线入库
+    每个交易日只请求两次（daily 和 adj_factor，各返回全市场数据），在本地按复权因子计算前复权价格后
+    写入K线仓库，全市场更新的请求次数与交易日数成正比而与股票数量无关：
+    首次建库一年约500次请求，之后每天2次，代替逐只股票调用 pro_bar 的约5000次请求。
+    原始数据按交易日缓存，除权后只需在本地重新计算前复权价格，不必重新请求历史数据
+    """
+
+    def __init__(self, pro_api: Optional[Any] = None, bar_store: Optional[BarStore] = None,
+                 limiter: Optional[RateLimiter] = None):
+        """
+        初始化批量入库器
+
+        Args:
+            pro_api: Tushare pro 接口，默认用环境变量 TUSHARE_TOKEN 创建
+            bar_store: 本地K线仓库，默认使用环境变量配置的仓库
+            limiter: 限速器，默认使用进程内共享的限速器（端点为 tushare.daily 等，共享 tushare 配额）
+        """
+        if pro_api is None:
+            import tushare as ts
+            ts.set_token(os.getenv('TUSHARE_TOKEN', ''))
+            pro_api = ts.pro_api()
+        self.pro = LimitedModule(pro_api, 'tushare', limiter)
+        self.bar_store = bar_store if bar_store is not None else BarStore()
+        self.raw_dir = os.path.join(self.bar_store.base_dir, RAW_DIR_NAME)
+        self.last_stats: Dict[str, Any] = {}
+
+    def _raw_path(self, trade_date: str) -> str:
+        """获取交易日原始数据缓存路径"""
+        return os.path.join(self.raw_dir, f"{trade_date}.parquet")
+
+    def cached_dates(self) -> List[str]:
+        """已缓存原始数据的交易日，升序"""
+        if not os.path.isdir(self.raw_dir):
+            return []
+        return sorted(name[:-len('.parquet')] for name in os.listdir(self.raw_dir) if name.endswith('.parquet'))
+
+    def fetch_trade_dates(self, start_date: str, end_date: str) -> List[str]:
+        """获取区间内的交易日，返回升序的YYYYMMDD日期列表"""
+        calendar_df = self.pro.trade_cal(exchange='SSE', start_date=start_date, end_date=end_date, is_open='1')
+        return sorted(calendar_df['cal_date'].astype(str).tolist())
+
+    def fetch_day(self, trade_date: str) -> pd.DataFrame:
+        """
+        获取一个交易日的全市场未复权日线与复权因子（两次请求）
+
+        Returns:
+            每只股票一行的DataFrame，包含 ts_code、日线字段和 adj_factor；数据尚未发布时为空
+        """
+        daily = self.pro.daily(trade_date=trade_date)
+        if daily is None or daily.empty:
+            return pd.DataFrame()
+        factors = self.pro.adj_factor(ts_code='', trade_date=trade_date)
+        if factors is None or factors.empty:
+            return pd.DataFrame()
+        day = daily.merge(factors[['ts_code', 'adj_factor']], on='ts_code', how='left')
+        day['trade_date'] = trade_date
+        return day
+
+    def fetch_missing(self, start_date: str, end_date: str) -> List[str]:
+        """
+        把区间内尚未缓存的交易日逐日请求并缓存
+
+        Returns:
+            本次新缓存的交易日
+        """
+        cached = set(self.cached_dates())
+        missing = [d for d in self.fetch_trade_dates(start_date, end_date) if d not in cached]
+        fetched: List[str] = []
+        os.makedirs(self.raw_dir, exist_ok=True)
+        for i, trade_date in enumerate(missing, 1):
+            day = self.fetch_day(trade_date)
+            if day.empty:
+                # 当日数据通常在收盘后才发布，之后的交易日也不会有数据
+                logger.info(f"Tushare 尚未发布 {trade_date} 的日线数据，停止获取")
+                break
+            path = self._raw_path(trade_date)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            day.to_parquet(tmp_path)
+            os.replace(tmp_path, path)
+            fetched.append(trade_date)
+            if i % 20 == 0 or i == len(missing):
+                logger.info(f"全市场日线获取进度: {i}/{len(missing)}")
+        return fetched
+
+    def load_raw(self, start_date: str, end_date: str) -> pd.DataFrame:
+        """读取区间内已缓存的原始数据"""
+        frames = [pd.read_parquet(self._raw_path(d)) for d in self.cached_dates() if start_date <= d <= end_date]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    @staticmethod
+    def to_qfq_bars(raw: pd.DataFrame) -> pd.DataFrame:
+        """
+        由未复权日线和复权因子计算前复权K线：价格 × 当日复权因子 / 该股票最新复权因子，
+        与 pro_bar(adj='qfq') 以区间结束日为基准的结果一致
+
+        Args:
+            raw: 多个交易日的原始数据，每行一只股票一天
+
+        Returns:
+            包含 Code、Date 和本地仓库标准K线列的DataFrame（成交额单位为元）
+        """
+        bars = raw.rename(columns={**DAILY_COLUMNS, 'pre_close': 'Prev_close'})
+        bars['Code'] = bars['ts_code'].str.split('.').str[0]
+        bars['Date'] = pd.to_datetime(bars['trade_date'].astype(str), format='%Y%m%d')
+        bars = bars.sort_values(['Code', 'Date'])
+
+        # 个别日期缺少复权因子时沿用前一交易日的因子
+        factor = bars.groupby('Code')['adj_factor'].ffill().fillna(1.0)
+        latest = factor.groupby(bars['Code']).transform('last')
+        ratio = (factor / latest).to_numpy()
+        for column in PRICE_COLUMNS:
+            bars[column] = bars[column].astype(float).to_numpy() * ratio
+
+        # Tushare 成交额单位为千元，与其他数据源统一为元
+        bars['Amount'] = bars['Amount'] * 1000
+        bars['Change'] = bars['Close'] - bars['Prev_close']
+        bars['Amplitude'] = (bars['High'] - bars['Low']) / bars['Prev_close'] * 100
+        columns = ['Code', 'Date', 'Open', 'Close', 'High', 'Low', 'Volume', 'Amount',
+                   'Amplitude', 'Change_pct', 'Change']
+        return bars[columns].replace([np.inf, -np.inf], np.nan)
+
+    @staticmethod
+    def latest_factors(raw: pd.DataFrame) -> pd.Series:
+        """每只股票在区间内最新的复权因子（即前复权的基准），以6位代码为索引"""
+        raw = raw.sort_values('trade_date')
+        return raw.groupby(raw['ts_code'].str.split('.').str[0])['adj_factor'].last()
+
+    def _stored_factor(self, code: str, trade_date: str, cache: Dict[str, pd.Series]) -> float:
+        """从原始数据缓存中读取股票在某个交易日的复权因子，未缓存时为NaN"""
+        if trade_date not in cache:
+            path = self._raw_path(trade_date)
+            cache[trade_date] = self.latest_factors(pd.read_parquet(path)) if os.path.exists(path) else pd.Series(dtype=float)
+        return float(cache[trade_date].get(code, np.nan))
+
+    def merge_stored(self, code: str, df: pd.DataFrame, start_date: str, latest_factor: float,
+                     factor_cache: Dict[str, pd.Series]) -> Tuple[pd.DataFrame, str]:
+        """
+        把本次区间的前复权K线与仓库中更早的历史合并，避免整体替换时截断更长的历史
+
+        仓库中的历史以上次入库时的最新复权因子为基准，合并前按新旧基准之比重新换算：
+        优先用两段数据重叠交易日的收盘价之比，没有重叠时用原始数据缓存中的复权因子之比；
+        两者都不可用时无法换算，只写入本次区间
+
+        Args:
+            code: 6位股票代码
+            df: 本次区间以日期为索引的前复权K线
+            start_date: 本次区间的开始日期，格式YYYYMMDD
+            latest_factor: 本次区间的最新复权因子
+            factor_cache: 交易日 -> 复权因子的缓存，在同一次同步的多只股票间共享
+
+        Returns:
+            (合并后的K线, 合并后数据覆盖的开始日期)
+        """
+        meta = self.bar_store.read_meta('A', code)
+        if not meta or meta.get('start', start_date) >= start_date:
+            return df, start_date
+        stored = self.bar_store.read('A', code)
+        if stored is None or stored.empty or 'Close' not in stored:
+            return df, start_date
+
+        earlier = stored[stored.index < df.index[0]]
+        if earlier.empty:
+            return df, meta['start']
+
+        overlap = stored['Close'].reindex(df.index)
+        common = overlap.notna() & df['Close'].notna()
+        if common.any():
+            first = common.idxmax()
+            ratio = df.at[first, 'Close'] / overlap[first]
+        else:
+            stored_end = stored.index[-1].strftime('%Y%m%d')
+            ratio = self._stored_factor(code, stored_end, factor_cache) / latest_factor
+        if not np.isfinite(ratio):
+            logger.warning(f"无法换算本地历史的复权基准，只写入本次区间 A/{code}: {start_date} 起")
+            return df, start_date
+
+        earlier = earlier.copy()
+        for column in ADJUSTED_COLUMNS:
+            if column in earlier:
+                earlier[column] = earlier[column] * ratio
+        return pd.concat([earlier, df]), meta['start']
+
+    def sync(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, Any]:
+        """
+        增量获取缺失的交易日，并把区间内的前复权K线写入本地仓库；
+        仓库中早于区间的历史会保留，按新的复权基准换算后与本次区间合并
+
+        Args:
+            start_date: 开始日期，格式YYYYMMDD，默认为一年前
+            end_date: 结束日期，格式YYYYMMDD，默认为今天
+
+        Returns:
+            入库统计，包含 fetched_dates、written 数量和 end_date（最新有数据的交易日）
+        """
+        start_time = time.monotonic()
+        start_date = BarStore.normalize_date(start_date) or (datetime.now() - timedelta(days=365)).strftime('%Y%m%d')
+        end_date = BarStore.normalize_date(end_date) or datetime.now().strftime('%Y%m%d')
+
+        fetched = self.fetch_missing(start_date, end_date)
+        raw = self.load_raw(start_date, end_date)
+        if raw.empty:
+            raise ValueError(f"{start_date} - {end_date} 没有可用的 Tushare 日线数据")
+        last_date = str(raw['trade_date'].max())
+
+        bars = self.to_qfq_bars(raw)
+        latest_factors = self.latest_factors(raw)
+        factor_cache: Dict[str, pd.Series] = {}
+        written = 0
+        for code, df in bars.groupby('Code', sort=False):
+            try:
+                df, start = self.merge_stored(code, df.set_index('Date'), start_date,
+                                              float(latest_factors.get(code, np.nan)), factor_cache)
+                self.bar_store.write('A', code, df, start, last_date)
+                written += 1
+            except Exception as e:
+                logger.warning(f"写入前复权K线失败 A/{code}: {str(e)}")
+
+        elapsed = time.monotonic() - start_time
+        self.last_stats = {
+            'start_date': start_date,
+            'end_date': last_date,
+            'fetched_dates': len(fetched),
+            'written': written,
+            'elapsed_seconds': round(elapsed, 2)
+        }
+        logger.info(f"Tushare 全市场日线入库完成，区间: {start_date}-{last_date}, 新获取交易日: {len(fetched)}, "
+                    f"写入: {written} 支, 耗时: {elapsed:.1f}秒")
+        return self.last_stats
+
+
+def main():
+    """命令行入口：按交易日批量获取 Tushare 全市场日线，本地计算前复权后写入K线仓库"""
+    parser = argparse.ArgumentParser(description="按交易日批量获取 Tushare 全市场日线与复权因子，写入本地K线仓库")
+    parser.add_argument('--start-date', default=None, help="开始日期，格式YYYYMMDD，默认为一年前")
+    parser.add_argument('--end-date', default=None, help="结束日期，格式YYYYMMDD，默认为今天")
+    args = parser.parse_args()
+
+    print(TushareBulkIngestor().sync(args.start_date, args.end_date))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ import asyncio
 import pandas as pd
 from typing import List, Dict, Any, Optional
 from server.utils.logger import get_logger
+from server.utils.rate_limiter import LimitedModule
 
 # 获取日志器
 logger = get_logger()
@@ -70,6 +71,7 @@ class USStockServiceAsync:
             包含美股数据的DataFrame
         """
         import akshare as ak
+        ak = LimitedModule(ak, 'akshare')
         
         try:
             # 获取美股数据
@@ -0,0 +1,238 @@
+import os
+import time
+import asyncio
+import sqlite3
+import functools
+import threading
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+from server.utils.logger import get_logger
+
+# 获取日志器
+logger = get_logger()
+
+# 项目根目录（rate_limiter.py 位于 server/utils/ 下）
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# 默认配额：预算名 -> (调用次数, 周期秒数, 桶容量)
+# 端点名形如 "tushare.pro_bar"，没有单独配额时使用点号前的数据源配额，同一配额下的端点共享一个令牌桶；
+# 没有任何配额的端点不限速
+DEFAULT_BUDGETS: Dict[str, Tuple[float, float, float]] = {
+    'tushare': (50, 60, 1),
+}
+
+Budget = Tuple[float, float, float]
+
+
+def parse_budgets(spec: str) -> Dict[str, Budget]:
+    """
+    解析配额配置，格式为逗号分隔的 名称=次数/秒数[:容量]，如 "tushare=50/60,akshare=5/1:5"
+
+    Returns:
+        预算名 -> (调用次数, 周期秒数, 桶容量)
+    """
+    budgets: Dict[str, Budget] = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, value = item.partition('=')
+        rate, _, capacity = value.partition(':')
+        calls, _, period = rate.partition('/')
+        try:
+            budgets[name.strip()] = (float(calls), float(period or 1), float(capacity or 1))
+        except ValueError:
+            raise ValueError(f"无法解析速率配额: {item}，格式应为 名称=次数/秒数[:容量]")
+    return budgets
+
+
+class RateLimiter:
+    """
+    跨线程、协程和进程共享的令牌桶限速器
+    令牌桶状态保存在SQLite数据库中，每次获取令牌在一个写事务内预定令牌，
+    并发的线程和进程按预定顺序依次获得令牌，等待时间可预期；配额按端点配置
+    """
+
+    def __init__(self, db_path: Optional[str] = None, budgets: Optional[Mapping[str, Budget]] = None):
+        """
+        初始化限速器
+
+        Args:
+            db_path: 令牌桶数据库路径，默认读取环境变量 RATE_LIMIT_DB，否则为 <项目根目录>/data/rate_limiter.sqlite3
+            budgets: 预算名 -> (调用次数, 周期秒数, 桶容量)，默认为 DEFAULT_BUDGETS 加上环境变量 RATE_LIMITS 的配置
+        """
+        self.db_path = db_path or os.getenv('RATE_LIMIT_DB', os.path.join(BASE_DIR, 'data', 'rate_limiter.sqlite3'))
+        if budgets is None:
+            budgets = {**DEFAULT_BUDGETS, **parse_budgets(os.getenv('RATE_LIMITS', ''))}
+        self.budgets: Dict[str, Budget] = dict(budgets)
+        self._local = threading.local()
+        logger.debug(f"初始化RateLimiter，数据库: {self.db_path}, 配额: {self.budgets}")
+
+    def _connect(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets '
+                         '(name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+            self._local.conn = conn
+        return conn
+
+    def budget(self, endpoint: str) -> Optional[Tuple[str, Budget]]:
+        """
+        查找端点使用的配额
+
+        Returns:
+            (预算名, 配额)，端点不限速时返回None
+        """
+        name = endpoint
+        while name:
+            if name in self.budgets:
+                return name, self.budgets[name]
+            name = name.rpartition('.')[0]
+        return None
+
+    def reserve(self, endpoint: str, tokens: float = 1.0) -> float:
+        """
+        预定令牌
+
+        Args:
+            endpoint: 端点名，如 "tushare.pro_bar"
+            tokens: 令牌数
+
+        Returns:
+            需要等待的秒数，等待结束后方可发起请求
+        """
+        found = self.budget(endpoint)
+        if found is None:
+            return 0.0
+        name, (calls, period, capacity) = found
+        rate = calls / period
+
+        conn = self._connect()
+        # BEGIN IMMEDIATE 立即获取写锁，多个进程对同一令牌桶的读改写依次进行
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE name = ?', (name,)).fetchone()
+            now = time.time()
+            available = capacity if row is None else min(capacity, row[0] + max(0.0, now - row[1]) * rate)
+            available -= tokens
+            conn.execute('INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)',
+                         (name, available, now))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return -available / rate if available < 0 else 0.0
+
+    def acquire(self, endpoint: str, tokens: float = 1.0) -> float:
+        """
+        阻塞直到可以向端点发起请求
+
+        Returns:
+            实际等待的秒数
+        """
+        wait = self.reserve(endpoint, tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, endpoint: str, tokens: float = 1.0) -> float:
+        """
+        在协程中等待直到可以向端点发起请求，数据库操作在线程中执行，不阻塞事件循环
+
+        Returns:
+            实际等待的秒数
+        """
+        if self.budget(endpoint) is None:
+            return 0.0
+        wait = await asyncio.to_thread(self.reserve, endpoint, tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def endpoint(self, endpoint: str) -> 'EndpointLimiter':
+        """获取绑定到单个端点的限速器"""
+        return EndpointLimiter(self, endpoint)
+
+
+class EndpointLimiter:
+    """绑定到单个端点的限速器，acquire 为协程，可作为 ScanPipeline 的 limiter"""
+
+    def __init__(self, limiter: RateLimiter, endpoint: str):
+        self.limiter = limiter
+        self.name = endpoint
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        return await self.limiter.acquire_async(self.name, tokens)
+
+    def acquire_sync(self, tokens: float = 1.0) -> float:
+        return self.limiter.acquire(self.name, tokens)
+
+
+_default_limiter: Optional[RateLimiter] = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """获取进程内共享的限速器（令牌桶状态通过数据库在进程之间共享）"""
+    global _default_limiter
+    if _default_limiter is None:
+        with _default_limiter_lock:
+            if _default_limiter is None:
+                _default_limiter = RateLimiter()
+    return _default_limiter
+
+
+def rate_limited(endpoint: str) -> Callable[[Callable], Callable]:
+    """
+    装饰器：调用前从共享限速器获取端点的令牌，支持普通函数和协程函数
+
+    Args:
+        endpoint: 端点名，如 "tushare.pro_bar"
+    """
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                await get_rate_limiter().acquire_async(endpoint)
+                return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            get_rate_limiter().acquire(endpoint)
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class LimitedModule:
+    """
+    数据源模块的限速代理
+    调用 module.func(...) 前先从限速器获取端点 "<数据源>.<函数名>" 的令牌，其余属性原样返回，
+    如 LimitedModule(ak, 'akshare').stock_zh_a_hist(...) 受 akshare.stock_zh_a_hist 或 akshare 的配额限制
+    """
+
+    def __init__(self, module: Any, source: str, limiter: Optional[RateLimiter] = None):
+        """
+        初始化限速代理
+
+        Args:
+            module: 数据源模块，如 akshare
+            source: 数据源名称，作为端点名的前缀
+            limiter: 限速器，默认使用进程内共享的限速器
+        """
+        self._module = module
+        self._source = source
+        self._limiter = limiter
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._module, name)
+        if not callable(attr):
+            return attr
+        endpoint = f"{self._source}.{name}"
+
+        @functools.wraps(attr)
+        def call(*args: Any, **kwargs: Any) -> Any:
+            (self._limiter or get_rate_limiter()).acquire(endpoint)
+            return attr(*args, **kwargs)
+        return call
@@ -8,6 +8,7 @@ from typing import List, Optional, Dict, Any, Generator
 from server.services.stock_analyzer_service import StockAnalyzerService
 from server.services.us_stock_service_async import USStockServiceAsync
 from server.services.fund_service_async import FundServiceAsync
+from server.services.concept_index import get_concept_index
 import os
 import httpx
 from server.utils.logger import get_logger
@@ -55,6 +56,8 @@ limiter = Limiter(key_func=get_remote_address)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    # 启动时检查概念板块索引，过期则在后台重建
+    get_concept_index().ensure_fresh()
     yield
 
 app = FastAPI(
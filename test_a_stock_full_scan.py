@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+a_stock_full_scan 扫描器分析引擎测试用例
+"""
+
+import unittest
+import tempfile
+import shutil
+import pandas as pd
+from unittest.mock import patch
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.a_stock_full_scan import StockAnalyzer, TopStockScanner
+from server.services.bar_store import BarStore
+from server.services.indicator_library import IndicatorLibrary
+from server.services.market_snapshot import MarketSnapshotIngestor
+from server.services.scoring_rules import ScoringRuleSet
+from server.services.stock_universe import StockUniverse
+from server.utils.rate_limiter import RateLimiter
+from test_helpers import make_bars
+
+
+class TestStockAnalyzer(unittest.TestCase):
+    """测试扫描器读取本地K线（小写列名）后按不同规则集打分"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.bar_store = BarStore(base_dir=self.temp_dir)
+        self.bars = make_bars(120, seed=4, start='2024-01-01')
+        self.bar_store.write('A', '000001', self.bars, '20240101', self.bars.index[-1].strftime('%Y%m%d'))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _expected_score(self, rule_set: ScoringRuleSet) -> int:
+        values = IndicatorLibrary().evaluate_frame(self.bars, rule_set.required_columns)
+        table = {name: values[name][-1:] if name in values else self.bars[name].to_numpy()[-1:]
+                 for name in rule_set.required_columns}
+        return int(rule_set.score(table)[0])
+
+    def test_rule_sets_on_lowercase_bars(self):
+        """web 规则集用到 Close 等价格列，扫描数据为小写列名时也能打分"""
+        for name in ('scanner', 'web'):
+            with self.subTest(rule_set=name):
+                rule_set = ScoringRuleSet.builtin(name)
+                analyzer = StockAnalyzer(pro_api=None, bar_store=self.bar_store, rule_set=rule_set)
+                df = analyzer.get_local_stock_data('000001', start_date='20240101')
+                self.assertIn('close', df.columns)
+                result = analyzer.analyze_data('000001', df)
+                self.assertEqual(result['score'], self._expected_score(rule_set))
+                self.assertEqual(result['recommendation'], analyzer.get_recommendation(result['score']))
+                self.assertAlmostEqual(result['price'], self.bars['Close'].iloc[-1])
+
+
+class FakeProApi:
+    """模拟 Tushare pro 接口的股票列表"""
+
+    def __init__(self, stocks):
+        self.stocks = stocks
+
+    def stock_basic(self, exchange, list_status, fields):
+        return pd.DataFrame([{'ts_code': ts_code, 'symbol': ts_code.split('.')[0], 'name': ts_code,
+                              'area': '深圳', 'industry': '银行', 'list_date': list_date, 'market': '主板'}
+                             for ts_code, list_date in self.stocks])
+
+
+class TestTopStockScanner(unittest.TestCase):
+    """测试本地K线仓库模式的股票列表与股票池一致"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        bars = make_bars(5, start='2024-01-01')
+        self.bar_store = BarStore(base_dir=self.temp_dir)
+        for code in ('000001', '000002', '301999'):
+            self.bar_store.write('A', code, bars, '20240101', '20240105')
+        self.scanner = TopStockScanner(use_bar_store=True)
+        self.scanner.bar_store = self.bar_store
+        self.stats = {'trade_date': '20240105', 'appended': 0, 'needs_backfill': []}
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_local_stocks_follow_universe(self):
+        """退市股票和上市不满 MIN_BARS 个交易日的新股不参与扫描"""
+        pro = FakeProApi([('000001.SZ', '19910403'), ('301999.SZ', '21000101'), ('600000.SH', '19991110')])
+        limiter = RateLimiter(os.path.join(self.temp_dir, 'limiter.sqlite3'), {})
+        self.scanner.universe = StockUniverse(base_dir=os.path.join(self.temp_dir, 'universe'), pro_api=pro,
+                                              limiter=limiter)
+        self.scanner.universe.refresh()
+        with patch.object(MarketSnapshotIngestor, 'run', return_value=self.stats):
+            self.assertEqual(self.scanner.get_local_stocks(), ['000001'])
+
+    def test_local_stocks_without_universe(self):
+        """本地没有股票池时分析仓库中的全部股票"""
+        self.scanner.universe = StockUniverse(base_dir=os.path.join(self.temp_dir, 'universe'))
+        with patch.object(MarketSnapshotIngestor, 'run', return_value=self.stats):
+            self.assertEqual(self.scanner.get_local_stocks(), ['000001', '000002', '301999'])
+
+    def test_rank_high_scores(self):
+        """高分股票按评分降序排列，同分保持扫描顺序，指定 top 时只保留前 top 支"""
+        df = pd.DataFrame({'stock_code': ['a', 'b', 'c', 'd', 'e'], 'score': [90.0, 70.0, 95.0, 90.0, 88.0]})
+        self.assertEqual(list(self.scanner.rank_high_scores(df)['stock_code']), ['c', 'a', 'd', 'e'])
+        self.scanner.top = 2
+        self.assertEqual(list(self.scanner.rank_high_scores(df)['stock_code']), ['c', 'a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
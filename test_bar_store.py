@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BarStore 本地K线仓库测试用例
+"""
+
+import unittest
+import json
+import tempfile
+import shutil
+import threading
+import pandas as pd
+from datetime import datetime, timedelta
+from unittest.mock import patch
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.services.bar_store import BarStore
+from server.services.stock_data_provider import StockDataProvider
+from test_helpers import make_bars
+
+
+
+
+class TestBarStore(unittest.TestCase):
+    """测试BarStore读写与缓存新鲜度判断"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.store = BarStore(base_dir=self.tmp_dir, intraday_ttl=600)
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_write_and_read_roundtrip(self):
+        """测试写入后按日期范围读取"""
+        df = make_bars(20, start='2024-01-01')
+        self.store.write('A', '000001', df, '20240101', '20240131')
+
+        result = self.store.read('A', '000001', '20240105', '20240110')
+        self.assertEqual(len(result), 4)
+        self.assertEqual(result.index.min(), pd.Timestamp('2024-01-05'))
+        self.assertTrue(self.store.exists('A', '000001'))
+
+    def test_is_fresh_for_historical_range(self):
+        """测试历史区间缓存永久有效，超出覆盖范围时失效"""
+        df = make_bars(20, start='2024-01-01')
+        self.store.write('HK', '00700', df, '20240101', '20240131')
+
+        self.assertTrue(self.store.is_fresh('HK', '00700', '20240102', '20240130'))
+        self.assertFalse(self.store.is_fresh('HK', '00700', '20231201', '20240130'))
+        self.assertFalse(self.store.is_fresh('HK', '00700', '20240102', '20240215'))
+
+    def test_is_fresh_for_today_expires(self):
+        """测试覆盖到今天的缓存在有效期后失效"""
+        today = datetime.now().strftime('%Y%m%d')
+        df = make_bars(5, start='2024-01-01')
+        self.store.write('US', 'AAPL', df, '20240101', today)
+        self.assertTrue(self.store.is_fresh('US', 'AAPL', '20240101', today))
+
+        meta_path = self.store._meta_path('US', 'AAPL')
+        meta = self.store.read_meta('US', 'AAPL')
+        meta['updated_at'] = (datetime.now() - timedelta(hours=1)).isoformat(timespec='seconds')
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        self.assertFalse(self.store.is_fresh('US', 'AAPL', '20240101', today))
+
+    def test_is_fresh_for_partition_written_before_close(self):
+        """测试盘中写入的缓存在结束日过去后仍按有效期判断，收盘后写入的才永久有效"""
+        df = make_bars(5, start='2024-01-01')
+        self.store.write('A', '000001', df, '20240101', '20240105')
+        meta_path = self.store._meta_path('A', '000001')
+        meta = self.store.read_meta('A', '000001')
+
+        meta['updated_at'] = '2024-01-05T10:30:00'
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        self.assertFalse(self.store.is_fresh('A', '000001', '20240101', '20240105'))
+        self.assertTrue(self.store.is_fresh('A', '000001', '20240101', '20240104'))
+
+        meta['updated_at'] = '2024-01-05T15:30:00'
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        self.assertTrue(self.store.is_fresh('A', '000001', '20240101', '20240105'))
+
+    def test_concurrent_appends_keep_all_bars(self):
+        """测试多个线程同时向同一代码追加K线时不会丢失数据"""
+        df = make_bars(30, start='2024-01-01')
+        self.store.write('A', '000001', df.iloc[:10], '20240101', df.index[9].strftime('%Y%m%d'))
+        barrier = threading.Barrier(8)
+
+        def append(i):
+            barrier.wait()
+            row = df.iloc[10 + i:11 + i]
+            self.store.append('A', '000001', row, row.index[0].strftime('%Y%m%d'))
+
+        threads = [threading.Thread(target=append, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        result = self.store.read('A', '000001')
+        pd.testing.assert_index_equal(result.index, df.index[:18], check_names=False)
+        self.assertEqual(self.store.read_meta('A', '000001')['end'], df.index[17].strftime('%Y%m%d'))
+
+    def test_unsupported_market(self):
+        """测试不支持的市场类型"""
+        with self.assertRaises(ValueError):
+            self.store.exists('B', '900901')
+
+
+class TestStockDataProviderBarStore(unittest.TestCase):
+    """测试StockDataProvider优先读取本地仓库"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.provider = StockDataProvider(bar_store=BarStore(base_dir=self.tmp_dir))
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_second_load_hits_store(self):
+        """测试第二次读取不再访问数据源"""
+        df = make_bars(20, start='2024-01-01')
+        with patch.object(self.provider, '_fetch_bars_sync', return_value=df) as mock_fetch:
+            first = self.provider._load_bars_sync('000001', 'A', '20240101', '20240131')
+            second = self.provider._load_bars_sync('000001', 'A', '20240101', '20240131')
+
+        self.assertEqual(mock_fetch.call_count, 1)
+        self.assertEqual(len(first), len(second))
+        self.assertAlmostEqual(second['Close'].iloc[-1], df['Close'].iloc[-1])
+
+    def test_tail_only_refresh(self):
+        """测试已有缓存时只获取尾部数据并追加"""
+        full = make_bars(40, start='2024-01-01')
+        self.provider.bar_store.write('A', '000001', full.iloc[:30], '20240101', '20240209')
+
+        def fake_fetch(stock_code, market_type, start_date, end_date):
+            return self.provider._slice_bars(full, start_date, end_date)
+
+        with patch.object(self.provider, '_fetch_bars_sync', side_effect=fake_fetch) as mock_fetch:
+            result = self.provider._load_bars_sync('000001', 'A', '20240101', '20240223')
+
+        self.assertEqual(mock_fetch.call_count, 1)
+        tail_start = mock_fetch.call_args[0][2]
+        self.assertGreater(tail_start, '20240101')
+        self.assertEqual(len(result), 40)
+        self.assertEqual(self.provider.bar_store.read_meta('A', '000001')['end'], '20240223')
+
+    def test_qfq_adjustment_triggers_full_refetch(self):
+        """测试前复权价格调整后重写完整序列"""
+        cached = make_bars(30, start='2024-01-01')
+        self.provider.bar_store.write('A', '000001', cached, '20240101', '20240209')
+        adjusted = make_bars(40, start='2024-01-01', base=9.5)
+
+        def fake_fetch(stock_code, market_type, start_date, end_date):
+            return self.provider._slice_bars(adjusted, start_date, end_date)
+
+        with patch.object(self.provider, '_fetch_bars_sync', side_effect=fake_fetch) as mock_fetch:
+            result = self.provider._load_bars_sync('000001', 'A', '20240101', '20240223')
+
+        self.assertEqual(mock_fetch.call_count, 2)
+        self.assertEqual(mock_fetch.call_args_list[1][0][2], '20240101')
+        self.assertAlmostEqual(result['Close'].iloc[0], 9.5)
+
+    def test_full_history_market_cached_once(self):
+        """测试港股完整历史缓存后，更早的起始日期也能命中"""
+        full = make_bars(200, start='2020-01-01')
+        with patch.object(self.provider, '_fetch_bars_sync', return_value=full) as mock_fetch:
+            self.provider._load_bars_sync('00700', 'HK', '20200301', '20200501')
+            result = self.provider._load_bars_sync('00700', 'HK', '20200102', '20200501')
+
+        self.assertEqual(mock_fetch.call_count, 1)
+        self.assertEqual(result.index.min(), pd.Timestamp('2020-01-02'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ConceptIndex 概念板块倒排索引测试用例
+"""
+
+import unittest
+import tempfile
+import shutil
+from datetime import datetime, timedelta
+import pandas as pd
+from types import SimpleNamespace
+from unittest.mock import patch
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.services.concept_index import ConceptIndex
+from server.services.concept_crawler import ConceptBoardCrawler
+from server.services.bar_store import BarStore
+from server.services.stock_data_provider import StockDataProvider
+
+
+class TestConceptIndex(unittest.TestCase):
+    """测试概念板块索引的构建、持久化与过期判断"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'concept_index.json')
+        self.memberships = [
+            ('000001', '数字货币'),
+            ('000001', '跨境支付'),
+            ('600000', '数字货币'),
+            ('000001', '数字货币'),
+        ]
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_replace_and_lookup(self):
+        """测试替换索引后按代码查询，重复记录去重"""
+        index = ConceptIndex(path=self.path)
+        self.assertTrue(index.is_stale())
+
+        index.replace(self.memberships)
+        self.assertEqual(index.get('000001'), ['数字货币', '跨境支付'])
+        self.assertEqual(index.get('600000'), ['数字货币'])
+        self.assertEqual(index.get('300750'), [])
+        self.assertFalse(index.is_stale())
+
+    def test_persisted_index_reloaded(self):
+        """测试索引持久化后可被新实例加载"""
+        ConceptIndex(path=self.path).replace(self.memberships)
+        reloaded = ConceptIndex(path=self.path)
+        self.assertEqual(len(reloaded), 2)
+        self.assertEqual(reloaded.get('600000'), ['数字货币'])
+
+    def test_ensure_fresh_rebuilds_in_background(self):
+        """测试索引过期时在后台线程重建"""
+        index = ConceptIndex(path=self.path, max_age_hours=1)
+        index.replace(self.memberships)
+        index._updated_at = datetime.now() - timedelta(hours=2)
+
+        with patch.object(index, '_crawl_memberships', return_value=[('300750', '锂电池')]):
+            self.assertTrue(index.ensure_fresh())
+            index._refresh_thread.join(timeout=5)
+
+        self.assertEqual(index.get('300750'), ['锂电池'])
+        self.assertEqual(index.get('000001'), [])
+        self.assertFalse(index.ensure_fresh())
+
+    def test_failed_rebuild_backs_off(self):
+        """测试重建失败后在退避期内不再重建，退避期过后重试"""
+        index = ConceptIndex(path=self.path, retry_minutes=10)
+        with patch.object(index, '_crawl_memberships', side_effect=ConnectionError("模拟数据源不可用")) as mock_crawl:
+            self.assertTrue(index.ensure_fresh())
+            index._refresh_thread.join(timeout=5)
+            self.assertFalse(index.ensure_fresh())
+            self.assertEqual(mock_crawl.call_count, 1)
+
+            # 第二次失败后退避时间翻倍
+            index._failed_at -= timedelta(minutes=11)
+            self.assertTrue(index.ensure_fresh())
+            index._refresh_thread.join(timeout=5)
+            index._failed_at -= timedelta(minutes=11)
+            self.assertFalse(index.ensure_fresh())
+
+        index._failed_at -= timedelta(minutes=10)
+        with patch.object(index, '_crawl_memberships', return_value=self.memberships):
+            self.assertTrue(index.ensure_fresh())
+            index._refresh_thread.join(timeout=5)
+        self.assertEqual(index.get('600000'), ['数字货币'])
+        self.assertFalse(index.in_backoff())
+
+    def test_provider_reads_from_index(self):
+        """测试StockDataProvider从索引读取概念板块"""
+        index = ConceptIndex(path=self.path)
+        index.replace(self.memberships)
+        provider = StockDataProvider(bar_store=BarStore(base_dir=self.tmp_dir), concept_index=index)
+
+        with patch.object(index, '_crawl_memberships') as mock_crawl:
+            self.assertEqual(provider.get_stock_concept_info('000001.SZ'), ['数字货币', '跨境支付'])
+            mock_crawl.assert_not_called()
+
+
+
+class TestConceptBoardCrawler(unittest.TestCase):
+    """测试概念板块并发爬虫"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.output_path = os.path.join(self.tmp_dir, 'membership.parquet')
+        self.attempts = {}
+
+        def board_names():
+            return pd.DataFrame({'代码': ['BK0001', 'BK0002', 'BK0003'], '板块名称': ['数字货币', '跨境支付', '锂电池']})
+
+        def board_cons(symbol):
+            self.attempts[symbol] = self.attempts.get(symbol, 0) + 1
+            if symbol == 'BK0002' and self.attempts[symbol] == 1:
+                raise ConnectionError("模拟网络抖动")
+            if symbol == 'BK0003':
+                raise ConnectionError("模拟持续失败")
+            codes = {'BK0001': ['000001', '600000'], 'BK0002': ['000001']}[symbol]
+            return pd.DataFrame({'代码': codes})
+
+        # 只替换akshare模块，不影响测试过程中导入的其他模块
+        self.original_ak = sys.modules.get('akshare')
+        sys.modules['akshare'] = SimpleNamespace(stock_board_concept_name_em=board_names, stock_board_concept_cons_em=board_cons)
+
+    def tearDown(self):
+        """测试后清理"""
+        if self.original_ak is None:
+            sys.modules.pop('akshare', None)
+        else:
+            sys.modules['akshare'] = self.original_ak
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_crawl_with_retry_and_consolidated_table(self):
+        """测试并发抓取、失败重试并写出合并成份股表"""
+        crawler = ConceptBoardCrawler(max_workers=3, requests_per_second=0, max_retries=2,
+                                      backoff_base=0, output_path=self.output_path)
+        membership = crawler.crawl()
+
+        self.assertEqual(len(membership), 3)
+        self.assertEqual(self.attempts['BK0002'], 2)
+        self.assertEqual(crawler.last_stats['failed_boards'], ['锂电池'])
+        saved = pd.read_parquet(self.output_path)
+        self.assertEqual(sorted(saved['stock_code'].unique().tolist()), ['000001', '600000'])
+
+        index = ConceptIndex(path=os.path.join(self.tmp_dir, 'concept_index.json'), crawler=crawler)
+        index.rebuild()
+        self.assertEqual(sorted(index.get('000001')), ['数字货币', '跨境支付'])
+
+    def test_mostly_failed_crawl_keeps_previous_table(self):
+        """测试大部分板块失败时不替换已有的成份股表和索引"""
+        crawler = ConceptBoardCrawler(max_workers=3, requests_per_second=0, max_retries=2,
+                                      backoff_base=0, output_path=self.output_path)
+        crawler.crawl()
+        index = ConceptIndex(path=os.path.join(self.tmp_dir, 'concept_index.json'), crawler=crawler)
+        index.rebuild()
+
+        # 不重试时 BK0002 也失败，3个板块中2个失败
+        self.attempts.clear()
+        crawler.max_retries = 1
+        with self.assertRaises(ValueError):
+            index.rebuild()
+        self.assertEqual(crawler.last_stats['rows'], 2)
+        self.assertEqual(len(pd.read_parquet(self.output_path)), 3)
+        self.assertEqual(sorted(index.get('000001')), ['数字货币', '跨境支付'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试用例共用的模拟数据
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+def make_bars(periods: int, seed: int = 0, start: Optional[str] = None, end: Optional[str] = None,
+              base: float = 10.0, last_close: Optional[float] = None, freq: str = 'B',
+              volatility: float = 0.02, lowercase: bool = False) -> pd.DataFrame:
+    """
+    创建随机游走的模拟K线，同一 seed 生成相同的走势
+
+    Args:
+        periods: K线数量
+        seed: 随机种子
+        start: 第一根K线的时间，默认为 2024-01-01（指定 end 时忽略）
+        end: 最后一根K线的时间
+        base: 第一根K线的收盘价
+        last_close: 指定时整体缩放，使最后一根K线的收盘价等于该值
+        freq: K线周期，默认为工作日
+        volatility: 对数收益率的标准差
+        lowercase: 为True时使用分钟数据接口的小写列名和 datetime 索引
+
+    Returns:
+        包含 Open、Close、High、Low、Volume、Amount、Change_pct 列的DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    if end is not None:
+        index = pd.date_range(end=end, periods=periods, freq=freq)
+    else:
+        index = pd.date_range(start=start or '2024-01-01', periods=periods, freq=freq)
+    steps = rng.normal(0, volatility, periods)
+    steps[0] = 0.0
+    closes = base * np.exp(np.cumsum(steps))
+    if last_close is not None:
+        closes = closes * (last_close / closes[-1])
+    volumes = rng.integers(1000, 100000, periods).astype(float)
+    df = pd.DataFrame({
+        'Open': closes,
+        'Close': closes,
+        'High': closes * 1.01,
+        'Low': closes * 0.99,
+        'Volume': volumes,
+        'Amount': volumes * closes * 100,
+        'Change_pct': np.concatenate([[0.0], np.diff(closes) / closes[:-1] * 100]),
+    }, index=pd.DatetimeIndex(index, name='Date'))
+    if lowercase:
+        df = df[['Open', 'Close', 'High', 'Low', 'Volume']].rename(columns=str.lower).rename_axis('datetime')
+    return df
+
+
+def make_indicator_table(n: int, seed: int = 0) -> pd.DataFrame:
+    """创建随机的最新指标表格，覆盖各评分区间、边界值和缺失值"""
+    rng = np.random.default_rng(seed)
+    table = pd.DataFrame({
+        'Close': rng.uniform(9, 11, n),
+        'MA5': rng.uniform(9, 11, n),
+        'MA20': rng.uniform(9, 11, n),
+        'MA60': rng.uniform(9, 11, n),
+        'RSI': rng.choice([20, 30, 40, 45, 50, 55, 60, 70, 80], n).astype(float),
+        'MACD': rng.normal(0, 1, n),
+        'Signal': rng.normal(0, 1, n),
+        'Volume_Ratio': rng.choice([0.5, 1.0, 1.2, 1.5, 2.0], n),
+    }, index=[f'{i:06d}' for i in range(n)])
+    table.iloc[::7, table.columns.get_loc('RSI')] = np.nan
+    table.iloc[::11, table.columns.get_loc('MA60')] = np.nan
+    return table
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+指标计算后端测试用例
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.services.indicator_kernels import NUMPY_KERNELS, get_kernels, make_loop_kernels
+from server.services.technical_indicator import TechnicalIndicator
+from test_helpers import make_bars
+
+# 不经 numba 编译、以纯Python执行的单遍循环实现，保证未安装 numba 时也能验证循环逻辑
+LOOP_KERNELS = make_loop_kernels(lambda func: func)
+
+
+class TestIndicatorKernels(unittest.TestCase):
+    """测试各后端与 pandas 计算结果一致"""
+
+    def setUp(self):
+        """测试前准备：带缺失值的价格序列"""
+        self.df = make_bars(120)
+        self.df.iloc[50, self.df.columns.get_loc('Close')] = np.nan
+        self.close = self.df['Close'].to_numpy()
+
+    def test_rolling_mean_std(self):
+        """测试滚动均值和标准差，窗口内有缺失值时为NaN"""
+        series = pd.Series(self.close)
+        for kernels in (NUMPY_KERNELS, LOOP_KERNELS):
+            mean, std = kernels.rolling_mean_std(self.close, 20)
+            np.testing.assert_allclose(mean, series.rolling(20).mean(), rtol=1e-9, equal_nan=True)
+            np.testing.assert_allclose(std, series.rolling(20).std(), rtol=1e-9, equal_nan=True)
+            np.testing.assert_allclose(kernels.rolling_mean(self.close, 5), series.rolling(5).mean(),
+                                       rtol=1e-9, equal_nan=True)
+
+    def test_atr(self):
+        """测试ATR与 pandas 逐列计算的真实波幅均值一致"""
+        prev_close = self.df['Close'].shift()
+        true_range = pd.concat([self.df['High'] - self.df['Low'], (self.df['High'] - prev_close).abs(),
+                                (self.df['Low'] - prev_close).abs()], axis=1).max(axis=1)
+        expected = true_range.rolling(window=14).mean()
+        high, low = self.df['High'].to_numpy(), self.df['Low'].to_numpy()
+        for kernels in (NUMPY_KERNELS, LOOP_KERNELS):
+            np.testing.assert_allclose(kernels.atr(high, low, self.close, 14), expected,
+                                       rtol=1e-9, equal_nan=True)
+
+    def test_technical_indicator_backends(self):
+        """测试各后端的完整指标结果一致"""
+        expected = TechnicalIndicator(backend='pandas').calculate_indicators(self.df)
+        indicator = TechnicalIndicator(backend='numpy')
+        pd.testing.assert_frame_equal(indicator.calculate_indicators(self.df), expected, rtol=1e-9)
+        indicator.kernels = LOOP_KERNELS
+        pd.testing.assert_frame_equal(indicator.calculate_indicators(self.df), expected, rtol=1e-9)
+
+    def test_backend_selection(self):
+        """测试后端选择，未知名称报错"""
+        self.assertEqual(get_kernels('pandas').name, 'pandas')
+        self.assertIsNotNone(get_kernels('auto'))
+        with self.assertRaises(ValueError):
+            get_kernels('gpu')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+IndicatorLibrary 指标库测试用例
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.services.indicator_kernels import IndicatorKernels, PANDAS_KERNELS
+from server.services.indicator_library import IndicatorLibrary, TechnicalParams, DEFAULT_PARAMS
+from server.services.stock_scorer import StockScorer
+from server.services.technical_indicator import TechnicalIndicator
+from test_helpers import make_bars
+
+
+class TestIndicatorLibrary(unittest.TestCase):
+    """测试指标库的定义与求值"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.df = make_bars(150)
+        self.library = IndicatorLibrary()
+
+    def test_core_indicators_match_pandas(self):
+        """测试核心指标与 pandas 直接计算一致"""
+        close = self.df['Close']
+        result = TechnicalIndicator().calculate_indicators(self.df)
+
+        pd.testing.assert_series_equal(result['MA20'], close.rolling(20).mean(), check_names=False)
+        delta = close.diff()
+        rs = delta.where(delta > 0, 0).rolling(14).mean() / (-delta.where(delta < 0, 0)).rolling(14).mean()
+        pd.testing.assert_series_equal(result['RSI'], 100 - 100 / (1 + rs), check_names=False)
+        macd = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+        pd.testing.assert_series_equal(result['MACD'], macd, check_names=False)
+        self.assertEqual(list(result.columns[len(self.df.columns):]), self.library.output_columns())
+
+    def test_extra_indicators_on_lowercase_columns(self):
+        """测试扫描器使用的小写列名和扩展指标"""
+        df = self.df.rename(columns=str.lower)
+        values = self.library.evaluate_frame(df, self.library.output_columns(include_extra=True))
+        close, volume = df['close'], df['volume']
+
+        diff = close.diff().fillna(0)
+        obv = pd.Series(np.where(diff > 0, volume, np.where(diff < 0, -volume, 0))).cumsum()
+        np.testing.assert_allclose(values['OBV'], obv)
+        lowest, highest = close.rolling(14).min(), close.rolling(14).max()
+        percent_k = (close - lowest) / (highest - lowest + 1e-10) * 100
+        np.testing.assert_allclose(values['%K'], percent_k, equal_nan=True)
+        np.testing.assert_allclose(values['%D'], percent_k.rolling(3).mean(), equal_nan=True)
+        np.testing.assert_allclose(values['ROC'], close.pct_change(periods=10) * 100, equal_nan=True)
+
+    def test_shared_intermediates_computed_once(self):
+        """测试 MA20、布林带和波动率共用一次20日均值与标准差的滚动计算"""
+        calls = []
+
+        def rolling_mean(values, window):
+            calls.append(('mean', window))
+            return PANDAS_KERNELS.rolling_mean(values, window)
+
+        def rolling_mean_std(values, window):
+            calls.append(('mean_std', window))
+            return PANDAS_KERNELS.rolling_mean_std(values, window)
+
+        kernels = IndicatorKernels('counting', rolling_mean, rolling_mean_std, PANDAS_KERNELS.atr)
+        values = self.library.evaluate(self.df, ['MA20', 'BB_Middle', 'BB_Upper', 'Volatility'], kernels=kernels)
+
+        self.assertEqual(calls, [('mean_std', 20)])
+        self.assertIs(values['MA20'], values['BB_Middle'])
+        close = self.df['Close']
+        np.testing.assert_allclose(values['Volatility'], close.rolling(20).std() / close.rolling(20).mean() * 100,
+                                   equal_nan=True)
+
+    def test_only_transitive_dependencies_computed(self):
+        """测试只请求评分指标时不计算布林带、ATR和波动率"""
+        view = self.library.lazy(self.df)
+        for name in StockScorer.REQUIRED_INDICATORS:
+            view[name]
+
+        computed = set(view.computed)
+        self.assertTrue(computed.isdisjoint({'BB_Upper', 'BB_Lower', 'ATR', 'Volatility', 'Close_std_20', 'OBV'}))
+        self.assertIn('Close_mean_20', computed)
+
+    def test_tail_evaluation_matches_full(self):
+        """测试尾部求值（含扩展指标）与完整计算的最后几个值一致，窗口类指标只用最近的K线"""
+        outputs = self.library.output_columns(include_extra=True)
+        full = self.library.evaluate(self.df, outputs)
+        for tail in (1, 5):
+            values = self.library.evaluate_tail(self.df, tail, outputs)
+            for name in outputs:
+                np.testing.assert_allclose(values[name], full[name][-tail:], rtol=1e-9, equal_nan=True, err_msg=name)
+
+        self.assertEqual(self.library.lookback('MA60'), 60)
+        self.assertEqual(self.library.lookback('RSI'), 15)
+        self.assertEqual(self.library.lookback('ATR'), 15)
+        self.assertEqual(self.library.lookback('%D'), 16)
+        self.assertIsNone(self.library.lookback('Signal'))
+        self.assertIsNone(self.library.lookback('OBV_MA10'))
+
+    def test_params_and_resolution(self):
+        """测试参数字典与 TechnicalParams 互相转换，未定义的指标报错"""
+        self.assertEqual(TechnicalParams.from_dict(DEFAULT_PARAMS), TechnicalParams.default())
+        library = IndicatorLibrary({'ma_periods': {'short': 10}})
+        self.assertIn('MA10', library.output_columns())
+        self.assertEqual(library.resolve(['Histogram'])[-3:], ['MACD', 'Signal', 'Histogram'])
+        with self.assertRaises(KeyError):
+            library.resolve(['KDJ'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PanelIndicatorEngine 多股票向量化指标引擎测试用例
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.services.stock_bars import StockBars
+from server.services.technical_indicator import TechnicalIndicator
+from server.services.indicator_panel import PricePanel, PanelIndicatorEngine
+from server.services.indicator_kernels import NUMPY_KERNELS, rolling_std
+from server.services.indicator_library import IndicatorLibrary
+from test_helpers import make_bars
+
+
+
+
+class TestPanelIndicatorEngine(unittest.TestCase):
+    """测试面板指标与逐只计算结果一致"""
+
+    def setUp(self):
+        """测试前准备"""
+        # 不同长度的历史，覆盖右对齐补齐和不足窗口长度的情况
+        self.bars = [StockBars.from_frame(make_bars(periods, seed=i, start='2023-01-02'), f'{i:06d}', 'A')
+                     for i, periods in enumerate([120, 80, 45, 15])]
+        self.engine = PanelIndicatorEngine()
+        self.indicator = TechnicalIndicator()
+
+    def test_matches_per_stock_indicators(self):
+        """测试每只股票的面板结果与 TechnicalIndicator 一致"""
+        result = self.engine.calculate(PricePanel.from_bars(self.bars))
+
+        for bars in self.bars:
+            expected = self.indicator.calculate_indicators(bars)
+            actual = result.frame(bars.stock_code)
+            pd.testing.assert_frame_equal(actual, expected, check_freq=False, rtol=1e-9)
+
+    def test_latest_row_is_each_stocks_last_bar(self):
+        """测试右对齐后最后一行为每只股票的最新K线"""
+        panel = PricePanel.from_bars(self.bars)
+        result = self.engine.calculate(panel)
+
+        np.testing.assert_array_equal(panel.close[-1], [b['Close'][-1] for b in self.bars])
+        expected_rsi = [self.indicator.calculate_indicators(b)['RSI'].iloc[-1] for b in self.bars]
+        np.testing.assert_allclose(result.latest('RSI'), expected_rsi, rtol=1e-9)
+
+    def test_length_limit(self):
+        """测试只保留最近N根K线"""
+        panel = PricePanel.from_bars(self.bars, length=30)
+        self.assertEqual(panel.close.shape, (30, 4))
+        self.assertEqual(panel.lengths.tolist(), [30, 30, 30, 15])
+
+    def test_primitives_match_pandas_with_gaps(self):
+        """测试缺失值处理与 pandas 一致"""
+        values = np.array([np.nan, 1.0, 2.0, np.nan, 4.0, 4.0, 4.0, 3.0])
+        series = pd.Series(values)
+
+        view = IndicatorLibrary().lazy({'Close': values[:, None]}, NUMPY_KERNELS)
+        np.testing.assert_allclose(view['EMA12'][:, 0],
+                                   series.ewm(span=12, adjust=False).mean().to_numpy(), equal_nan=True)
+        np.testing.assert_allclose(rolling_std(values[:, None], 3)[:, 0],
+                                   series.rolling(3).std().to_numpy(), equal_nan=True, atol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+IndicatorState 增量指标状态测试用例
+"""
+
+import unittest
+import json
+import tempfile
+import shutil
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.services.bar_store import BarStore
+from server.services.indicator_state import EMAState, IndicatorState, IndicatorStateStore
+from server.services.stock_data_provider import StockDataProvider
+from server.services.technical_indicator import TechnicalIndicator
+from test_helpers import make_bars
+
+# 60分钟K线（小写列名，与分钟数据接口一致）
+MINUTE_BARS = {'start': '2024-01-02 10:30', 'freq': 'h', 'volatility': 0.01, 'lowercase': True}
+
+
+
+
+def _expected_last_row(df: pd.DataFrame) -> pd.Series:
+    """用 TechnicalIndicator 完整计算得到最后一根K线的指标"""
+    daily = df.rename(columns=str.capitalize)
+    return TechnicalIndicator().calculate_indicators(daily).iloc[-1]
+
+
+class TestIndicatorState(unittest.TestCase):
+    """测试增量更新结果与完整计算一致"""
+
+    def assertMatches(self, values, expected):
+        """逐个指标比较，未满窗口的指标均为NaN"""
+        for name, value in values.items():
+            np.testing.assert_allclose(value, expected[name], rtol=1e-9, equal_nan=True, err_msg=name)
+
+    def test_seed_then_update_matches_full_calculation(self):
+        """测试先用历史初始化、再逐根更新后与完整计算一致"""
+        df = make_bars(200, **MINUTE_BARS)
+        state = IndicatorState.from_history(df.iloc[:150])
+        for timestamp, row in df.iloc[150:].iterrows():
+            values = state.update(row.to_dict(), str(timestamp))
+
+        self.assertMatches(values, _expected_last_row(df))
+        self.assertEqual(state.bars, 200)
+
+    def test_short_history(self):
+        """测试历史短于窗口长度时未满窗口的指标为NaN"""
+        df = make_bars(30, seed=1, **MINUTE_BARS)
+        values = IndicatorState.from_history(df).values()
+
+        self.assertTrue(np.isnan(values['MA60']))
+        self.assertMatches(values, _expected_last_row(df))
+
+    def test_same_timestamp_replaces_last_bar(self):
+        """测试同一时间戳的K线替换上一根而不是追加"""
+        df = make_bars(100, seed=2, **MINUTE_BARS)
+        state = IndicatorState.from_history(df.iloc[:-1])
+        partial = df.iloc[-1].to_dict()
+        partial['close'] *= 0.98
+        state.update(partial, str(df.index[-1]))
+        values = state.update(df.iloc[-1].to_dict(), str(df.index[-1]))
+
+        self.assertEqual(state.bars, 100)
+        self.assertMatches(values, _expected_last_row(df))
+
+    def test_replace_after_reload(self):
+        """测试保存后重新加载仍可替换未完成的K线，且不保存完整状态副本"""
+        df = make_bars(100, seed=5, **MINUTE_BARS)
+        for rsi_method in ('wilder', 'sma'):
+            state = IndicatorState.from_history(df.iloc[:-1], rsi_method=rsi_method)
+            partial = df.iloc[-1].to_dict()
+            partial['high'] *= 1.05
+            partial['close'] *= 1.03
+            state.update(partial, str(df.index[-1]))
+
+            data = json.loads(json.dumps(state.to_dict()))
+            self.assertNotIn('checkpoint', data)
+            restored = IndicatorState.from_dict(data)
+            values = restored.update(df.iloc[-1].to_dict(), str(df.index[-1]))
+            self.assertEqual(restored.bars, 100)
+            self.assertEqual(values, state.update(df.iloc[-1].to_dict(), str(df.index[-1])))
+        self.assertMatches(values, _expected_last_row(df))
+
+    def test_json_roundtrip(self):
+        """测试JSON序列化后继续更新结果不变"""
+        df = make_bars(120, seed=3, **MINUTE_BARS)
+        state = IndicatorState.from_history(df.iloc[:100], rsi_method='wilder')
+        restored = IndicatorState.from_dict(json.loads(json.dumps(state.to_dict())))
+
+        self.assertEqual(restored.update_frame(df.iloc[100:]), state.update_frame(df.iloc[100:]))
+
+    def test_ema_skips_missing_values_like_pandas(self):
+        """测试EMA在缺失值处沿用上一个值、旧值权重照常衰减，与 pandas ewm 一致，撤销后恢复"""
+        series = [np.nan, 10, 11, np.nan, np.nan, 12, 13]
+        expected = pd.Series(series).ewm(span=12, adjust=False).mean().to_numpy()
+        state = EMAState(12)
+        np.testing.assert_allclose([state.update(x) for x in series], expected, rtol=1e-12, equal_nan=True)
+
+        state.undo()
+        restored = EMAState.from_dict(json.loads(json.dumps(state.to_dict())))
+        self.assertAlmostEqual(restored.update(13), expected[-1], places=12)
+
+    def test_wilder_rsi(self):
+        """测试威尔德RSI与标准递推公式一致"""
+        df = make_bars(80, seed=4, **MINUTE_BARS)
+        delta = df['close'].diff()
+        gain = delta.clip(lower=0).to_numpy()[1:]
+        loss = (-delta).clip(lower=0).to_numpy()[1:]
+        avg_gain, avg_loss = gain[:14].mean(), loss[:14].mean()
+        for g, l in zip(gain[14:], loss[14:]):
+            avg_gain = (avg_gain * 13 + g) / 14
+            avg_loss = (avg_loss * 13 + l) / 14
+
+        values = IndicatorState.from_history(df, rsi_method='wilder').values()
+        self.assertAlmostEqual(values['RSI'], 100 - 100 / (1 + avg_gain / avg_loss), places=9)
+
+
+class TestMinuteIndicators(unittest.TestCase):
+    """测试StockDataProvider的分钟指标接口"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.provider = StockDataProvider(bar_store=BarStore(base_dir=self.tmp_dir),
+                                          indicator_state_store=IndicatorStateStore(base_dir=self.tmp_dir))
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_refresh_reuses_saved_state(self):
+        """测试再次刷新时从保存的状态增量更新"""
+        df = make_bars(150, seed=5, **MINUTE_BARS)
+        with patch.object(self.provider, '_get_stock_minute_data_sync', return_value=df.iloc[:140]):
+            self.provider._get_minute_indicators_sync('000001', '60')
+        with patch.object(self.provider, '_get_stock_minute_data_sync', return_value=df.iloc[-60:]), \
+                patch.object(IndicatorState, 'from_history', side_effect=AssertionError('不应重新初始化')):
+            result = self.provider._get_minute_indicators_sync('000001', '60')
+
+        self.assertEqual(result['timestamp'], str(df.index[-1]))
+        for name, value in result['indicators'].items():
+            np.testing.assert_allclose(value, _expected_last_row(df)[name], rtol=1e-9, equal_nan=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
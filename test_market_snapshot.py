@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MarketSnapshotIngestor 全市场快照入库测试用例
+"""
+
+import unittest
+import tempfile
+import shutil
+import pandas as pd
+from datetime import datetime
+from unittest.mock import patch
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.services.bar_store import BarStore
+from server.services.market_snapshot import MarketSnapshotIngestor
+from test_helpers import make_bars
+
+
+
+
+def _make_snapshot() -> pd.DataFrame:
+    """创建模拟的全市场实时行情快照"""
+    return pd.DataFrame({
+        '代码': ['000001', '600000', '300750', '000002'],
+        '名称': ['平安银行', '浦发银行', '宁德时代', '万科A'],
+        '最新价': [11.0, 8.0, 200.0, None],
+        '涨跌幅': [1.0, 1.0, 1.0, None],
+        '涨跌额': [0.1, 0.1, 2.0, None],
+        '成交量': [5000.0, 3000.0, 800.0, 0.0],
+        '成交额': [55000.0, 24000.0, 160000.0, 0.0],
+        '振幅': [2.0, 2.0, 2.0, None],
+        '最高': [11.2, 8.1, 202.0, None],
+        '最低': [10.8, 7.9, 198.0, None],
+        '今开': [10.9, 7.95, 199.0, None],
+        '昨收': [10.9, 7.5, 198.0, 9.0],
+        '换手率': [0.5, 0.2, 0.1, None],
+    })
+
+
+class TestMarketSnapshotIngestor(unittest.TestCase):
+    """测试快照追加、连续性与除权校验"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.store = BarStore(base_dir=self.tmp_dir)
+        self.ingestor = MarketSnapshotIngestor(bar_store=self.store)
+        # 000001 连续覆盖到上一交易日；600000 上一交易日收盘价与昨收不一致（除权）
+        self.store.write('A', '000001', make_bars(60, end='2024-01-31', last_close=10.9), '20231101', '20240131')
+        self.store.write('A', '600000', make_bars(60, end='2024-01-31', last_close=7.9), '20231101', '20240131')
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_ingest_appends_contiguous_codes(self):
+        """测试快照只追加到连续且未除权的股票，其余列入待回补"""
+        stats = self.ingestor.ingest(snapshot=_make_snapshot(), trade_date='20240201', prev_trade_date='20240131')
+
+        self.assertEqual(stats['appended'], 1)
+        self.assertEqual(sorted(stats['needs_backfill']), ['300750', '600000'])
+
+        df = self.store.read('A', '000001')
+        self.assertEqual(len(df), 61)
+        self.assertEqual(df.index.max(), pd.Timestamp('2024-02-01'))
+        self.assertAlmostEqual(df['Close'].iloc[-1], 11.0)
+        self.assertEqual(df['Code'].iloc[-1], '000001')
+        self.assertEqual(self.store.read_meta('A', '000001')['end'], '20240201')
+        self.assertEqual(len(self.store.read('A', '600000')), 60)
+
+    def test_reingest_replaces_same_day_bar(self):
+        """测试同一交易日重复入库时覆盖当日K线而不重复追加"""
+        snapshot = _make_snapshot()
+        self.ingestor.ingest(snapshot=snapshot, trade_date='20240201', prev_trade_date='20240131')
+        snapshot.loc[0, '最新价'] = 11.1
+        self.ingestor.ingest(snapshot=snapshot, trade_date='20240201', prev_trade_date='20240131')
+
+        df = self.store.read('A', '000001')
+        self.assertEqual(len(df), 61)
+        self.assertAlmostEqual(df['Close'].iloc[-1], 11.1)
+
+    def test_run_backfills_missing_codes(self):
+        """测试无法追加的股票交给回补"""
+        with patch.object(self.ingestor.provider, '_load_bars_sync') as mock_load, \
+                patch.object(self.ingestor, 'fetch_snapshot', return_value=_make_snapshot()), \
+                patch.object(self.ingestor, 'fetch_trade_dates', return_value=['20240130', '20240131', '20240201']):
+            stats = self.ingestor.run(requests_per_second=0)
+
+        self.assertEqual(sorted(call.args[0] for call in mock_load.call_args_list), ['300750', '600000'])
+        self.assertEqual(stats['backfill']['backfilled'], 2)
+
+    def test_resolve_trade_dates_before_open(self):
+        """测试收盘前使用上一交易日，盘中标记为未完成的K线"""
+        trade_dates = ['20240130', '20240131', '20240201']
+        before_open = MarketSnapshotIngestor.resolve_trade_dates(trade_dates, datetime(2024, 2, 1, 9, 0))
+        intraday = MarketSnapshotIngestor.resolve_trade_dates(trade_dates, datetime(2024, 2, 1, 10, 0))
+        after_close = MarketSnapshotIngestor.resolve_trade_dates(trade_dates, datetime(2024, 2, 1, 16, 0))
+        weekend = MarketSnapshotIngestor.resolve_trade_dates(trade_dates, datetime(2024, 2, 3, 10, 0))
+
+        self.assertEqual(before_open, {'trade_date': '20240131', 'prev_trade_date': '20240130', 'intraday': False})
+        self.assertEqual(intraday, {'trade_date': '20240131', 'prev_trade_date': '20240130', 'intraday': True})
+        self.assertEqual(after_close, {'trade_date': '20240201', 'prev_trade_date': '20240131', 'intraday': False})
+        self.assertEqual(weekend, after_close)
+
+    def test_intraday_snapshot_not_ingested(self):
+        """测试盘中的快照不作为日线入库，也不触发回补"""
+        with patch.object(self.ingestor, 'fetch_snapshot') as mock_snapshot, \
+                patch.object(self.ingestor, 'fetch_trade_dates', return_value=['20240130', '20240131', '20240201']), \
+                patch.object(MarketSnapshotIngestor, 'resolve_trade_dates',
+                             return_value={'trade_date': '20240131', 'prev_trade_date': '20240130', 'intraday': True}):
+            stats = self.ingestor.run()
+
+        mock_snapshot.assert_not_called()
+        self.assertTrue(stats['skipped'])
+        self.assertEqual((stats['appended'], stats['needs_backfill']), (0, []))
+        self.assertNotIn('backfill', stats)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MetadataCache 股票元数据缓存测试用例
+"""
+
+import unittest
+import tempfile
+import shutil
+from datetime import datetime, timedelta
+from unittest.mock import patch
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.services.metadata_cache import MetadataCache
+from server.services.bar_store import BarStore
+from server.services.stock_data_provider import StockDataProvider
+
+
+class TestMetadataCache(unittest.TestCase):
+    """测试元数据缓存的LRU淘汰、TTL与持久化"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'metadata_cache.json')
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_lru_eviction(self):
+        """测试超过容量时淘汰最久未使用的条目"""
+        cache = MetadataCache(max_entries=2, persist=False)
+        cache.set('A', '000001', {'stock_name': '平安银行'})
+        cache.set('A', '600000', {'stock_name': '浦发银行'})
+        cache.get('A', '000001')
+        cache.set('HK', '00700', {'stock_name': '腾讯控股'})
+
+        self.assertIsNotNone(cache.get('A', '000001'))
+        self.assertIsNone(cache.get('A', '600000'))
+        self.assertEqual(cache.get('HK', '00700')['stock_name'], '腾讯控股')
+
+    def test_ttl_expiry(self):
+        """测试条目过期后失效"""
+        cache = MetadataCache(ttl_days=1, persist=False)
+        cache.set('US', 'AAPL', {'stock_name': 'Apple'})
+        cache._entries['US:AAPL']['cached_at'] = (datetime.now() - timedelta(days=2)).isoformat()
+        self.assertIsNone(cache.get('US', 'AAPL'))
+        self.assertEqual(len(cache), 0)
+
+    def test_persistence(self):
+        """测试落盘后新实例可读取"""
+        cache = MetadataCache(path=self.path, flush_every=100)
+        cache.set('A', '000001', {'stock_name': '平安银行', 'sector': '银行'})
+        cache.flush()
+
+        reloaded = MetadataCache(path=self.path)
+        self.assertEqual(reloaded.get('A', '000001'), {'stock_name': '平安银行', 'sector': '银行'})
+
+    def test_provider_uses_cache(self):
+        """测试StockDataProvider第二次获取元数据时不访问数据源"""
+        provider = StockDataProvider(bar_store=BarStore(base_dir=self.tmp_dir),
+                                     metadata_cache=MetadataCache(persist=False))
+        metadata = {'stock_name': '平安银行', 'sector': '银行'}
+        with patch.object(provider, '_fetch_metadata_sync', return_value=metadata) as mock_fetch:
+            provider._get_stock_metadata_sync('000001', 'A')
+            result = provider._get_stock_metadata_sync('000001', 'A')
+
+        self.assertEqual(mock_fetch.call_count, 1)
+        self.assertEqual(result, metadata)
+
+
+if __name__ == '__main__':
+    unittest.main()
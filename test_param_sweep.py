@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ParamSweep 技术指标参数寻优测试用例
+"""
+
+import unittest
+import tempfile
+import shutil
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.services.bar_store import BarStore
+from server.services.indicator_library import TechnicalParams
+from server.services.param_sweep import ParamSweep, param_grid, score_panel
+from server.services.score_history import ScoreHistory
+from server.services.scoring_rules import ScoringRuleSet
+from server.services.shared_panel import SharedPanel
+from test_helpers import make_bars
+
+
+class TestParamSweep(unittest.TestCase):
+    """测试参数网格展开、共享面板评分与进程池回测"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.bar_store = BarStore(base_dir=cls.temp_dir)
+        for i, (code, start) in enumerate([('000001', '2024-01-01'), ('600000', '2024-02-01'),
+                                           ('300750', '2024-01-15')]):
+            df = make_bars(160, seed=10 + i, start=start)
+            if code == '300750':
+                # 模拟停牌
+                df = df.drop(df.index[90:95])
+            cls.bar_store.write('A', code, df, df.index[0].strftime('%Y%m%d'), df.index[-1].strftime('%Y%m%d'))
+        cls.panel = cls.bar_store.materialize_panel('A')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.panel.close()
+        shutil.rmtree(cls.temp_dir)
+
+    def test_param_grid(self):
+        grid = param_grid({'ma_periods.short': [5, 10], 'rsi_period': [9, 14, 21]})
+        self.assertEqual(len(grid), 6)
+        self.assertEqual(grid[-1].ma_periods, {'short': 10, 'medium': 20, 'long': 60})
+        self.assertEqual(grid[-1].rsi_period, 21)
+        with self.assertRaises(KeyError):
+            param_grid({'ma_periods.weekly': [5]})
+
+    def test_attach_is_zero_copy_and_read_only(self):
+        attached = SharedPanel.attach(self.panel.spec)
+        try:
+            np.testing.assert_array_equal(attached['Close'], self.panel['Close'])
+            self.assertFalse(attached['Close'].flags.writeable)
+            self.panel['Volume'][0, 0] += 1
+            self.assertEqual(attached['Volume'][0, 0], self.panel['Volume'][0, 0])
+            self.panel['Volume'][0, 0] -= 1
+        finally:
+            attached.close()
+
+    def test_default_params_match_score_history(self):
+        """默认参数下的面板评分与逐只计算的历史评分一致（含停牌日）"""
+        scores = score_panel(self.panel, TechnicalParams.default(), ScoringRuleSet.builtin('web'))
+        history = ScoreHistory(bar_store=self.bar_store, base_dir=self.temp_dir).compute('A')
+        expected = history.reindex(index=pd.DatetimeIndex(self.panel.dates), columns=self.panel.symbols)
+        np.testing.assert_array_equal(scores, expected.to_numpy())
+
+    def test_process_pool_matches_inline(self):
+        grid = param_grid({'ma_periods.short': [5, 10], 'rsi_period': [9, 14]})
+        inline = ParamSweep(max_workers=1, buy_threshold=60).run(self.panel, grid)
+        pooled = ParamSweep(max_workers=2, buy_threshold=60).run(self.panel, grid)
+        self.assertEqual(len(inline), 4)
+        pd.testing.assert_frame_equal(inline, pooled)
+        self.assertTrue(inline['sharpe'].is_monotonic_decreasing)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RateLimiter 跨进程令牌桶限速器测试用例
+"""
+
+import unittest
+import asyncio
+import multiprocessing
+import tempfile
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.utils.rate_limiter import LimitedModule, RateLimiter, parse_budgets
+
+RATE = 20.0
+BUDGETS = {'tushare': (RATE, 1, 1), 'akshare.stock_zh_a_hist': (RATE, 1, 1)}
+
+
+def _acquire_times(db_path: str, n: int):
+    """在子进程中获取令牌，返回每次获得令牌的时间"""
+    limiter = RateLimiter(db_path, BUDGETS)
+    times = []
+    for _ in range(n):
+        limiter.acquire('tushare.pro_bar')
+        times.append(time.time())
+    return times
+
+
+class TestRateLimiter(unittest.TestCase):
+    """测试配额解析、端点匹配以及线程、协程、进程之间共享令牌桶"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'limiter.sqlite3')
+        self.limiter = RateLimiter(self.db_path, BUDGETS)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _assert_paced(self, times, n):
+        times = sorted(times)
+        self.assertEqual(len(times), n)
+        # 容量为1：相邻两次请求的间隔不小于 1/RATE（允许少量计时误差）
+        self.assertGreaterEqual(times[-1] - times[0], (n - 1) / RATE - 0.02)
+        self.assertGreaterEqual(min(b - a for a, b in zip(times, times[1:])), 1 / RATE - 0.01)
+
+    def test_budgets(self):
+        self.assertEqual(parse_budgets("tushare=50/60, akshare=5/1:5"),
+                         {'tushare': (50.0, 60.0, 1.0), 'akshare': (5.0, 1.0, 5.0)})
+        with self.assertRaises(ValueError):
+            parse_budgets("tushare=fast")
+        self.assertEqual(self.limiter.budget('tushare.pro_bar')[0], 'tushare')
+        self.assertEqual(self.limiter.budget('tushare.stock_basic')[0], 'tushare')
+        self.assertEqual(self.limiter.budget('akshare.stock_zh_a_hist')[0], 'akshare.stock_zh_a_hist')
+        self.assertIsNone(self.limiter.budget('akshare.stock_individual_info_em'))
+        self.assertEqual(self.limiter.acquire('akshare.stock_individual_info_em'), 0.0)
+
+    def test_threads_and_coroutines_share_bucket(self):
+        """不同端点共享数据源配额，线程与协程按同一令牌桶排队"""
+        def acquire(endpoint):
+            self.limiter.acquire(endpoint)
+            return time.time()
+
+        async def acquire_async():
+            endpoint = self.limiter.endpoint('tushare.pro_bar')
+            times = []
+            for _ in range(3):
+                await endpoint.acquire()
+                times.append(time.time())
+            return times
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(acquire, 'tushare.pro_bar' if i % 2 else 'tushare.stock_basic')
+                       for i in range(6)]
+            async_times = asyncio.run(acquire_async())
+            times = [f.result() for f in futures] + async_times
+        self._assert_paced(times, 9)
+
+    def test_processes_share_bucket(self):
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(2) as pool:
+            results = pool.starmap(_acquire_times, [(self.db_path, 4), (self.db_path, 4)])
+        self._assert_paced(results[0] + results[1], 8)
+
+    def test_limited_module(self):
+        calls = []
+        module = SimpleNamespace(stock_zh_a_hist=lambda symbol: calls.append((symbol, time.time())),
+                                 __version__='1.0')
+        ak = LimitedModule(module, 'akshare', self.limiter)
+        self.assertEqual(ak.__version__, '1.0')
+        for code in ('000001', '000002', '000003'):
+            ak.stock_zh_a_hist(symbol=code)
+        self.assertEqual([c for c, _ in calls], ['000001', '000002', '000003'])
+        self._assert_paced([t for _, t in calls], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
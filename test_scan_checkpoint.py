@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ScanCheckpoint 扫描检查点测试用例
+"""
+
+import unittest
+import asyncio
+import tempfile
+import shutil
+import json
+import sys
+import os
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.services.scan_checkpoint import ScanCheckpoint
+from server.services.scan_pipeline import ScanPipeline
+
+
+class TestScanCheckpoint(unittest.TestCase):
+    """测试检查点的追加写入、崩溃后的读取以及与扫描流水线配合断点续扫"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_append_and_reload(self):
+        with ScanCheckpoint('run1', self.temp_dir) as checkpoint:
+            checkpoint.append({'stock_code': '000001.SZ', 'status': 'ok', 'error': None,
+                               'result': {'stock_code': '000001.SZ', 'score': 90, 'rsi': np.float64(55.5),
+                                          'volume': np.int64(1200)}})
+            checkpoint.append({'stock_code': '000002.SZ', 'status': 'skipped', 'result': None, 'error': '数据不足'})
+            checkpoint.append({'stock_code': '000003.SZ', 'status': 'failed', 'result': None, 'error': '连接中断'})
+
+        reloaded = ScanCheckpoint('run1', self.temp_dir)
+        self.assertEqual(reloaded.completed(), {'000001.SZ', '000002.SZ'})
+        # 失败的股票在恢复时重试
+        self.assertEqual(reloaded.pending(['000003.SZ', '000001.SZ', '000004.SZ', '000002.SZ']),
+                         ['000003.SZ', '000004.SZ'])
+        self.assertEqual(reloaded.results(), [{'stock_code': '000001.SZ', 'score': 90, 'rsi': 55.5, 'volume': 1200}])
+        self.assertEqual(reloaded.results(['000002.SZ']), [])
+        self.assertEqual(ScanCheckpoint('run2', self.temp_dir).completed(), set())
+
+    def test_torn_last_line(self):
+        """崩溃时写了一半的最后一行被忽略，之后追加的记录不受影响"""
+        path = os.path.join(self.temp_dir, 'run1.jsonl')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'stock_code': '000001.SZ', 'status': 'ok', 'result': {'score': 80}}) + '\n')
+            f.write('{"stock_code": "000002.SZ", "sta')
+
+        checkpoint = ScanCheckpoint('run1', self.temp_dir)
+        self.assertEqual(checkpoint.completed(), {'000001.SZ'})
+        checkpoint.append({'stock_code': '000002.SZ', 'status': 'ok', 'result': {'score': 70}})
+        checkpoint.close()
+        self.assertEqual(ScanCheckpoint('run1', self.temp_dir).completed(), {'000001.SZ', '000002.SZ'})
+
+    def test_resume_pipeline(self):
+        """中断后以同一 run_id 重新扫描，只获取未完成的股票"""
+        codes = [f"{i:06d}.SZ" for i in range(10)]
+        fetched = []
+
+        def fetch(code):
+            fetched.append(code)
+            if code == codes[6]:
+                raise KeyboardInterrupt
+            return int(code[:6])
+
+        def compute(code, data):
+            return {'stock_code': code, 'score': data}
+
+        def scan(fetch_func):
+            checkpoint = ScanCheckpoint('run1', self.temp_dir)
+            results = checkpoint.results(codes)
+            pending = checkpoint.pending(codes)
+
+            def sink(outcome):
+                checkpoint.append(outcome)
+                if outcome['status'] == 'ok':
+                    results.append(outcome['result'])
+
+            try:
+                asyncio.run(ScanPipeline(fetch_func, compute, sink=sink, fetch_workers=1,
+                                         compute_workers=1, queue_size=1).run(pending))
+            finally:
+                checkpoint.close()
+            return results, pending
+
+        with self.assertRaises(KeyboardInterrupt):
+            scan(fetch)
+        done = ScanCheckpoint('run1', self.temp_dir).completed()
+        self.assertTrue(done)
+        self.assertTrue(done < set(codes[:6]))
+
+        fetched.clear()
+        results, pending = scan(lambda code: fetched.append(code) or int(code[:6]))
+        self.assertEqual(sorted(fetched), sorted(set(codes) - done))
+        self.assertEqual(sorted(r['stock_code'] for r in results), codes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ScanPipeline 流水线扫描测试用例
+"""
+
+import unittest
+import asyncio
+import tempfile
+import shutil
+import threading
+import time
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.services.scan_pipeline import ScanPipeline
+from server.utils.rate_limiter import RateLimiter
+
+
+class TestScanPipeline(unittest.TestCase):
+    """测试流水线的结果状态、重试与阶段并行"""
+
+    def test_outcomes_and_retries(self):
+        attempts = {}
+        lock = threading.Lock()
+
+        def fetch(code):
+            with lock:
+                attempts[code] = attempts.get(code, 0) + 1
+            if code == 'bad':
+                raise ValueError("数据不足")
+            if code == 'flaky' and attempts[code] < 2:
+                raise ConnectionError("连接中断")
+            if code == 'down':
+                raise ConnectionError("连接中断")
+            return int(code) if code.isdigit() else 0
+
+        def compute(code, data):
+            return None if code == '000' else {'stock_code': code, 'score': data}
+
+        outcomes = []
+        pipeline = ScanPipeline(fetch, compute, sink=outcomes.append, fetch_workers=2,
+                                compute_workers=2, max_retries=3)
+        codes = ['001', 'bad', 'flaky', '000', 'down', '002']
+        stats = asyncio.run(pipeline.run(codes))
+
+        status = {o['stock_code']: o['status'] for o in outcomes}
+        self.assertEqual(status, {'001': 'ok', 'bad': 'skipped', 'flaky': 'ok', '000': 'skipped',
+                                  'down': 'failed', '002': 'ok'})
+        self.assertEqual((stats['total'], stats['ok'], stats['skipped'], stats['failed']), (6, 3, 2, 1))
+        self.assertEqual((attempts['bad'], attempts['flaky'], attempts['down']), (1, 2, 3))
+
+    def test_stages_overlap_under_rate_limit(self):
+        """计算在获取等待令牌期间进行，总耗时由限速配额决定而不是两阶段耗时之和"""
+        rate = 40
+        n = 12
+
+        def compute(code, data):
+            time.sleep(0.02)
+            return {'stock_code': code}
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, ignore_errors=True)
+        limiter = RateLimiter(os.path.join(tmp_dir, 'limiter.sqlite3'), budgets={'test': (rate, 1, 1)})
+
+        results = []
+        pipeline = ScanPipeline(lambda code: code, compute, sink=results.append,
+                                limiter=limiter.endpoint('test.fetch'), fetch_workers=2, compute_workers=1, queue_size=2)
+        stats = asyncio.run(pipeline.run([str(i) for i in range(n)]))
+        self.assertEqual(len(results), n)
+        self.assertLess(stats['elapsed'], (n - 1) / rate + n * 0.02)
+        self.assertGreaterEqual(stats['elapsed'], (n - 1) / rate - 0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
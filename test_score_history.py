@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ScoreHistory 历史评分矩阵测试用例
+"""
+
+import unittest
+import tempfile
+import shutil
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.services.bar_store import BarStore
+from server.services.score_history import ScoreHistory
+from server.services.stock_scorer import StockScorer
+from server.services.technical_indicator import TechnicalIndicator
+from test_helpers import make_bars
+
+
+
+
+class TestScoreHistory(unittest.TestCase):
+    """测试历史评分的计算、保存与查询"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.bar_store = BarStore(base_dir=os.path.join(self.temp_dir, 'bars'))
+        self.score_history = ScoreHistory(bar_store=self.bar_store,
+                                          base_dir=os.path.join(self.temp_dir, 'scores'))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, code: str, df: pd.DataFrame):
+        self.bar_store.write('A', code, df, df.index[0].strftime('%Y%m%d'), df.index[-1].strftime('%Y%m%d'))
+
+    def test_scores_match_stock_scorer(self):
+        """每个交易日的评分与 StockScorer 只用截至当日数据计算的结果一致"""
+        df = make_bars(150, seed=1)
+        scores = self.score_history.score_series(df)
+
+        self.assertTrue(scores.iloc[:59].isna().all())
+        indicator, scorer = TechnicalIndicator(), StockScorer()
+        for i in (59, 80, 115, 149):
+            expected = scorer.calculate_score(indicator.calculate_indicators(df.iloc[:i + 1]))
+            self.assertEqual(scores.iloc[i], expected)
+
+    def test_build_merges_and_loads(self):
+        """部分重建只替换指定股票的列，矩阵按实际交易日对齐"""
+        self._write('000001', make_bars(120, seed=2))
+        self._write('600000', make_bars(100, seed=3, start='2024-02-01'))
+        matrix = self.score_history.build('A')
+        self.assertEqual(sorted(matrix.columns), ['000001', '600000'])
+        self.assertTrue(matrix.loc[:'2024-01-31', '600000'].isna().all())
+
+        self._write('600000', make_bars(100, seed=4, start='2024-02-01'))
+        self.score_history.build('A', codes=['600000'])
+        loaded = self.score_history.load('A')
+        pd.testing.assert_series_equal(loaded['000001'], matrix['000001'], check_freq=False)
+        expected = self.score_history.score_series(self.bar_store.read('A', '600000')).dropna()
+        np.testing.assert_array_equal(self.score_history.history('600000', 'A').to_numpy(), expected.to_numpy())
+        self.assertIsNone(self.score_history.history('300750', 'A'))
+
+    def test_crossed_above(self):
+        """上穿筛选以各股票上一个有效评分为基准，停牌日不影响判断"""
+        dates = pd.DatetimeIndex(pd.to_datetime(['2024-03-01', '2024-03-04', '2024-03-05']), name='Date')
+        matrix = pd.DataFrame({
+            'A1': [60, 70, 85],        # 上穿
+            'A2': [85, 90, 95],        # 一直在阈值之上
+            'A3': [70, np.nan, 90],    # 停牌后复牌上穿
+            'A4': [np.nan, np.nan, 90],  # 没有历史评分
+        }, index=dates, dtype=float)
+        path = self.score_history._path('A')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        matrix.to_parquet(path)
+
+        self.assertEqual(self.score_history.crossed_above(80, 'A'), ['A3', 'A1'])
+        self.assertEqual(self.score_history.crossed_above(80, 'A', date='20240304'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ScoringRuleSet 评分规则集测试用例
+"""
+
+import unittest
+import json
+import tempfile
+import shutil
+import numpy as np
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.services.scoring_rules import ScoringRuleSet, load_rule_sets, score_rule_sets
+from test_helpers import make_indicator_table
+
+
+def _web_score(row) -> int:
+    """原 StockScorer.calculate_score 的逐条判断"""
+    score = 0
+    if row['MA5'] > row['MA20'] > row['MA60']:
+        score += 25
+    elif row['MA5'] > row['MA20']:
+        score += 15
+    elif row['Close'] > row['MA20']:
+        score += 10
+    rsi = row['RSI']
+    if 45 <= rsi <= 55:
+        score += 15
+    elif 55 < rsi < 70:
+        score += 25
+    elif 30 < rsi < 45:
+        score += 10
+    elif rsi >= 70:
+        score += 5
+    elif rsi <= 30:
+        score += 15
+    if row['MACD'] > row['Signal']:
+        score += 20
+    if row['Volume_Ratio'] > 1.5:
+        score += 30
+    elif row['Volume_Ratio'] > 1:
+        score += 15
+    return score
+
+
+def _scanner_score(row) -> int:
+    """原 a_stock_full_scan.StockAnalyzer.calculate_score 的逐条判断"""
+    score = 0
+    if row['MA5'] > row['MA20'] and row['MA20'] > row['MA60']:
+        score += 30
+    else:
+        if row['MA5'] > row['MA20']:
+            score += 15
+        if row['MA20'] > row['MA60']:
+            score += 15
+    if 30 <= row['RSI'] <= 70:
+        score += 20
+    elif row['RSI'] < 30:
+        score += 15
+    if row['MACD'] > row['Signal']:
+        score += 20
+    if row['Volume_Ratio'] > 1.5:
+        score += 30
+    elif row['Volume_Ratio'] > 1:
+        score += 15
+    score += 5 if row['OBV'] > row['OBV_MA10'] else -5
+    if row['%K'] < 20:
+        score += 5
+    elif row['%K'] > 80:
+        score -= 5
+    return score
+
+
+class TestScoringRuleSet(unittest.TestCase):
+    """测试规则集与原有评分逻辑一致"""
+
+    def setUp(self):
+        """测试前准备"""
+        rng = np.random.default_rng(1)
+        self.table = make_indicator_table(400)
+        self.table['OBV'] = rng.normal(0, 1, len(self.table))
+        self.table['OBV_MA10'] = rng.normal(0, 1, len(self.table))
+        self.table['%K'] = rng.choice([10, 20, 50, 80, 90, np.nan], len(self.table))
+
+    def test_builtin_rules_match_original_logic(self):
+        """测试内置 web / scanner 规则集与原逐条判断的评分一致"""
+        for name, reference in (('web', _web_score), ('scanner', _scanner_score)):
+            scores = ScoringRuleSet.builtin(name).score(self.table)
+            expected = [reference(row) for _, row in self.table.iterrows()]
+            np.testing.assert_array_equal(scores, expected, err_msg=name)
+
+    def test_multiple_rule_sets_share_conditions(self):
+        """测试一次计算多个规则集，结果与分别计算一致"""
+        rule_sets = [ScoringRuleSet.builtin('web'), ScoringRuleSet.builtin('scanner')]
+        results = score_rule_sets(rule_sets, self.table)
+        for rule_set in rule_sets:
+            np.testing.assert_array_equal(results[rule_set.name], rule_set.score(self.table))
+
+    def test_json_file_overrides_builtin(self):
+        """测试从JSON目录加载规则集，同名覆盖内置定义"""
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            rules = ScoringRuleSet.builtin('web').to_dict()
+            rules['components'][2]['rules'][0]['score'] = 40
+            with open(os.path.join(tmp_dir, 'web.json'), 'w', encoding='utf-8') as f:
+                json.dump(rules, f, ensure_ascii=False)
+            rule_sets = load_rule_sets(tmp_dir)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        self.assertEqual(rule_sets['web'].max_score, 120)
+        self.assertIn('scanner', rule_sets)
+        self.assertEqual(rule_sets['web'].recommend(np.array([85, 10])).tolist(), ['强烈推荐', '强烈不推荐'])
+
+    def test_invalid_operator(self):
+        """测试不支持的运算符报错"""
+        with self.assertRaises(ValueError):
+            ScoringRuleSet('bad', [{'name': 'x', 'rules': [{'when': [['RSI', '=>', 30]], 'score': 1}]}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SharedPanel 全市场价格面板测试用例
+"""
+
+import unittest
+import json
+import glob
+import tempfile
+import shutil
+import numpy as np
+import pandas as pd
+import subprocess
+import textwrap
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.services.bar_store import BarStore
+from server.services.param_sweep import ParamSweep, param_grid
+from server.services.shared_panel import SharedPanel
+from test_helpers import make_bars
+
+
+class TestSharedPanel(unittest.TestCase):
+    """测试由K线仓库物化共享内存面板与内存映射面板"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.bar_store = BarStore(base_dir=self.temp_dir)
+        self.bars = {
+            '000001': make_bars(80, seed=1, start='2024-01-01'),
+            '600000': make_bars(60, seed=2, start='2024-02-01').drop(pd.Timestamp('2024-02-05')),
+        }
+        for code, df in self.bars.items():
+            self.bar_store.write('A', code, df, df.index[0].strftime('%Y%m%d'), df.index[-1].strftime('%Y%m%d'))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_panel_aligned_on_trading_dates(self):
+        with self.bar_store.materialize_panel('A') as panel:
+            self.assertEqual(panel.symbols, ['000001', '600000'])
+            j = panel.position('600000')
+            close = pd.Series(panel['Close'][:, j], index=pd.DatetimeIndex(panel.dates))
+            self.assertTrue(np.isnan(close['2024-02-05']))
+            np.testing.assert_array_equal(close.dropna().to_numpy(), self.bars['600000']['Close'].to_numpy())
+            np.testing.assert_array_equal(panel.columns('600000')['Volume'],
+                                          self.bars['600000']['Volume'].to_numpy())
+
+    def test_memmap_panel(self):
+        """内存映射面板写入索引文件，重新物化后保留上一版文件、删除更早的文件，面板目录不影响分区代码列表"""
+        with self.bar_store.materialize_panel('A') as shm_panel:
+            expected = np.array(shm_panel.values)
+
+        panel = self.bar_store.materialize_panel('A', memmap=True)
+        self.assertIsInstance(panel.values, np.memmap)
+        np.testing.assert_array_equal(panel.values, expected)
+        directory = os.path.dirname(panel.path)
+        with open(os.path.join(directory, 'index.json'), 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['symbols'], {'000001': 0, '600000': 1})
+
+        opened = self.bar_store.open_panel('A')
+        np.testing.assert_array_equal(opened['Close'], panel['Close'])
+        self.assertFalse(opened['Close'].flags.writeable)
+        self.assertEqual(self.bar_store.list_codes('A'), ['000001', '600000'])
+
+        df = make_bars(90, seed=3, start='2024-01-01')
+        self.bar_store.write('A', '300750', df, '20240101', df.index[-1].strftime('%Y%m%d'))
+        refreshed = self.bar_store.materialize_panel('A', memmap=True)
+        self.assertEqual(len(refreshed), 3)
+        # 上一版数组文件保留一代，读到旧索引的进程仍能打开
+        self.assertEqual(sorted(glob.glob(os.path.join(directory, 'values_*.npy'))), [panel.path, refreshed.path])
+        np.testing.assert_array_equal(np.load(panel.path, mmap_mode='r'), expected)
+        latest = self.bar_store.materialize_panel('A', memmap=True)
+        self.assertEqual(sorted(glob.glob(os.path.join(directory, 'values_*.npy'))), [refreshed.path, latest.path])
+        # 旧面板的内存映射在文件删除后仍可读取
+        np.testing.assert_array_equal(panel.values, expected)
+        self.assertIsNone(BarStore(base_dir=os.path.join(self.temp_dir, 'empty')).open_panel('A'))
+
+    def test_workers_attach_memmap_panel(self):
+        grid = param_grid({'rsi_period': [9, 14]})
+        with self.bar_store.materialize_panel('A') as shm_panel:
+            expected = ParamSweep(max_workers=1, buy_threshold=60).run(shm_panel, grid)
+        panel = self.bar_store.materialize_panel('A', memmap=True)
+        self.assertIn('path', panel.spec)
+        pooled = ParamSweep(max_workers=2, buy_threshold=60).run(panel, grid)
+        pd.testing.assert_frame_equal(pooled, expected)
+        panel.close()
+
+    def test_workers_attach_shared_memory_panel(self):
+        """spawn 工作进程附加共享内存面板：结果与单进程一致，资源跟踪器不报错、不提示泄漏"""
+        script = textwrap.dedent(f'''
+            import sys
+            sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r})
+            import pandas as pd
+            from server.services.bar_store import BarStore
+            from server.services.param_sweep import ParamSweep, param_grid
+
+            if __name__ == '__main__':
+                grid = param_grid({{'rsi_period': [9, 14]}})
+                with BarStore(base_dir={self.temp_dir!r}).materialize_panel('A') as panel:
+                    assert 'name' in panel.spec
+                    inline = ParamSweep(max_workers=1, buy_threshold=60).run(panel, grid)
+                    pooled = ParamSweep(max_workers=2, buy_threshold=60).run(panel, grid)
+                pd.testing.assert_frame_equal(pooled, inline)
+                print(len(pooled))
+        ''')
+        result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, timeout=120)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip().splitlines()[-1], '2')
+        self.assertNotIn('Traceback', result.stderr)
+        self.assertNotIn('leaked', result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+StockAnalyzerService 单只股票分析测试用例
+"""
+
+import unittest
+import asyncio
+import json
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.services.stock_analyzer_service import StockAnalyzerService
+from server.services.stock_bars import StockBars
+from server.services.stock_scorer import StockScorer
+from server.services.technical_indicator import TechnicalIndicator
+from test_helpers import make_bars
+
+METADATA = {'stock_name': '平安银行', 'sector': '银行', 'concepts': ['数字货币']}
+
+
+class FakeProvider:
+    """模拟数据提供者：K线与元数据分别在指定事件之后返回"""
+
+    def __init__(self, metadata_after_bars: bool, bars_error: str = None):
+        self.metadata_after_bars = metadata_after_bars
+        self.bars_error = bars_error
+        self.metadata_started = asyncio.Event()
+        self.bars_returned = asyncio.Event()
+        self.metadata_cancelled = False
+
+    async def get_stock_bars(self, stock_code, market_type):
+        # K线在元数据请求已经发出之后才返回，串行获取时会在这里超时
+        await asyncio.wait_for(self.metadata_started.wait(), timeout=1)
+        self.bars_returned.set()
+        if self.bars_error:
+            return StockBars.failed(stock_code, market_type, self.bars_error)
+        return StockBars.from_frame(make_bars(120), stock_code, market_type)
+
+    async def get_stock_metadata(self, stock_code, market_type):
+        self.metadata_started.set()
+        try:
+            if self.metadata_after_bars:
+                await self.bars_returned.wait()
+                await asyncio.sleep(0.05)
+            return dict(METADATA)
+        except asyncio.CancelledError:
+            self.metadata_cancelled = True
+            raise
+
+
+class FakeAIAnalyzer:
+    """模拟AI分析，记录收到的名称、行业与概念"""
+
+    def __init__(self):
+        self.kwargs = None
+
+    async def get_ai_analysis(self, df, stock_code, market_type, stream, **kwargs):
+        self.kwargs = kwargs
+        yield json.dumps({'ai_analysis_chunk': '分析内容'})
+
+
+class TestAnalyzeStock(unittest.TestCase):
+    """测试K线与元数据并发获取，以及元数据晚到时的单独推送"""
+
+    def _run(self, provider):
+        service = StockAnalyzerService.__new__(StockAnalyzerService)
+        service.data_provider = provider
+        service.indicator = TechnicalIndicator()
+        service.scorer = StockScorer()
+        service.ai_analyzer = FakeAIAnalyzer()
+
+        async def collect():
+            return [json.loads(message) async for message in service.analyze_stock('000001', 'A')]
+
+        return asyncio.run(collect()), service.ai_analyzer
+
+    def test_metadata_before_bars(self):
+        messages, ai = self._run(FakeProvider(metadata_after_bars=False))
+        self.assertEqual([m['status'] for m in messages], ['processing_ai', 'analyzing_ai', 'completed'])
+        self.assertEqual(messages[0]['stock_name'], '平安银行')
+        self.assertIn('score', messages[0])
+        self.assertEqual(ai.kwargs, {'stock_name': '平安银行', 'sector': '银行', 'concepts': ['数字货币']})
+
+    def test_late_metadata_pushed_separately(self):
+        messages, ai = self._run(FakeProvider(metadata_after_bars=True))
+        self.assertEqual([m['status'] for m in messages],
+                         ['processing_ai', 'processing_ai', 'analyzing_ai', 'completed'])
+        # 基本结果不等待元数据，先以代码代替名称
+        self.assertEqual(messages[0]['stock_name'], '000001')
+        self.assertIn('score', messages[0])
+        self.assertEqual(messages[1], {'stock_code': '000001', 'stock_name': '平安银行', 'sector': '银行',
+                                       'market_type': 'A', 'status': 'processing_ai'})
+        self.assertEqual(messages[-1]['stock_name'], '平安银行')
+        self.assertEqual(ai.kwargs['concepts'], ['数字货币'])
+
+    def test_bars_error_cancels_metadata(self):
+        provider = FakeProvider(metadata_after_bars=True, bars_error='网络错误')
+        messages, ai = self._run(provider)
+        self.assertEqual([(m['status'], m['error']) for m in messages], [('error', '网络错误')])
+        self.assertTrue(provider.metadata_cancelled)
+        self.assertIsNone(ai.kwargs)
+
+
+if __name__ == '__main__':
+    unittest.main()
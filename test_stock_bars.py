@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+StockBars K线结果对象测试用例
+"""
+
+import unittest
+import pickle
+import tempfile
+import shutil
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.services.bar_store import BarStore
+from server.services.stock_bars import StockBars
+from server.services.stock_data_provider import StockDataProvider
+from server.services.technical_indicator import TechnicalIndicator
+from test_helpers import make_bars
+
+
+
+
+class TestStockBars(unittest.TestCase):
+    """测试StockBars的构建、转换与序列化"""
+
+    def test_frame_roundtrip(self):
+        """测试DataFrame与StockBars互相转换"""
+        df = make_bars(80)
+        bars = StockBars.from_frame(df, '000001', 'A', stock_name='平安银行', sector='银行')
+
+        self.assertEqual(len(bars), len(df))
+        self.assertTrue(bars.ok)
+        np.testing.assert_array_equal(bars['Close'], df['Close'].to_numpy())
+        pd.testing.assert_frame_equal(bars.to_frame(), df, check_freq=False)
+
+    def test_failed_result(self):
+        """测试失败结果为空并带错误信息"""
+        bars = StockBars.failed('000001', 'A', '网络错误')
+        self.assertTrue(bars.empty)
+        self.assertFalse(bars.ok)
+        self.assertEqual(bars.error, '网络错误')
+        with self.assertRaises(AttributeError):
+            bars.extra = 1
+
+    def test_pickle_keeps_metadata(self):
+        """测试跨进程序列化后元数据不丢失"""
+        bars = StockBars.from_frame(make_bars(80), '000001', 'A', stock_name='平安银行', concepts=['数字货币'])
+        restored = pickle.loads(pickle.dumps(bars))
+
+        self.assertEqual(restored.stock_name, '平安银行')
+        self.assertEqual(restored.concepts, ['数字货币'])
+        np.testing.assert_array_equal(restored['Close'], bars['Close'])
+
+    def test_indicators_do_not_modify_bars(self):
+        """测试指标计算不修改原始列，且结果与DataFrame输入一致"""
+        df = make_bars(80)
+        bars = StockBars.from_frame(df, '000001', 'A')
+        indicator = TechnicalIndicator()
+
+        result = indicator.calculate_indicators(bars)
+
+        self.assertEqual(list(bars.columns), list(df.columns))
+        pd.testing.assert_frame_equal(result, indicator.calculate_indicators(df), check_freq=False)
+
+    def test_provider_returns_stock_bars(self):
+        """测试StockDataProvider返回StockBars，失败时带错误信息"""
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            provider = StockDataProvider(bar_store=BarStore(base_dir=tmp_dir))
+            with patch.object(provider, '_fetch_bars_sync', return_value=make_bars(80)):
+                bars = provider._get_stock_bars_sync('000001', 'A', '20240101', '20240430')
+            with patch.object(provider, '_fetch_bars_sync', side_effect=ConnectionError('超时')):
+                failed = provider._get_stock_bars_sync('000002', 'A', '20240101', '20240430')
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        self.assertIsInstance(bars, StockBars)
+        self.assertTrue(bars.ok)
+        self.assertIn('超时', failed.error)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+StockScorer 评分服务测试用例
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.services.stock_scorer import StockScorer
+from test_helpers import make_indicator_table
+
+
+
+
+class TestVectorizedScorer(unittest.TestCase):
+    """测试向量化评分与逐只评分一致"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.scorer = StockScorer()
+        self.table = make_indicator_table(500)
+
+    def test_scores_match_scalar_rules(self):
+        """测试评分和建议与 calculate_score / get_recommendation 一致"""
+        scores = self.scorer.calculate_scores(self.table)
+        expected = [self.scorer.calculate_score(self.table.iloc[[i]]) for i in range(len(self.table))]
+
+        np.testing.assert_array_equal(scores, expected)
+        self.assertEqual(list(self.scorer.get_recommendations(scores)),
+                         [self.scorer.get_recommendation(s) for s in expected])
+
+    def test_top_k(self):
+        """测试 top_k 与完整排序的前 k 个一致，同分时位置靠前的优先"""
+        scores = self.scorer.calculate_scores(self.table)
+        expected = np.argsort(-scores, kind='stable')
+        for k in (1, 10, 500, 600):
+            np.testing.assert_array_equal(StockScorer.top_k(scores, k), expected[:k])
+
+    def test_batch_score_stocks(self):
+        """测试批量评分按评分降序返回，缺少列的股票被跳过"""
+        stock_dfs = {code: self.table.loc[[code]] for code in self.table.index[:20]}
+        stock_dfs['bad'] = pd.DataFrame({'Close': [1.0]})
+
+        results = self.scorer.batch_score_stocks(stock_dfs)
+
+        self.assertEqual(len(results), 20)
+        self.assertEqual([r[1] for r in results], sorted((r[1] for r in results), reverse=True))
+        code, score, recommendation = results[0]
+        self.assertEqual(score, self.scorer.calculate_score(stock_dfs[code]))
+        self.assertEqual(recommendation, self.scorer.get_recommendation(score))
+        self.assertEqual(self.scorer.batch_score_stocks(stock_dfs, limit=5), results[:5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+StockUniverse A股股票池测试用例
+"""
+
+import unittest
+import tempfile
+import shutil
+import pandas as pd
+from datetime import datetime
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.services.metadata_cache import MetadataCache
+from server.services.stock_data_provider import StockDataProvider
+from server.services.stock_universe import StockUniverse
+from server.utils.rate_limiter import RateLimiter
+
+
+def _stock(ts_code, name, list_date, industry='银行'):
+    return {'ts_code': ts_code, 'symbol': ts_code.split('.')[0], 'name': name, 'area': '深圳',
+            'industry': industry, 'list_date': list_date, 'market': '主板'}
+
+
+class FakeProApi:
+    """模拟 Tushare pro 接口，返回可替换的股票列表"""
+
+    def __init__(self, stocks):
+        self.stocks = stocks
+        self.calls = 0
+
+    def stock_basic(self, exchange, list_status, fields):
+        self.calls += 1
+        return pd.DataFrame(self.stocks)
+
+
+class TestStockUniverse(unittest.TestCase):
+    """测试每日最多刷新一次、上市/退市变更日志、新股过滤与数据提供者读取"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.pro = FakeProApi([_stock('000001.SZ', '平安银行', '19910403'),
+                               _stock('600000.SH', '浦发银行', '19991110')])
+        self.limiter = RateLimiter(os.path.join(self.tmp_dir, 'limiter.sqlite3'), {})
+        self.universe = StockUniverse(base_dir=self.tmp_dir, pro_api=self.pro, limiter=self.limiter)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_refresh_daily_and_diff(self):
+        stats = self.universe.refresh(now=datetime(2024, 3, 1, 9))
+        self.assertEqual((stats['refreshed'], stats['total'], stats['listed']), (True, 2, []))
+        self.assertFalse(self.universe.refresh(now=datetime(2024, 3, 1, 18))['refreshed'])
+        self.assertEqual(self.pro.calls, 1)
+
+        self.pro.stocks = [_stock('000001.SZ', '平安银行', '19910403'),
+                           _stock('301999.SZ', '新股', '20240228', industry='软件服务')]
+        stats = StockUniverse(base_dir=self.tmp_dir, pro_api=self.pro,
+                              limiter=self.limiter).refresh(now=datetime(2024, 3, 2, 9))
+        self.assertEqual((stats['listed'], stats['delisted']), (['301999.SZ'], ['600000.SH']))
+        changes = self.universe.changes()
+        self.assertEqual([(c['date'], c['change'], c['ts_code']) for c in changes],
+                         [('2024-03-02', 'listed', '301999.SZ'), ('2024-03-02', 'delisted', '600000.SH')])
+        self.assertEqual(self.universe.changes(since='2024-03-03'), [])
+
+    def test_codes_skip_recent_listings(self):
+        self.pro.stocks.append(_stock('301999.SZ', '新股', '20240228'))
+        self.universe.refresh(now=datetime(2024, 3, 1))
+        self.assertEqual(self.universe.codes(as_of=datetime(2024, 3, 1)), ['000001.SZ', '301999.SZ', '600000.SH'])
+        self.assertEqual(self.universe.codes(min_bars=60, as_of=datetime(2024, 3, 1)), ['000001.SZ', '600000.SH'])
+        self.assertIn('301999.SZ', self.universe.codes(min_bars=60, as_of=datetime(2024, 6, 1)))
+        self.assertEqual(self.universe.lookup('600000.SH')['industry'], '银行')
+        self.assertIsNone(self.universe.lookup('000002'))
+
+    def test_reload_after_refresh_in_other_process(self):
+        """其他实例（扫描器或命令行进程）刷新后，已加载的股票池在下一次查询时读取新数据"""
+        self.universe.refresh(now=datetime(2024, 3, 1, 9))
+        self.assertIsNone(self.universe.lookup('301999'))
+
+        self.pro.stocks.append(_stock('301999.SZ', '新股', '20240228', industry='软件服务'))
+        other = StockUniverse(base_dir=self.tmp_dir, pro_api=self.pro, limiter=self.limiter)
+        other.refresh(now=datetime(2024, 3, 2, 9))
+
+        self.assertEqual(self.universe.lookup('301999')['industry'], '软件服务')
+        self.assertIn('301999.SZ', self.universe.codes())
+        # 以重新读取的股票池为基准，再次刷新不会重复记录已记录的上市变更
+        self.universe.refresh(now=datetime(2024, 3, 3, 9), force=True)
+        self.assertEqual([c['ts_code'] for c in self.universe.changes()], ['301999.SZ'])
+
+    def test_provider_reads_metadata_from_universe(self):
+        self.universe.refresh()
+        provider = StockDataProvider(metadata_cache=MetadataCache(persist=False),
+                                     rate_limiter=RateLimiter(os.path.join(self.tmp_dir, 'limiter.sqlite3'), {}),
+                                     universe=self.universe)
+        self.assertEqual(provider._get_stock_metadata_sync('000001', 'A'),
+                         {'stock_name': '平安银行', 'sector': '银行'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TechnicalIndicator 技术指标计算测试用例
+"""
+
+import unittest
+import pandas as pd
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.services.stock_bars import StockBars
+from server.services.stock_scorer import StockScorer
+from server.services.technical_indicator import TechnicalIndicator
+from test_helpers import make_bars
+
+
+
+
+class TestTailIndicators(unittest.TestCase):
+    """测试只计算尾部K线的指标模式"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.indicator = TechnicalIndicator()
+
+    def test_tail_matches_full_calculation(self):
+        """测试尾部结果与完整计算的最后几行一致，包括历史短于窗口的情况"""
+        for periods in (10, 40, 250):
+            df = make_bars(periods, seed=periods)
+            full = self.indicator.calculate_indicators(df)
+            for tail in (1, 14):
+                for source in (df, StockBars.from_frame(df, '000001', 'A')):
+                    result = self.indicator.calculate_indicators(source, tail=tail)
+                    pd.testing.assert_frame_equal(result, full.iloc[-tail:], check_freq=False, rtol=1e-9)
+
+    def test_score_unchanged(self):
+        """测试评分只依赖最新一根K线，尾部模式得分不变"""
+        df = make_bars(250)
+        scorer = StockScorer()
+        self.assertEqual(scorer.calculate_score(self.indicator.calculate_indicators(df, tail=1)),
+                         scorer.calculate_score(self.indicator.calculate_indicators(df)))
+
+
+class TestSelectedOutputs(unittest.TestCase):
+    """测试只计算请求的指标列"""
+
+    def test_outputs_match_full_calculation(self):
+        """测试完整模式和尾部模式下，只请求部分指标时结果与完整计算一致"""
+        indicator = TechnicalIndicator()
+        df = make_bars(120)
+        full = indicator.calculate_indicators(df)
+        outputs = list(StockScorer.REQUIRED_INDICATORS)
+
+        for tail in (None, 3):
+            result = indicator.calculate_indicators(df, tail=tail, outputs=outputs)
+            expected = full if tail is None else full.iloc[-tail:]
+            self.assertEqual(list(result.columns), list(df.columns) + outputs)
+            pd.testing.assert_frame_equal(result, expected[list(df.columns) + outputs], check_freq=False, rtol=1e-9)
+            self.assertEqual(StockScorer().calculate_score(result), StockScorer().calculate_score(full))
+
+
+if __name__ == '__main__':
+    unittest.main()
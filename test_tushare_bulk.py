@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TushareBulkIngestor 按交易日批量入库测试用例
+"""
+
+import unittest
+import tempfile
+import shutil
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.services.bar_store import BarStore
+from server.services.tushare_bulk import TushareBulkIngestor
+from server.utils.rate_limiter import RateLimiter
+
+TRADE_DATES = ['20240102', '20240103', '20240104', '20240105']
+
+# 000001 在 20240104 除权（复权因子由 1.0 变为 1.1）；600000 在 20240103 停牌
+CLOSES = {
+    '000001.SZ': {'20240102': 11.0, '20240103': 11.2, '20240104': 10.0, '20240105': 10.5},
+    '600000.SH': {'20240102': 8.0, '20240104': 8.2, '20240105': 8.4},
+}
+FACTORS = {
+    '000001.SZ': {'20240102': 1.0, '20240103': 1.0, '20240104': 1.1, '20240105': 1.1},
+    '600000.SH': {'20240102': 2.0, '20240104': 2.0, '20240105': 2.0},
+}
+
+
+class FakeProApi:
+    """模拟 Tushare pro 接口，记录每次请求"""
+
+    def __init__(self, published=TRADE_DATES):
+        self.published = published
+        self.calls = []
+
+    def trade_cal(self, exchange, start_date, end_date, is_open):
+        self.calls.append(('trade_cal', start_date, end_date))
+        return pd.DataFrame({'cal_date': [d for d in TRADE_DATES if start_date <= d <= end_date]})
+
+    def daily(self, trade_date):
+        self.calls.append(('daily', trade_date))
+        rows = []
+        if trade_date in self.published:
+            for ts_code, closes in CLOSES.items():
+                if trade_date not in closes:
+                    continue
+                # 除权日的昨收为交易所公布的除权参考价
+                dates = sorted(closes)
+                prev_date = dates[max(0, dates.index(trade_date) - 1)]
+                factors = FACTORS[ts_code]
+                prev = closes[prev_date] * factors[prev_date] / factors[trade_date]
+                close = closes[trade_date]
+                rows.append({'ts_code': ts_code, 'trade_date': trade_date, 'open': close, 'high': close + 0.2,
+                             'low': close - 0.2, 'close': close, 'pre_close': prev, 'change': close - prev,
+                             'pct_chg': (close / prev - 1) * 100, 'vol': 1000.0, 'amount': 11.0})
+        return pd.DataFrame(rows)
+
+    def adj_factor(self, ts_code, trade_date):
+        self.calls.append(('adj_factor', trade_date))
+        return pd.DataFrame([{'ts_code': code, 'trade_date': trade_date, 'adj_factor': factors[trade_date]}
+                             for code, factors in FACTORS.items() if trade_date in factors])
+
+
+class TestTushareBulkIngestor(unittest.TestCase):
+    """测试按交易日请求、本地前复权计算与增量更新"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.store = BarStore(base_dir=self.tmp_dir)
+        self.limiter = RateLimiter(os.path.join(self.tmp_dir, 'limiter.sqlite3'), budgets={})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _ingestor(self, pro):
+        return TushareBulkIngestor(pro_api=pro, bar_store=self.store, limiter=self.limiter)
+
+    def test_sync_computes_qfq(self):
+        pro = FakeProApi()
+        stats = self._ingestor(pro).sync('20240101', '20240105')
+        self.assertEqual((stats['fetched_dates'], stats['written'], stats['end_date']), (4, 2, '20240105'))
+        # 每个交易日两次请求，与股票数量无关
+        self.assertEqual(sum(call[0] in ('daily', 'adj_factor') for call in pro.calls), 8)
+        self.assertEqual(self.store.list_codes('A'), ['000001', '600000'])
+
+        df = self.store.read('A', '000001')
+        expected = [11.0 / 1.1, 11.2 / 1.1, 10.0, 10.5]
+        np.testing.assert_allclose(df['Close'].to_numpy(), expected)
+        # 除权日的前复权涨跌额基于复权后的昨收
+        self.assertAlmostEqual(df['Change'].iloc[2], 10.0 - 11.2 / 1.1)
+        self.assertEqual(df['Amount'].iloc[0], 11000.0)
+        stopped = self.store.read('A', '600000')
+        self.assertEqual(len(stopped), 3)
+        np.testing.assert_allclose(stopped['Close'].to_numpy(), [8.0, 8.2, 8.4])
+        self.assertEqual(self.store.read_meta('A', '600000')['end'], '20240105')
+
+    def test_incremental_sync(self):
+        """已缓存的交易日不再请求，尚未发布的交易日在下次同步时获取"""
+        pro = FakeProApi(published=TRADE_DATES[:3])
+        stats = self._ingestor(pro).sync('20240101', '20240105')
+        self.assertEqual((stats['fetched_dates'], stats['end_date']), (3, '20240104'))
+
+        pro = FakeProApi()
+        stats = self._ingestor(pro).sync('20240101', '20240105')
+        self.assertEqual(stats['fetched_dates'], 1)
+        self.assertEqual([c for c in pro.calls if c[0] != 'trade_cal'],
+                         [('daily', '20240105'), ('adj_factor', '20240105')])
+        np.testing.assert_allclose(self.store.read('A', '000001')['Close'].to_numpy(),
+                                   [11.0 / 1.1, 11.2 / 1.1, 10.0, 10.5])
+
+    def test_sync_keeps_earlier_history(self):
+        """较短区间的同步不截断仓库中更早的历史，除权后按新基准重新换算"""
+        self._ingestor(FakeProApi()).sync('20240101', '20240103')
+        np.testing.assert_allclose(self.store.read('A', '000001')['Close'].to_numpy(), [11.0, 11.2])
+
+        self._ingestor(FakeProApi()).sync('20240103', '20240105')
+        df = self.store.read('A', '000001')
+        np.testing.assert_allclose(df['Close'].to_numpy(), [11.0 / 1.1, 11.2 / 1.1, 10.0, 10.5])
+        np.testing.assert_allclose(df['High'].to_numpy()[:2], [11.2 / 1.1, 11.4 / 1.1])
+        self.assertEqual(self.store.read_meta('A', '000001')['start'], '20240101')
+        # 600000 在区间首日停牌，两段数据没有重叠交易日，按缓存的复权因子换算
+        stopped = self.store.read('A', '600000')
+        np.testing.assert_allclose(stopped['Close'].to_numpy(), [8.0, 8.2, 8.4])
+        self.assertEqual(self.store.read_meta('A', '600000')['start'], '20240101')
+
+
+if __name__ == '__main__':
+    unittest.main()